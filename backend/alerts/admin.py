@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Alert, ExportTask
+from .models import Alert, ExportTask, SpendingBaseline
 
 
 @admin.register(Alert)
@@ -82,4 +82,21 @@ class ExportTaskAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         """优化查询"""
         qs = super().get_queryset(request)
-        return qs.select_related('user')
\ No newline at end of file
+        return qs.select_related('user')
+
+
+@admin.register(SpendingBaseline)
+class SpendingBaselineAdmin(admin.ModelAdmin):
+    """收支基线管理界面"""
+    list_display = [
+        'id', 'user', 'category', 'transaction_type', 'mean',
+        'observations', 'last_date', 'updated_at'
+    ]
+    list_filter = ['transaction_type']
+    search_fields = ['user__username', 'category__name']
+    readonly_fields = ['updated_at']
+    
+    def get_queryset(self, request):
+        """优化查询"""
+        qs = super().get_queryset(request)
+        return qs.select_related('user', 'category')
@@ -0,0 +1,184 @@
+"""
+收支异常检测
+
+对每个 (用户, 分类, 类型) 维护单笔金额的指数加权均值与方差（EWMA），
+新交易保存时先按当前基线计算 z 分数，再把这笔金额并入基线。
+每次只读写一行状态，不回读历史交易，可以直接在写入路径上同步执行。
+"""
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction as db_transaction
+from django.utils import timezone
+
+from transactions.models import Transaction
+from .models import Alert, SpendingBaseline
+
+# 平滑系数：越大越偏重近期金额
+ALPHA = 0.2
+
+# 触发预警的 z 分数阈值
+Z_THRESHOLD = 3.0
+
+# 样本数少于该值时只学习不预警
+WARMUP = 5
+
+# 标准差下限：金额长期不变时方差趋于0，按均值比例和绝对值设下限，避免小波动被判为异常
+MIN_STD_RATIO = 0.1
+MIN_STD = 1.0
+
+# 预警有效期
+ALERT_TTL = timedelta(days=7)
+
+
+def update_state(mean, variance, observations, amount, alpha=ALPHA):
+    """把一个新样本并入 EWMA 状态，返回新的 (mean, variance, observations)"""
+    if observations == 0:
+        return amount, 0.0, 1
+    diff = amount - mean
+    increment = alpha * diff
+    mean = mean + increment
+    variance = (1 - alpha) * (variance + diff * increment)
+    return mean, variance, observations + 1
+
+
+def z_score(mean, variance, amount):
+    """按带下限的标准差计算 z 分数"""
+    std = max(math.sqrt(max(variance, 0.0)), abs(mean) * MIN_STD_RATIO, MIN_STD)
+    return (amount - mean) / std
+
+
+def observe(transaction):
+    """
+    处理一笔新交易：判断是否异常并更新基线，返回创建的预警或 None
+
+    只对高于基线的金额预警：支出异常为高优先级，收入异常仅作提示。
+    """
+    alerts = observe_many([transaction])
+    return alerts[0] if alerts else None
+
+
+def observe_many(transactions):
+    """
+    批量处理新交易，返回创建的预警列表
+
+    按 (用户, 分类, 类型) 分组，组内按交易日期顺序依次判断并并入基线，
+    每组只读写一次基线行。
+    """
+    groups = defaultdict(list)
+    for transaction in sorted(transactions, key=lambda item: (item.date, item.pk)):
+        groups[(transaction.user_id, transaction.category_id, transaction.transaction_type)].append(transaction)
+
+    alerts = []
+    with db_transaction.atomic():
+        for (user_id, category_id, transaction_type), items in groups.items():
+            baseline = _lock_baseline({
+                'user_id': user_id,
+                'category_id': category_id,
+                'transaction_type': transaction_type,
+            })
+            for transaction in items:
+                amount = float(transaction.amount)
+                if baseline.observations >= WARMUP:
+                    score = z_score(baseline.mean, baseline.variance, amount)
+                    if score >= Z_THRESHOLD:
+                        alerts.append(_raise_alert(transaction, baseline.mean, score))
+
+                baseline.mean, baseline.variance, baseline.observations = update_state(
+                    baseline.mean, baseline.variance, baseline.observations, amount
+                )
+                baseline.last_amount = transaction.amount
+                baseline.last_date = transaction.date
+            baseline.save(update_fields=['mean', 'variance', 'observations', 'last_amount', 'last_date', 'updated_at'])
+    return alerts
+
+
+def _lock_baseline(lookup):
+    """锁定并返回基线行，不存在时新建"""
+    baseline = SpendingBaseline.objects.select_for_update().filter(**lookup).first()
+    if baseline is None:
+        try:
+            with db_transaction.atomic():
+                baseline = SpendingBaseline.objects.create(**lookup)
+        except IntegrityError:
+            # 并发写入时另一请求已经建好了这一行
+            baseline = SpendingBaseline.objects.select_for_update().get(**lookup)
+    return baseline
+
+
+def _raise_alert(transaction, mean, score):
+    category_name = transaction.category.name
+    if transaction.transaction_type == 'expense':
+        title = f"支出异常 - {category_name}"
+        message = f"本笔支出{transaction.amount:.2f}元，明显高于该分类近期平均的{mean:.2f}元，请确认是否为本人消费"
+        priority = 'urgent' if score >= Z_THRESHOLD * 2 else 'high'
+    else:
+        title = f"收入异常 - {category_name}"
+        message = f"本笔收入{transaction.amount:.2f}元，明显高于该分类近期平均的{mean:.2f}元"
+        priority = 'info'
+    return Alert.objects.create(
+        user_id=transaction.user_id,
+        alert_type=transaction.transaction_type,
+        title=title,
+        message=message,
+        priority=priority,
+        related_id=transaction.id,
+        related_type='transaction',
+        expires_at=timezone.now() + ALERT_TTL
+    )
+
+
+def rebuild_baselines(user_id=None, batch_size=1000):
+    """
+    按时间顺序回放已有交易重建基线，返回生成的基线行数
+
+    回放只更新状态，不补发历史预警。
+    """
+    transactions = Transaction.objects.all()
+    baselines = SpendingBaseline.objects.all()
+    if user_id is not None:
+        transactions = transactions.filter(user_id=user_id)
+        baselines = baselines.filter(user_id=user_id)
+
+    rows = transactions.order_by(
+        'user_id', 'category_id', 'transaction_type', 'date', 'created_at', 'id'
+    ).values_list('user_id', 'category_id', 'transaction_type', 'date', 'amount')
+
+    created = 0
+    with db_transaction.atomic():
+        baselines.delete()
+        batch = []
+        current = None
+        for user, category, transaction_type, day, amount in rows.iterator():
+            key = (user, category, transaction_type)
+            if current is None or key != current[0]:
+                if current is not None:
+                    batch.append(_baseline_from_state(*current))
+                current = [key, 0.0, 0.0, 0, None, None]
+            current[1], current[2], current[3] = update_state(current[1], current[2], current[3], float(amount))
+            current[4], current[5] = amount, day
+            if len(batch) >= batch_size:
+                SpendingBaseline.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        if current is not None:
+            batch.append(_baseline_from_state(*current))
+        if batch:
+            SpendingBaseline.objects.bulk_create(batch)
+            created += len(batch)
+    return created
+
+
+def _baseline_from_state(key, mean, variance, observations, last_amount, last_date):
+    user_id, category_id, transaction_type = key
+    return SpendingBaseline(
+        user_id=user_id,
+        category_id=category_id,
+        transaction_type=transaction_type,
+        mean=mean,
+        variance=variance,
+        observations=observations,
+        last_amount=last_amount,
+        last_date=last_date,
+    )
@@ -0,0 +1,176 @@
+"""
+预算阈值预警
+
+交易写入时 transactions.budgets 给出每个受影响预算写入前后的已用金额，本模块据此判断
+使用率是否向上跨过 90%、100%，只有真正跨过时才生成预警，写入路径上不再重新汇总支出。
+
+判断在事务提交后进行：变化放入有界队列，由后台线程取出并等待 COALESCE_WINDOW 秒，
+把同一预算的连续变化合并为“最早的写入前金额 → 最新的写入后金额”后统一处理；
+队列已满时直接在提交回调中处理，不丢弃。同一预算同一阈值只生成一条预警，由数据库唯一约束保证。
+"""
+import logging
+import queue
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction as db_transaction
+from django.utils import timezone
+
+from transactions.models import Budget
+from .models import Alert
+
+logger = logging.getLogger(__name__)
+
+# 阈值（使用率百分比）、预警优先级和有效期，按阈值从高到低排列
+THRESHOLDS = (
+    (Decimal('100'), 'urgent', timedelta(days=3)),
+    (Decimal('90'), 'high', timedelta(days=7)),
+)
+
+# 队列最多缓存的提交数
+QUEUE_SIZE = 1000
+
+# 后台线程取到变化后再等待的时间（秒），合并同一预算的连续写入
+COALESCE_WINDOW = 0.5
+
+# 后台线程单次最多合并的提交数
+MAX_BATCH = 500
+
+
+def crossed_threshold(amount, before, after):
+    """返回 before → after 向上跨过的最高阈值，没有跨过时返回 None"""
+    if amount <= 0:
+        return None
+    for threshold in THRESHOLDS:
+        limit = amount * threshold[0] / 100
+        if before < limit <= after:
+            return threshold
+    return None
+
+
+def coalesce(changes):
+    """按预算合并变化：取最早的写入前金额和最新的写入后金额"""
+    merged = {}
+    for change in changes:
+        first = merged.get(change.budget_id)
+        merged[change.budget_id] = change if first is None else change._replace(before=first.before)
+    return list(merged.values())
+
+
+def evaluate(changes):
+    """合并变化后为跨过阈值的有效预算创建预警，返回创建的预警列表"""
+    crossed = {}
+    for change in coalesce(changes):
+        threshold = crossed_threshold(change.amount, change.before, change.after)
+        if change.is_active and threshold is not None:
+            crossed[change.budget_id] = (change, threshold)
+    if not crossed:
+        return []
+
+    existing = set(Alert.objects.filter(
+        alert_type='budget', related_type='budget', related_id__in=list(crossed)
+    ).values_list('related_id', 'priority'))
+    budgets = Budget.objects.filter(pk__in=list(crossed), is_active=True).select_related('category')
+
+    alerts = []
+    for budget in budgets:
+        change, (percentage, priority, ttl) = crossed[budget.id]
+        if (budget.id, priority) in existing:
+            continue
+        alert = Alert(
+            user_id=budget.user_id,
+            alert_type='budget',
+            priority=priority,
+            related_id=budget.id,
+            related_type='budget',
+            expires_at=timezone.now() + ttl,
+            **_describe(budget, change.after, percentage)
+        )
+        # 后台线程、队列已满时的提交回调或其他进程可能同时判断同一预算，由唯一约束拒绝重复的预警
+        try:
+            with db_transaction.atomic():
+                alert.save()
+        except IntegrityError:
+            continue
+        alerts.append(alert)
+    return alerts
+
+
+def _describe(budget, spent, percentage):
+    name = budget.category.name
+    if percentage >= 100:
+        return {
+            'title': f"预算超支 - {name}",
+            'message': f"预算已超支{spent - budget.amount:.2f}元，请注意控制支出",
+        }
+    return {
+        'title': f"预算预警 - {name}",
+        'message': f"预算使用率已达到{spent / budget.amount * 100:.1f}%，剩余预算{budget.amount - spent:.2f}元",
+    }
+
+
+class BudgetAlertEngine:
+    """预算阈值判断的有界队列和后台线程"""
+
+    def __init__(self, maxsize=QUEUE_SIZE, window=COALESCE_WINDOW):
+        self.queue = queue.Queue(maxsize)
+        self.window = window
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def submit(self, changes):
+        """事务提交后调用；未启用后台线程或队列已满时直接处理"""
+        if not settings.BUDGET_ALERT_ASYNC:
+            evaluate(changes)
+            return
+        self._ensure_worker()
+        try:
+            self.queue.put_nowait(changes)
+        except queue.Full:
+            evaluate(changes)
+
+    def flush(self):
+        """在当前线程处理队列中剩余的变化"""
+        batch = []
+        while True:
+            try:
+                batch.extend(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return evaluate(batch) if batch else []
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='budget-alerts', daemon=True)
+                self._worker.start()
+
+    def _next_batch(self):
+        batch = list(self.queue.get())
+        deadline = time.monotonic() + self.window
+        for _ in range(MAX_BATCH - 1):
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.extend(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            close_old_connections()
+            try:
+                evaluate(batch)
+            except Exception:
+                logger.exception('预算预警处理失败')
+            finally:
+                close_old_connections()
+
+
+engine = BudgetAlertEngine()
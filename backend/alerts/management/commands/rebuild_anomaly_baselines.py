@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from alerts.anomaly import rebuild_baselines
+
+
+class Command(BaseCommand):
+    help = '按时间顺序回放已有交易，重建收支异常检测的分类基线'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, dest='user_id', help='只重建指定用户ID的基线')
+
+    def handle(self, *args, **options):
+        count = rebuild_baselines(user_id=options.get('user_id'))
+        self.stdout.write(self.style.SUCCESS(f'收支基线重建完成：共 {count} 行'))
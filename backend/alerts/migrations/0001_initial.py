@@ -0,0 +1,65 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:50
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# 预警与导出任务表此前由 migrate --run-syncdb 创建，已有数据库执行
+# python manage.py migrate alerts --fake-initial 标记本迁移为已应用
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('export_type', models.CharField(choices=[('transactions', '交易记录'), ('budgets', '预算数据'), ('goals', '目标数据'), ('alerts', '预警数据'), ('savings', '储蓄数据')], default='transactions', max_length=20, verbose_name='导出类型')),
+                ('status', models.CharField(choices=[('pending', '待处理'), ('processing', '处理中'), ('completed', '已完成'), ('failed', '失败')], default='pending', max_length=15, verbose_name='状态')),
+                ('format', models.CharField(choices=[('csv', 'CSV'), ('excel', 'Excel'), ('pdf', 'PDF')], max_length=10, verbose_name='文件格式')),
+                ('start_date', models.DateField(blank=True, null=True, verbose_name='开始日期')),
+                ('end_date', models.DateField(blank=True, null=True, verbose_name='结束日期')),
+                ('filters', models.JSONField(blank=True, default=dict, verbose_name='筛选参数')),
+                ('file_name', models.CharField(blank=True, max_length=255, null=True, verbose_name='文件名')),
+                ('file_url', models.URLField(blank=True, null=True, verbose_name='文件链接')),
+                ('file_size', models.PositiveIntegerField(blank=True, null=True, verbose_name='文件大小(字节)')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('completed_at', models.DateTimeField(blank=True, null=True, verbose_name='完成时间')),
+                ('expires_at', models.DateTimeField(blank=True, null=True, verbose_name='过期时间')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts_exporttask', to=settings.AUTH_USER_MODEL, verbose_name='用户')),
+            ],
+            options={
+                'verbose_name': '导出任务',
+                'verbose_name_plural': '导出任务管理',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Alert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alert_type', models.CharField(choices=[('budget', '预算预警'), ('goal', '目标预警'), ('saving', '储蓄预警'), ('expense', '支出异常'), ('income', '收入异常')], max_length=20, verbose_name='预警类型')),
+                ('title', models.CharField(max_length=200, verbose_name='标题')),
+                ('message', models.TextField(verbose_name='消息内容')),
+                ('priority', models.CharField(choices=[('info', '信息'), ('low', '低'), ('medium', '中'), ('high', '高'), ('urgent', '紧急')], default='medium', max_length=10, verbose_name='优先级')),
+                ('related_id', models.PositiveIntegerField(blank=True, null=True, verbose_name='关联ID')),
+                ('related_type', models.CharField(blank=True, max_length=50, null=True, verbose_name='关联类型')),
+                ('is_read', models.BooleanField(default=False, verbose_name='是否已读')),
+                ('is_active', models.BooleanField(default=True, verbose_name='是否有效')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('expires_at', models.DateTimeField(blank=True, null=True, verbose_name='过期时间')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts_alert', to=settings.AUTH_USER_MODEL, verbose_name='用户')),
+            ],
+            options={
+                'verbose_name': '预警',
+                'verbose_name_plural': '预警管理',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:50
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('transactions', '0001_initial'),
+        ('alerts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpendingBaseline',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transaction_type', models.CharField(choices=[('expense', '支出'), ('income', '收入')], max_length=10, verbose_name='交易类型')),
+                ('mean', models.FloatField(default=0, verbose_name='加权均值')),
+                ('variance', models.FloatField(default=0, verbose_name='加权方差')),
+                ('observations', models.PositiveIntegerField(default=0, verbose_name='样本数')),
+                ('last_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='最近金额')),
+                ('last_date', models.DateField(blank=True, null=True, verbose_name='最近交易日期')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='transactions.transactioncategory', verbose_name='分类')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='spending_baselines', to=settings.AUTH_USER_MODEL, verbose_name='用户')),
+            ],
+            options={
+                'verbose_name': '收支基线',
+                'verbose_name_plural': '收支基线',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='spendingbaseline',
+            constraint=models.UniqueConstraint(fields=('user', 'category', 'transaction_type'), name='unique_spending_baseline'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:52
+
+from django.db import migrations, models
+
+
+def remove_duplicate_budget_alerts(apps, schema_editor):
+    """删除并发判断时重复生成的预算预警，每个预算每个阈值保留最早的一条"""
+    Alert = apps.get_model('alerts', 'Alert')
+    keep = (
+        Alert.objects.filter(related_type='budget')
+        .values('alert_type', 'related_id', 'priority')
+        .annotate(first=models.Min('id'))
+        .values_list('first', flat=True)
+    )
+    Alert.objects.filter(related_type='budget').exclude(id__in=list(keep)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0003_alert_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_budget_alerts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='alert',
+            constraint=models.UniqueConstraint(condition=models.Q(('related_type', 'budget')), fields=('alert_type', 'related_type', 'related_id', 'priority'), name='unique_budget_threshold_alert'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from transactions.models import Transaction, TransactionCategory
 
 User = get_user_model()
 
@@ -46,11 +47,54 @@ class Alert(models.Model):
         verbose_name = '预警'
         verbose_name_plural = '预警管理'
         ordering = ['-created_at']
+        indexes = [
+            # 预警列表与未读预警按创建时间倒序，沿索引读取无需排序
+            models.Index(fields=['user', '-created_at'], name='alert_user_created_idx'),
+        ]
+        constraints = [
+            # 同一预算同一阈值（优先级）只保留一条预警，并发判断时由数据库去重
+            models.UniqueConstraint(
+                fields=['alert_type', 'related_type', 'related_id', 'priority'],
+                condition=models.Q(related_type='budget'),
+                name='unique_budget_threshold_alert'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.title} ({self.user.username})"
 
 
+class SpendingBaseline(models.Model):
+    """
+    分类收支基线
+
+    每个 (用户, 分类, 类型) 一行，保存单笔金额的指数加权均值和方差，
+    新交易到来时只需读取并更新这一行即可判断是否异常。
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='spending_baselines', verbose_name='用户')
+    category = models.ForeignKey(TransactionCategory, on_delete=models.CASCADE, verbose_name='分类')
+    transaction_type = models.CharField(max_length=10, choices=Transaction.TRANSACTION_TYPES, verbose_name='交易类型')
+    mean = models.FloatField(default=0, verbose_name='加权均值')
+    variance = models.FloatField(default=0, verbose_name='加权方差')
+    observations = models.PositiveIntegerField(default=0, verbose_name='样本数')
+    last_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, verbose_name='最近金额')
+    last_date = models.DateField(null=True, blank=True, verbose_name='最近交易日期')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+    
+    class Meta:
+        verbose_name = '收支基线'
+        verbose_name_plural = '收支基线'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'category', 'transaction_type'],
+                name='unique_spending_baseline'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.category.name} - {self.mean:.2f}"
+
+
 class ExportTask(models.Model):
     """
     数据导出任务模型
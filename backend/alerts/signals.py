@@ -1,64 +1,48 @@
 """
 预警信号处理器
 """
+from django.db import transaction as db_transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from django.db.models import Sum
-from django.utils import timezone
-from datetime import datetime, timedelta
 from .models import Alert
+from . import anomaly, budget_alerts, stream
 from transactions.models import Budget, Transaction
+from transactions.signals import transactions_bulk_created, budget_spent_changed
+
+
+@receiver(budget_spent_changed, sender=Budget)
+def check_budget_thresholds(sender, changes, **kwargs):
+    """
+    交易写入改变预算已用金额后，在事务提交后判断是否跨过预警阈值
+
+    只关注启用中的预算；写入回滚时不会产生预警。
+    """
+    changes = [change for change in changes if change.is_active]
+    if changes:
+        db_transaction.on_commit(lambda: budget_alerts.engine.submit(changes))
 
 
 @receiver(post_save, sender=Transaction)
-def create_budget_alert(sender, instance, created, **kwargs):
+def detect_amount_anomaly(sender, instance, created, raw=False, **kwargs):
     """
-    当创建新交易记录时，自动检查是否触发预算预警
+    新交易保存后更新分类基线，金额明显偏离时创建收支异常预警
+
+    修改和删除不回退基线，如需校正可执行 rebuild_anomaly_baselines 命令。
     """
-    if not created or instance.transaction_type != 'expense':
+    if not created or raw:
+        return
+    anomaly.observe(instance)
+
+
+@receiver(transactions_bulk_created, sender=Transaction)
+def detect_amount_anomaly_after_bulk_create(sender, instances, **kwargs):
+    """批量新增交易后按分类更新基线，每个基线只读写一次"""
+    anomaly.observe_many(instances)
+
+
+@receiver(post_save, sender=Alert)
+def push_new_alert(sender, instance, created, raw=False, **kwargs):
+    """新预警提交后推送给当前进程内该用户的 SSE 连接"""
+    if not created or raw:
         return
-    
-    # 获取相关的预算
-    budgets = Budget.objects.filter(
-        user=instance.user,
-        category=instance.category,
-        is_active=True,
-        start_date__lte=instance.date,
-        end_date__gte=instance.date
-    )
-    
-    for budget in budgets:
-        # 计算当前已使用的预算
-        spent_amount = Transaction.objects.filter(
-            user=instance.user,
-            category=instance.category,
-            transaction_type='expense',
-            date__gte=budget.start_date,
-            date__lte=budget.end_date
-        ).aggregate(total=sum('amount'))['total'] or 0
-        
-        percentage = (spent_amount / budget.amount) * 100
-        
-        # 检查是否需要创建预警
-        if percentage >= 90 and percentage < 100:
-            # 预算使用率超过90%，创建预警
-            Alert.objects.get_or_create(
-                user=instance.user,
-                alert_type='budget',
-                priority='high',
-                title=f"预算预警 - {budget.category.name}",
-                message=f"预算使用率已达到{percentage:.1f}%，剩余预算{budget.amount - spent_amount:.2f}元",
-                related_id=budget.id,
-                expires_at=timezone.now() + timedelta(days=7)
-            )
-        elif percentage >= 100:
-            # 预算超支，创建紧急预警
-            Alert.objects.get_or_create(
-                user=instance.user,
-                alert_type='budget',
-                priority='urgent',
-                title=f"预算超支 - {budget.category.name}",
-                message=f"预算已超支{(spent_amount - budget.amount):.2f}元，请注意控制支出",
-                related_id=budget.id,
-                expires_at=timezone.now() + timedelta(days=3)
-            )
\ No newline at end of file
+    db_transaction.on_commit(lambda: stream.publish_alert(instance))
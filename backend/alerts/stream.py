@@ -0,0 +1,200 @@
+"""
+预警实时推送（Server-Sent Events）
+
+客户端保持一条 SSE 长连接代替轮询未读预警接口，新预警提交后推送给所属用户：
+
+- 同一进程内由 AlertBroker 直接把预警投递到该用户的各条连接，无需查询数据库；
+- 多进程部署时其他进程创建的预警收不到进程内通知，每条连接每隔 POLL_INTERVAL 秒
+  按预警 id 查询一次新预警作为兜底。
+
+事件 id 为预警 id，浏览器断线重连时带上 Last-Event-ID 请求头，从该 id 之后续传。
+
+浏览器的 EventSource 无法设置请求头，连接前先用 JWT 换取一张推送票据（issue_ticket），
+放在 ?ticket= 查询参数中。查询参数会写入代理和服务器的访问日志，因此不接受 JWT：票据
+TICKET_TTL 秒后过期且只能使用一次，日志中留下的票据无法再用于认证。
+需要通过 ASGI 服务（config.asgi:application）部署，每条连接只占用事件循环中的一个协程。
+"""
+import asyncio
+import threading
+import uuid
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import Max
+
+from config.renderers import FastJSONRenderer
+from .models import Alert
+from .serializers import AlertListSerializer
+
+# 每条连接缓存的待发送预警数，超出的丢弃，由轮询兜底补发
+QUEUE_SIZE = 100
+
+# 单次轮询最多补发的预警数
+POLL_LIMIT = 100
+
+# 客户端断线后重连的等待时间（毫秒）
+RETRY_MS = 3000
+
+# 推送票据的签名盐和缓存键前缀
+TICKET_SALT = 'alerts.stream.ticket'
+TICKET_KEY_PREFIX = 'alert-stream-ticket'
+
+
+class AlertBroker:
+    """
+    进程内的预警发布/订阅
+
+    订阅方是运行在事件循环中的 SSE 连接，发布方是任意线程中的同步代码，
+    通过 call_soon_threadsafe 把预警投递到订阅方所在的事件循环。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, user_id):
+        """在当前事件循环中订阅用户的新预警，返回 (loop, queue)"""
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(maxsize=QUEUE_SIZE))
+        with self._lock:
+            self._subscribers[user_id].add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, user_id, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[user_id]
+
+    def has_subscribers(self, user_id):
+        return user_id in self._subscribers
+
+    def publish(self, user_id, payload):
+        """把已序列化的预警投递给该用户的所有连接"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, payload)
+            except RuntimeError:
+                # 事件循环已关闭，连接随之结束
+                pass
+
+
+def _offer(queue, payload):
+    try:
+        queue.put_nowait(payload)
+    except asyncio.QueueFull:
+        pass
+
+
+broker = AlertBroker()
+
+
+def publish_alert(alert):
+    """预警提交后调用，当前进程内有该用户的连接时才序列化"""
+    if broker.has_subscribers(alert.user_id):
+        broker.publish(alert.user_id, AlertListSerializer(alert).data)
+
+
+def latest_alert_id(user_id):
+    return Alert.objects.filter(user_id=user_id).aggregate(latest=Max('id'))['latest'] or 0
+
+
+def fetch_alerts(user_id, after_id, limit=POLL_LIMIT):
+    """按 id 顺序返回 after_id 之后的有效预警"""
+    queryset = Alert.objects.filter(user_id=user_id, id__gt=after_id, is_active=True).order_by('id')[:limit]
+    return list(AlertListSerializer(queryset, many=True).data)
+
+
+def issue_ticket(user_id):
+    """签发推送票据，返回 (票据, 有效秒数)"""
+    ticket = signing.dumps({'user': user_id, 'nonce': uuid.uuid4().hex}, salt=TICKET_SALT)
+    return ticket, settings.ALERT_STREAM_TICKET_TTL
+
+
+def redeem_ticket(ticket):
+    """
+    校验并作废推送票据，返回用户 ID，无效、过期或已使用时返回 None
+
+    票据本身带签名和签发时间，任一进程都能校验；是否已使用记在缓存中，多进程部署需使用
+    共享缓存才能跨进程保证只用一次，否则仍受有效期限制。
+    """
+    ttl = settings.ALERT_STREAM_TICKET_TTL
+    try:
+        payload = signing.loads(ticket, salt=TICKET_SALT, max_age=ttl)
+    except signing.BadSignature:
+        return None
+    if not cache.add(f"{TICKET_KEY_PREFIX}:{payload['nonce']}", True, timeout=ttl + 1):
+        return None
+    return payload['user']
+
+
+def encode_event(payload):
+    return b'id: %d\nevent: alert\ndata: %s\n\n' % (payload['id'], FastJSONRenderer().render(payload))
+
+
+async def alert_events(user_id, last_id=None, poll_interval=None, heartbeat=None, max_duration=None):
+    """
+    生成推送给用户的 SSE 数据
+
+    last_id 为空时只推送连接之后的新预警，否则先补发 last_id 之后的预警。
+    连接超过 max_duration 秒后结束，由客户端自动重连，避免断开的连接长期占用资源。
+    """
+    poll_interval = poll_interval or settings.ALERT_STREAM_POLL_INTERVAL
+    heartbeat = heartbeat or settings.ALERT_STREAM_HEARTBEAT
+    max_duration = max_duration or settings.ALERT_STREAM_MAX_DURATION
+
+    loop = asyncio.get_running_loop()
+    # 先确定游标再订阅，两者之间提交的预警由第一次轮询补发
+    if last_id is None:
+        cursor = await sync_to_async(latest_alert_id)(user_id)
+        next_poll = loop.time() + poll_interval
+    else:
+        cursor = last_id
+        next_poll = loop.time()
+    subscriber = broker.subscribe(user_id)
+    queue = subscriber[1]
+    try:
+        yield b'retry: %d\n\n' % RETRY_MS
+        # 已推送但游标尚未越过的预警 id，轮询时跳过
+        pushed = set()
+        deadline = loop.time() + max_duration
+        next_heartbeat = loop.time() + heartbeat
+
+        while True:
+            now = loop.time()
+            if now >= deadline:
+                break
+            payload = None
+            if now < next_poll:
+                try:
+                    payload = await asyncio.wait_for(queue.get(), min(next_poll, next_heartbeat, deadline) - now)
+                except asyncio.TimeoutError:
+                    pass
+            if payload is not None and payload['id'] > cursor and payload['id'] not in pushed:
+                pushed.add(payload['id'])
+                next_heartbeat = loop.time() + heartbeat
+                yield encode_event(payload)
+
+            if loop.time() >= next_poll:
+                alerts = await sync_to_async(fetch_alerts)(user_id, cursor)
+                for alert in alerts:
+                    if alert['id'] not in pushed:
+                        next_heartbeat = loop.time() + heartbeat
+                        yield encode_event(alert)
+                if alerts:
+                    cursor = alerts[-1]['id']
+                    pushed = {alert_id for alert_id in pushed if alert_id > cursor}
+                # 还有未补发完的预警时立即继续
+                next_poll = loop.time() + (0 if len(alerts) == POLL_LIMIT else poll_interval)
+
+            if loop.time() >= next_heartbeat:
+                next_heartbeat = loop.time() + heartbeat
+                yield b': ping\n\n'
+    finally:
+        broker.unsubscribe(user_id, subscriber)
@@ -8,5 +8,8 @@ router.register(r'alerts', views.AlertViewSet, basename='alert')
 router.register(r'export-tasks', views.ExportTaskViewSet, basename='export-task')
 
 urlpatterns = [
+    # 需在路由器之前注册，否则会被匹配为 alerts/<pk>/
+    path('alerts/stream/', views.alert_stream, name='alert-stream'),
+    path('alerts/stream/ticket/', views.alert_stream_ticket, name='alert-stream-ticket'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
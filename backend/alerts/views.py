@@ -1,11 +1,17 @@
 from rest_framework import viewsets, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.http import HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
 from datetime import datetime, timedelta
 from django.db.models import Q
 from .models import Alert, ExportTask
+from .stream import alert_events, issue_ticket, redeem_ticket
 from .serializers import (
     AlertSerializer, AlertListSerializer, 
     ExportTaskSerializer, CreateExportTaskSerializer, ExportResponseSerializer
@@ -122,6 +128,72 @@ class AlertViewSet(viewsets.ModelViewSet):
         })
 
 
+def _authenticate_stream(request):
+    """校验 Authorization 请求头中的 JWT 或 ticket 查询参数中的推送票据，返回用户或 None"""
+    if request.GET.get('ticket'):
+        user_id = redeem_ticket(request.GET['ticket'])
+        return User.objects.filter(pk=user_id, is_active=True).first() if user_id else None
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def alert_stream_ticket(request):
+    """签发预警推送票据，用于 EventSource 连接的 ticket 查询参数"""
+    ticket, expires_in = issue_ticket(request.user.id)
+    return Response({
+        'code': 200,
+        'data': {
+            'ticket': ticket,
+            'expires_in': expires_in
+        }
+    })
+
+
+async def alert_stream(request):
+    """
+    新预警推送（SSE）
+
+    浏览器的 EventSource 无法设置请求头，除 Authorization 外也接受 ?ticket=<推送票据>，
+    票据由 POST alerts/stream/ticket/ 签发，短期有效且只能使用一次；不接受查询参数中的 JWT，
+    以免长期有效的令牌被记入访问日志。断线重连时从 Last-Event-ID 请求头（或 last_event_id 参数）
+    之后续传，重连前需重新获取票据。
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+
+    user = await sync_to_async(_authenticate_stream)(request)
+    if user is None:
+        return JsonResponse(
+            {'code': 401, 'message': '身份认证信息未提供或无效'},
+            status=401, json_dumps_params={'ensure_ascii': False}
+        )
+
+    last_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    if last_id:
+        try:
+            last_id = int(last_id)
+            if last_id < 0:
+                raise ValueError
+        except ValueError:
+            return JsonResponse(
+                {'code': 400, 'message': 'Last-Event-ID 必须是非负整数'},
+                status=400, json_dumps_params={'ensure_ascii': False}
+            )
+    else:
+        last_id = None
+
+    response = StreamingHttpResponse(alert_events(user.id, last_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # 关闭 nginx 等反向代理的响应缓冲，事件到达后立即下发
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 class ExportTaskViewSet(viewsets.ModelViewSet):
     """
     数据导出任务视图集
@@ -5,6 +5,9 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+
+预警推送（/api/alerts/alerts/stream/）是长连接，需要通过 ASGI 服务部署，例如：
+    gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker
 """
 
 import os
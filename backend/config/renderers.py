@@ -0,0 +1,51 @@
+"""
+基于 orjson 的 JSON 渲染器
+
+orjson 在 C 层直接编码 dict、list、str、date、datetime、UUID 和 numpy 数组，
+比 DRF 默认的 json.dumps + JSONEncoder 快数倍。输出与 DRF JSONRenderer 保持一致：
+紧凑格式、UTF-8 不转义、UTC 时间以 Z 结尾、Decimal 输出为数字，
+其余 orjson 不认识的类型交给 DRF 的 JSONEncoder 处理。
+未安装 orjson 或请求了缩进等 orjson 不支持的格式时退回 DRF 默认实现。
+"""
+import decimal
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 未安装时退回 DRF 默认实现
+    orjson = None
+
+_fallback_encoder = encoders.JSONEncoder()
+
+
+def encode_default(obj):
+    """orjson 无法直接编码的类型：Decimal 与 DRF 一致转为浮点数，其余交给 DRF JSONEncoder"""
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    return _fallback_encoder.default(obj)
+
+
+if orjson is not None:
+    OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+class FastJSONRenderer(JSONRenderer):
+    """默认 JSON 渲染器，接口的 {code, message, data} 结构和大列表都由 orjson 一次编码"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # 需要缩进、转义非 ASCII 字符或非紧凑格式时由 DRF 处理
+        if (
+            orjson is None or self.ensure_ascii or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=encode_default, option=OPTIONS)
+        # 与 DRF 一致，转义 JavaScript 字符串中不能直接出现的 U+2028、U+2029
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
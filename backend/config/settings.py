@@ -90,6 +90,10 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # 并发写入时等待写锁的秒数，超过后才报 database is locked
+        "OPTIONS": {"timeout": 20},
+        # 测试库使用文件而非共享缓存的内存库：内存库的表级锁不等待，并发写入测试无法反映真实行为
+        "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
     }
 }
 
@@ -156,10 +160,42 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'config.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20
 }
 
+# Cache settings
+# 默认使用本地内存缓存；多进程部署可改为文件缓存，例如
+# CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache CACHE_LOCATION=/var/tmp/student-system-cache
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='student-system'),
+    }
+}
+
+# 统计接口结果缓存的过期时间（秒），数据变化由版本号失效，过期时间只用于回收空间
+STATISTICS_CACHE_TIMEOUT = config('STATISTICS_CACHE_TIMEOUT', default=600, cast=int)
+
+# 交易删除记录（增量同步墓碑）保留天数，由 compact_tombstones 命令定期清理
+TOMBSTONE_RETENTION_DAYS = config('TOMBSTONE_RETENTION_DAYS', default=30, cast=int)
+
+# 预警推送（SSE）：轮询兜底间隔、心跳间隔、单条连接最长保持时间和推送票据有效期（秒）
+ALERT_STREAM_POLL_INTERVAL = config('ALERT_STREAM_POLL_INTERVAL', default=5, cast=int)
+ALERT_STREAM_HEARTBEAT = config('ALERT_STREAM_HEARTBEAT', default=15, cast=int)
+ALERT_STREAM_MAX_DURATION = config('ALERT_STREAM_MAX_DURATION', default=300, cast=int)
+ALERT_STREAM_TICKET_TTL = config('ALERT_STREAM_TICKET_TTL', default=30, cast=int)
+
+# 预算阈值预警是否由后台线程合并处理；关闭时在事务提交回调中直接处理
+BUDGET_ALERT_ASYNC = config('BUDGET_ALERT_ASYNC', default=True, cast=bool)
+
+# 上传的流水是否由后台线程导入；关闭时在请求中直接导入
+IMPORT_ASYNC = config('IMPORT_ASYNC', default=True, cast=bool)
+
 # JWT Settings
 from datetime import timedelta
 
@@ -5,6 +5,7 @@ from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Sum, Count
 from .models import FeeCategory, FeeRecord, Payment
 from .serializers import FeeCategorySerializer, FeeRecordSerializer, PaymentSerializer
+from statistics.analytics import summarize_fee_records
 
 class FeeCategoryViewSet(viewsets.ModelViewSet):
     queryset = FeeCategory.objects.filter(is_active=True)
@@ -25,22 +26,16 @@ class FeeRecordViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def statistics(self, request):
-        total_records = FeeRecord.objects.count()
-        pending_records = FeeRecord.objects.filter(status='pending').count()
-        paid_records = FeeRecord.objects.filter(status='paid').count()
-        
-        total_amount = FeeRecord.objects.aggregate(total=Sum('amount'))['total'] or 0
-        paid_amount = FeeRecord.objects.filter(status='paid').aggregate(total=Sum('paid_amount'))['total'] or 0
-        pending_amount = FeeRecord.objects.filter(status='pending').aggregate(total=Sum('amount'))['total'] or 0
+        summary = summarize_fee_records()
         
         return Response({
-            'total_records': total_records,
-            'pending_records': pending_records,
-            'paid_records': paid_records,
-            'total_amount': total_amount,
-            'paid_amount': paid_amount,
-            'pending_amount': pending_amount,
-            'collection_rate': (paid_amount / total_amount * 100) if total_amount > 0 else 0
+            'total_records': summary.total_records,
+            'pending_records': summary.pending_records,
+            'paid_records': summary.paid_records,
+            'total_amount': summary.total_amount,
+            'paid_amount': summary.paid_amount,
+            'pending_amount': summary.pending_amount,
+            'collection_rate': summary.collection_rate
         })
 
 class PaymentViewSet(viewsets.ModelViewSet):
@@ -0,0 +1,376 @@
+"""
+统计分析服务层
+
+各统计接口共用的收支、分类、缴费汇总逻辑，返回类型化的结果对象。
+区间收支汇总读取每日分类台账；需要扫描原始记录的汇总都编译为一条
+条件聚合SQL（Sum/Count/Avg 搭配 filter=Q(...)）。
+"""
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import List, Optional
+
+from django.db.models import Sum, Count, Avg, Q
+from django.db.models.functions import TruncDay, TruncWeek, TruncMonth, TruncQuarter, TruncYear
+
+from finance.models import FeeRecord
+from transactions.models import DailyCategoryLedger, CohortLedger
+from transactions.rollups import range_totals
+
+ZERO = Decimal('0')
+
+# 趋势分桶粒度
+TRUNC_FUNCTIONS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+    'quarter': TruncQuarter,
+    'year': TruncYear,
+}
+
+# 单次趋势查询允许的最大分桶数
+MAX_TREND_BUCKETS = 1000
+
+# 群体立方体的维度及对应的台账字段
+COHORT_DIMENSIONS = {
+    'grade': ('grade',),
+    'class_name': ('class_name',),
+    'major': ('major',),
+    'category': ('category_name',),
+    'type': ('transaction_type',),
+    'year': ('year',),
+    'month': ('year', 'month'),
+}
+
+# 可用于切片过滤的维度
+COHORT_FILTERS = {
+    'grade': 'grade',
+    'class_name': 'class_name',
+    'major': 'major',
+    'category': 'category_name',
+    'type': 'transaction_type',
+}
+
+INCOME = Q(transaction_type='income')
+EXPENSE = Q(transaction_type='expense')
+
+
+@dataclass(frozen=True)
+class TransactionSummary:
+    """收支汇总"""
+    total_income: Decimal = ZERO
+    total_expense: Decimal = ZERO
+    income_count: int = 0
+    expense_count: int = 0
+
+    @property
+    def net_balance(self) -> Decimal:
+        return self.total_income - self.total_expense
+
+    @property
+    def transaction_count(self) -> int:
+        return self.income_count + self.expense_count
+
+    @property
+    def avg_transaction(self) -> Decimal:
+        if not self.transaction_count:
+            return ZERO
+        return (self.total_income + self.total_expense) / self.transaction_count
+
+
+@dataclass(frozen=True)
+class CategorySpending:
+    """单个分类的支出汇总"""
+    name: Optional[str]
+    total_amount: Decimal
+    count: int
+    avg_amount: Decimal
+
+
+@dataclass(frozen=True)
+class SpendingBreakdown:
+    """收支汇总及按支出金额降序排列的分类明细"""
+    summary: TransactionSummary
+    expense_categories: List[CategorySpending] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class TrendBucket:
+    """趋势分桶"""
+    start: date
+    end: date
+    label: str
+    income: Decimal = ZERO
+    expense: Decimal = ZERO
+
+    @property
+    def balance(self) -> Decimal:
+        return self.income - self.expense
+
+
+@dataclass(frozen=True)
+class CohortCell:
+    """群体立方体上卷后的一个单元格"""
+    dimensions: dict
+    total_amount: Decimal
+    transaction_count: int
+
+
+@dataclass(frozen=True)
+class FeeRecordSummary:
+    """缴费记录汇总"""
+    total_records: int
+    pending_records: int
+    paid_records: int
+    total_amount: Decimal
+    paid_amount: Decimal
+    pending_amount: Decimal
+
+    @property
+    def collection_rate(self):
+        if self.total_amount > 0:
+            return self.paid_amount / self.total_amount * 100
+        return 0
+
+
+def summarize_range(user, start_date=None, end_date=None) -> TransactionSummary:
+    """基于每日分类台账的累计值汇总 [start_date, end_date] 内的收支"""
+    income, expense = ZERO, ZERO
+    income_count, expense_count = 0, 0
+    for total in range_totals(user, start_date, end_date):
+        if total.transaction_type == 'income':
+            income += total.amount
+            income_count += total.count
+        elif total.transaction_type == 'expense':
+            expense += total.amount
+            expense_count += total.count
+    return TransactionSummary(income, expense, income_count, expense_count)
+
+
+def spending_breakdown(queryset) -> SpendingBreakdown:
+    """一条按分类分组的条件聚合SQL，同时得到收支汇总和支出分类明细"""
+    rows = queryset.values('category__name').annotate(
+        income_total=Sum('amount', filter=INCOME),
+        income_count=Count('id', filter=INCOME),
+        expense_total=Sum('amount', filter=EXPENSE),
+        expense_count=Count('id', filter=EXPENSE),
+        expense_avg=Avg('amount', filter=EXPENSE),
+    ).order_by()
+
+    income, expense = ZERO, ZERO
+    income_count, expense_count = 0, 0
+    categories = []
+    for row in rows:
+        income += row['income_total'] or ZERO
+        income_count += row['income_count']
+        if row['expense_count']:
+            expense += row['expense_total']
+            expense_count += row['expense_count']
+            categories.append(CategorySpending(
+                name=row['category__name'],
+                total_amount=row['expense_total'],
+                count=row['expense_count'],
+                avg_amount=row['expense_avg'],
+            ))
+    categories.sort(key=lambda category: category.total_amount, reverse=True)
+
+    return SpendingBreakdown(
+        summary=TransactionSummary(income, expense, income_count, expense_count),
+        expense_categories=categories,
+    )
+
+
+def add_months(day, months):
+    """把某月第一天前后平移若干个月"""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def parse_month(value):
+    """把 YYYY-MM 格式的月份转换为该月第一天，空值返回 None"""
+    if not value:
+        return None
+    try:
+        year, month = (int(part) for part in value.split('-'))
+        return date(year, month, 1)
+    except ValueError:
+        raise ValueError(f"无效的月份格式: {value}")
+
+
+def bucket_start(day, granularity):
+    """计算日期所在分桶的起始日"""
+    if granularity == 'day':
+        return day
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    if granularity == 'quarter':
+        return date(day.year, (day.month - 1) // 3 * 3 + 1, 1)
+    return date(day.year, 1, 1)
+
+
+def next_bucket_start(start, granularity):
+    """计算下一个分桶的起始日"""
+    if granularity == 'day':
+        return start + timedelta(days=1)
+    if granularity == 'week':
+        return start + timedelta(days=7)
+    if granularity == 'month':
+        return add_months(start, 1)
+    if granularity == 'quarter':
+        return add_months(start, 3)
+    return date(start.year + 1, 1, 1)
+
+
+def bucket_label(start, granularity):
+    """分桶显示名称"""
+    if granularity == 'day':
+        return start.isoformat()
+    if granularity == 'week':
+        year, week, _ = start.isocalendar()
+        return f"{year}-W{week:02d}"
+    if granularity == 'month':
+        return f"{start.year}-{start.month:02d}"
+    if granularity == 'quarter':
+        return f"{start.year}-Q{(start.month - 1) // 3 + 1}"
+    return str(start.year)
+
+
+def bucketed_trend(user, start_date, end_date, granularity='month') -> List[TrendBucket]:
+    """
+    按粒度统计 [start_date, end_date] 的收支趋势
+
+    所有分桶由一条 Trunc* 分组查询在每日分类台账上算出，没有数据的分桶补零。
+    """
+    if granularity not in TRUNC_FUNCTIONS:
+        raise ValueError(f"不支持的粒度: {granularity}")
+
+    starts = []
+    current = bucket_start(start_date, granularity)
+    while current <= end_date:
+        starts.append(current)
+        if len(starts) > MAX_TREND_BUCKETS:
+            raise ValueError(f"分桶数量超过上限{MAX_TREND_BUCKETS}，请缩小时间范围或增大粒度")
+        current = next_bucket_start(current, granularity)
+
+    rows = DailyCategoryLedger.objects.filter(
+        user=user,
+        date__gte=start_date,
+        date__lte=end_date
+    ).annotate(
+        bucket=TRUNC_FUNCTIONS[granularity]('date')
+    ).values('bucket').annotate(
+        income=Sum('total_amount', filter=INCOME),
+        expense=Sum('total_amount', filter=EXPENSE),
+    ).order_by()
+    totals = {row['bucket']: row for row in rows}
+
+    buckets = []
+    for start in starts:
+        row = totals.get(start, {})
+        buckets.append(TrendBucket(
+            start=max(start, start_date),
+            end=min(next_bucket_start(start, granularity) - timedelta(days=1), end_date),
+            label=bucket_label(start, granularity),
+            income=row.get('income') or ZERO,
+            expense=row.get('expense') or ZERO,
+        ))
+    return buckets
+
+
+def monthly_category_totals(user, start_date, end_date, transaction_type='expense'):
+    """
+    一条分组查询得到各分类的月度金额
+
+    返回 {分类名称: {(year, month): Decimal}}，同名分类合并。
+    """
+    rows = DailyCategoryLedger.objects.filter(
+        user=user,
+        transaction_type=transaction_type,
+        date__gte=start_date,
+        date__lte=end_date
+    ).annotate(
+        month=TruncMonth('date')
+    ).values('category__name', 'month').annotate(
+        total=Sum('total_amount')
+    ).order_by()
+
+    totals = {}
+    for row in rows:
+        months = totals.setdefault(row['category__name'], {})
+        key = (row['month'].year, row['month'].month)
+        months[key] = months.get(key, ZERO) + row['total']
+    return totals
+
+
+def cohort_rollup(group_by=(), filters=None, start_month=None, end_month=None) -> List[CohortCell]:
+    """
+    在群体收支台账上按任意维度子集切片和上卷，一条分组查询完成
+
+    group_by 取 COHORT_DIMENSIONS 的键，为空时返回总计；filters 为 {维度: 值}，
+    维度取 COHORT_FILTERS 的键；start_month/end_month 为月份第一天（含）。
+    """
+    unknown = [dimension for dimension in group_by if dimension not in COHORT_DIMENSIONS]
+    if unknown:
+        raise ValueError(f"不支持的维度: {', '.join(unknown)}")
+    filters = filters or {}
+    unknown = [dimension for dimension in filters if dimension not in COHORT_FILTERS]
+    if unknown:
+        raise ValueError(f"不支持的过滤条件: {', '.join(unknown)}")
+
+    cells = CohortLedger.objects.filter(
+        transaction_count__gt=0,
+        **{COHORT_FILTERS[dimension]: value for dimension, value in filters.items()}
+    )
+    if start_month:
+        cells = cells.filter(Q(year__gt=start_month.year) | Q(year=start_month.year, month__gte=start_month.month))
+    if end_month:
+        cells = cells.filter(Q(year__lt=end_month.year) | Q(year=end_month.year, month__lte=end_month.month))
+
+    columns = []
+    for dimension in group_by:
+        for column in COHORT_DIMENSIONS[dimension]:
+            if column not in columns:
+                columns.append(column)
+
+    measures = {'total': Sum('total_amount'), 'count': Sum('transaction_count')}
+    if not columns:
+        row = cells.aggregate(**measures)
+        return [CohortCell({}, row['total'] or ZERO, row['count'] or 0)]
+
+    rows = cells.values(*columns).annotate(**measures).order_by(*columns)
+    result = []
+    for row in rows:
+        dimensions = {}
+        for dimension in group_by:
+            if dimension == 'month':
+                dimensions[dimension] = f"{row['year']}-{row['month']:02d}"
+            else:
+                dimensions[dimension] = row[COHORT_DIMENSIONS[dimension][0]]
+        result.append(CohortCell(dimensions, row['total'], row['count']))
+    return result
+
+
+def summarize_fee_records(queryset=None) -> FeeRecordSummary:
+    """一条条件聚合SQL汇总缴费记录"""
+    if queryset is None:
+        queryset = FeeRecord.objects.all()
+    paid = Q(status='paid')
+    pending = Q(status='pending')
+    row = queryset.aggregate(
+        total_records=Count('id'),
+        pending_records=Count('id', filter=pending),
+        paid_records=Count('id', filter=paid),
+        total_amount=Sum('amount'),
+        paid_amount=Sum('paid_amount', filter=paid),
+        pending_amount=Sum('amount', filter=pending),
+    )
+    return FeeRecordSummary(
+        total_records=row['total_records'],
+        pending_records=row['pending_records'],
+        paid_records=row['paid_records'],
+        total_amount=row['total_amount'] or 0,
+        paid_amount=row['paid_amount'] or 0,
+        pending_amount=row['pending_amount'] or 0,
+    )
@@ -0,0 +1,91 @@
+"""
+统计接口结果缓存
+
+缓存键由 (用户, 接口, 规范化后的查询参数, 当天日期, 用户数据版本号) 组成。
+交易、预算、分类写入时递增版本号，旧缓存随之失效，不需要扫描或删除缓存键。
+默认使用 Django 缓存框架的 default 后端，本地内存和文件后端均可。
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.response import Response
+
+from transactions.versioning import normalize_params, request_version
+
+KEY_PREFIX = 'statistics'
+
+# 命中率统计的取值
+HIT = 'hit'
+MISS = 'miss'
+
+# 已启用缓存的接口名称
+ENDPOINTS = []
+
+
+def cache_key(user_id, endpoint, query_params, version):
+    """生成缓存键，查询参数取摘要以控制键长"""
+    params = normalize_params(query_params)
+    digest = hashlib.md5(params.encode('utf-8')).hexdigest()
+    # 默认时间范围依赖当天日期，跨天后即使数据未变也要重新计算
+    today = timezone.localdate().isoformat()
+    return f"{KEY_PREFIX}:{user_id}:{endpoint}:{today}:{version}:{digest}"
+
+
+def record(endpoint, outcome):
+    """累加某接口的命中/未命中次数"""
+    key = f"{KEY_PREFIX}:metrics:{endpoint}:{outcome}"
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            # 计数键恰好过期或被清除
+            cache.set(key, 1, timeout=None)
+
+
+def get_metrics(endpoints=None):
+    """返回 {接口: {'hit': 次数, 'miss': 次数, 'hit_rate': 命中率}}"""
+    metrics = {}
+    for endpoint in endpoints or ENDPOINTS:
+        hits = cache.get(f"{KEY_PREFIX}:metrics:{endpoint}:{HIT}", 0)
+        misses = cache.get(f"{KEY_PREFIX}:metrics:{endpoint}:{MISS}", 0)
+        total = hits + misses
+        metrics[endpoint] = {
+            HIT: hits,
+            MISS: misses,
+            'hit_rate': round(hits / total, 4) if total else 0.0,
+        }
+    return metrics
+
+
+def cached_response(view_method):
+    """
+    缓存 APIView.get 的成功响应
+
+    只缓存状态码为200的响应数据，命中时直接返回，不再执行聚合和序列化。
+    响应头 X-Cache 标明 HIT 或 MISS。
+    """
+    endpoint = view_method.__qualname__.split('.')[0]
+    ENDPOINTS.append(endpoint)
+
+    @wraps(view_method)
+    def wrapper(view, request, *args, **kwargs):
+        key = cache_key(request.user.pk, endpoint, request.query_params, request_version(request))
+    
+        data = cache.get(key)
+        if data is not None:
+            record(endpoint, HIT)
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        record(endpoint, MISS)
+        response = view_method(view, request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, getattr(settings, 'STATISTICS_CACHE_TIMEOUT', 600))
+        response['X-Cache'] = 'MISS'
+        return response
+
+    return wrapper
@@ -0,0 +1,146 @@
+"""
+财务预测引擎
+
+基于 NumPy 的批量时间序列预测。所有模型都以 (序列数, 月数) 的矩阵为输入，
+一次调用同时拟合收入、支出和各分类支出，返回点预测及预测区间。
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+MODELS = ('linear', 'seasonal', 'ets')
+
+# 预测区间对应的正态分位数
+Z_SCORES = {
+    0.8: 1.2816,
+    0.9: 1.6449,
+    0.95: 1.9600,
+    0.99: 2.5758,
+}
+
+# 季节性周期（月）
+SEASON_LENGTH = 12
+
+# 指数平滑的候选平滑系数
+ETS_ALPHAS = np.linspace(0.1, 0.9, 9)
+
+# 拟合趋势所需的最少月数
+MIN_HISTORY = 3
+
+
+@dataclass(frozen=True)
+class Forecast:
+    """批量预测结果，各数组形状均为 (序列数, 预测月数)"""
+    model: str
+    mean: np.ndarray
+    lower: np.ndarray
+    upper: np.ndarray
+
+    @property
+    def confidence(self):
+        """区间相对宽度换算的可信度，区间越窄越接近1"""
+        half_width = (self.upper - self.lower) / 2
+        scale = np.maximum(np.abs(self.mean), 1.0)
+        return np.clip(1 - half_width / scale, 0.0, 1.0)
+
+
+def _as_matrix(series):
+    values = np.asarray(series, dtype=float)
+    if values.ndim == 1:
+        values = values[np.newaxis, :]
+    return values
+
+
+def _interval(mean, se, level, non_negative):
+    z = Z_SCORES[level]
+    lower, upper = mean - z * se, mean + z * se
+    if non_negative:
+        mean, lower, upper = np.maximum(mean, 0), np.maximum(lower, 0), np.maximum(upper, 0)
+    return mean, lower, upper
+
+
+def linear_trend(series, horizon, level=0.95, non_negative=True):
+    """最小二乘线性趋势，区间取回归预测标准误"""
+    y = _as_matrix(series)
+    n = y.shape[1]
+    t = np.arange(n, dtype=float)
+    t_mean = t.mean()
+    sxx = ((t - t_mean) ** 2).sum()
+
+    y_mean = y.mean(axis=1, keepdims=True)
+    slope = ((t - t_mean) * (y - y_mean)).sum(axis=1, keepdims=True) / sxx
+    intercept = y_mean - slope * t_mean
+
+    residuals = y - (intercept + slope * t)
+    sigma = np.sqrt((residuals ** 2).sum(axis=1, keepdims=True) / max(n - 2, 1))
+
+    future = np.arange(n, n + horizon, dtype=float)
+    mean = intercept + slope * future
+    se = sigma * np.sqrt(1 + 1 / n + (future - t_mean) ** 2 / sxx)
+    return Forecast('linear', *_interval(mean, se, level, non_negative))
+
+
+def seasonal_naive(series, horizon, level=0.95, non_negative=True, season=SEASON_LENGTH):
+    """季节性朴素预测：取上一周期同月的值"""
+    y = _as_matrix(series)
+    n = y.shape[1]
+    if n <= season:
+        raise ValueError(f"季节性模型至少需要{season + 1}个月的历史数据")
+
+    steps = np.arange(horizon)
+    mean = y[:, n - season + steps % season]
+
+    residuals = y[:, season:] - y[:, :-season]
+    sigma = np.sqrt((residuals ** 2).mean(axis=1, keepdims=True))
+    se = sigma * np.sqrt(steps // season + 1)
+    return Forecast('seasonal', *_interval(mean, se, level, non_negative))
+
+
+def exponential_smoothing(series, horizon, level=0.95, non_negative=True, alphas=ETS_ALPHAS):
+    """简单指数平滑，每条序列在候选平滑系数中选一步预测误差最小者"""
+    y = _as_matrix(series)
+    n = y.shape[1]
+    alphas = np.asarray(alphas, dtype=float)[:, np.newaxis]
+
+    # 对所有 (平滑系数, 序列) 组合同时递推，形状 (候选数, 序列数)
+    state = np.repeat(y[np.newaxis, :, 0], len(alphas), axis=0)
+    sse = np.zeros_like(state)
+    for i in range(1, n):
+        error = y[:, i] - state
+        sse += error ** 2
+        state = state + alphas * error
+
+    best = sse.argmin(axis=0)
+    columns = np.arange(y.shape[0])
+    alpha = alphas[best, 0][:, np.newaxis]
+    level_value = state[best, columns][:, np.newaxis]
+    sigma = np.sqrt(sse[best, columns] / max(n - 1, 1))[:, np.newaxis]
+
+    steps = np.arange(horizon)
+    mean = np.repeat(level_value, horizon, axis=1)
+    se = sigma * np.sqrt(1 + steps * alpha ** 2)
+    return Forecast('ets', *_interval(mean, se, level, non_negative))
+
+
+def forecast(series, horizon, model='linear', level=0.95, non_negative=True):
+    """
+    批量预测入口
+
+    series 为 (序列数, 月数) 矩阵，按时间升序排列。季节性模型历史不足时退回线性趋势，
+    实际使用的模型记录在结果的 model 字段中。
+    """
+    if model not in MODELS:
+        raise ValueError(f"不支持的预测模型: {model}")
+    if level not in Z_SCORES:
+        raise ValueError(f"不支持的置信水平: {level}")
+    y = _as_matrix(series)
+    if y.shape[1] < MIN_HISTORY:
+        raise ValueError(f"至少需要{MIN_HISTORY}个月的历史数据")
+
+    if model == 'seasonal':
+        if y.shape[1] > SEASON_LENGTH:
+            return seasonal_naive(y, horizon, level, non_negative)
+        model = 'linear'
+    if model == 'ets':
+        return exponential_smoothing(y, horizon, level, non_negative)
+    return linear_trend(y, horizon, level, non_negative)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from statistics import views  # noqa: F401  导入视图以注册启用缓存的接口
+from statistics.cache import get_metrics
+
+
+class Command(BaseCommand):
+    help = '查看统计接口结果缓存的命中情况'
+
+    def handle(self, *args, **options):
+        for endpoint, metrics in get_metrics().items():
+            self.stdout.write(
+                f"{endpoint}: 命中 {metrics['hit']} 次，未命中 {metrics['miss']} 次，"
+                f"命中率 {metrics['hit_rate']:.2%}"
+            )
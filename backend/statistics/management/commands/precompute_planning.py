@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from transactions.rollups import to_date
+from statistics.planning import precompute_snapshots
+
+
+class Command(BaseCommand):
+    help = '为所有活跃用户预先计算预算建议快照（建议每晚定时执行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='并行进程数，默认等于CPU核数')
+        parser.add_argument('--chunk-size', type=int, default=200, help='每个进程任务包含的用户数')
+        parser.add_argument('--date', dest='today', help='统计截止日，格式 YYYY-MM-DD，默认今天')
+
+    def handle(self, *args, **options):
+        if options['workers'] is not None and options['workers'] < 1:
+            raise CommandError('--workers 必须大于0')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size 必须大于0')
+        try:
+            today = to_date(options.get('today')) or timezone.localdate()
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        count = precompute_snapshots(
+            today=today,
+            workers=options['workers'],
+            chunk_size=options['chunk_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'预算建议快照计算完成：{today} 共 {count} 个用户'))
@@ -0,0 +1,222 @@
+"""
+预算建议
+
+根据最近三个月的收支生成预算建议、储蓄建议和财务健康度。计算结果以快照形式
+保存在 PlanningSnapshot 中：夜间批处理用多进程为所有活跃用户预先计算，接口
+优先读取快照，快照缺失或过期时才现场计算并回写。
+
+快照记录计算前读取的用户数据版本号，读取时版本号不一致即视为过期。计算期间提交的
+写入会使版本号前进，即使回写覆盖了该写入对快照的删除，旧结果也不会再被读到。
+"""
+import multiprocessing
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connections
+from django.utils import timezone
+
+from transactions.models import Transaction, PlanningSnapshot
+from transactions.versioning import get_version
+from .analytics import spending_breakdown
+from .serializers import RecommendationSerializer
+
+# 统计窗口：上月初往前90天至今
+WINDOW_DAYS = 90
+
+SNAPSHOT_FIELDS = ['period_end', 'data_version', 'data', 'computed_at']
+
+
+def build_recommendations(user, today=None):
+    """计算用户的预算和储蓄建议，返回序列化后的数据"""
+    end_date = today or timezone.localdate()
+    start_date = end_date.replace(day=1) - timedelta(days=WINDOW_DAYS)
+
+    transactions = Transaction.objects.filter(
+        user=user,
+        date__gte=start_date,
+        date__lte=end_date
+    )
+
+    # 一次条件聚合得到收支汇总与各类别支出
+    breakdown = spending_breakdown(transactions)
+    expense_categories = breakdown.expense_categories
+
+    # 预算建议
+    budget_recommendations = []
+    for category in expense_categories[:5]:  # 取前5个主要支出类别
+        avg_amount = category.avg_amount
+
+        # 基于数据给出建议
+        if avg_amount > 1000:
+            recommended = avg_amount * Decimal('0.9')
+            reason = "支出较高，建议适当控制"
+        elif avg_amount > 500:
+            recommended = avg_amount * Decimal('0.95')
+            reason = "支出中等，建议小幅优化"
+        else:
+            recommended = avg_amount
+            reason = "支出合理，建议保持"
+
+        budget_recommendations.append({
+            'category': category.name,
+            'current_avg': avg_amount,
+            'recommended': recommended,
+            'reason': reason
+        })
+
+    # 计算总收支
+    total_income = breakdown.summary.total_income
+    total_expense = breakdown.summary.total_expense
+    net_balance = breakdown.summary.net_balance
+
+    # 储蓄建议
+    savings_advice = []
+    if net_balance > 0:
+        savings_advice.append({
+            'advice': f"本月可储蓄金额预计为{net_balance:.2f}元",
+            'amount': net_balance
+        })
+        savings_advice.append({
+            'advice': "建议将30%的结余用于紧急备用金",
+            'amount': net_balance * Decimal('0.3')
+        })
+    else:
+        savings_advice.append({
+            'advice': "当前支出超过收入，建议控制支出",
+            'amount': Decimal('0')
+        })
+
+    # 财务健康度评分
+    savings_rate = 0.0
+    if total_income > 0:
+        savings_rate = float(net_balance / total_income) * 100
+        if savings_rate >= 30:
+            health_score = 90
+            health_level = "优秀"
+        elif savings_rate >= 20:
+            health_score = 80
+            health_level = "良好"
+        elif savings_rate >= 10:
+            health_score = 70
+            health_level = "一般"
+        else:
+            health_score = 50
+            health_level = "需改善"
+    else:
+        health_score = 0
+        health_level = "无收入数据"
+
+    # 改进建议
+    improvement_suggestions = []
+    if total_expense > total_income and total_income > 0:
+        improvement_suggestions.append("支出超过收入，需要开源节流")
+    elif savings_rate < 10 and savings_rate > 0:
+        improvement_suggestions.append("储蓄率偏低，建议增加收入或控制支出")
+
+    if len(expense_categories) > 0:
+        top_category = expense_categories[0]
+        top_category_ratio = float(top_category.total_amount / total_expense) * 100
+        if top_category_ratio > 40:
+            improvement_suggestions.append(f"{top_category.name}支出占比偏高({top_category_ratio:.1f}%)")
+
+    data = {
+        'budget_recommendations': budget_recommendations,
+        'savings_advice': savings_advice,
+        'financial_health': {
+            'score': health_score,
+            'level': health_level,
+            'improvement_suggestions': improvement_suggestions
+        }
+    }
+    return RecommendationSerializer(data).data
+
+
+def get_recommendations(user, version=None):
+    """
+    优先读取当天且数据版本一致的快照，缺失或过期时现场计算并回写
+
+    version 为调用方已读取的用户数据版本号，未传入时在计算前查询。
+    """
+    today = timezone.localdate()
+    if version is None:
+        version = get_version(user.pk)
+    snapshot = PlanningSnapshot.objects.filter(user=user, period_end=today, data_version=version).first()
+    if snapshot is not None:
+        return snapshot.data
+
+    data = build_recommendations(user, today)
+    PlanningSnapshot.objects.update_or_create(
+        user=user,
+        defaults={'period_end': today, 'data_version': version, 'data': data, 'computed_at': timezone.now()}
+    )
+    return data
+
+
+def compute_chunk(user_ids, today):
+    """计算一批用户的建议，返回 PlanningSnapshot 对象列表（未保存）"""
+    snapshots = []
+    for user in User.objects.filter(id__in=user_ids):
+        version = get_version(user.id)
+        data = build_recommendations(user, today)
+        snapshots.append(PlanningSnapshot(
+            user_id=user.id,
+            period_end=today,
+            data_version=version,
+            data=dict(data),
+            computed_at=timezone.now(),
+        ))
+    return snapshots
+
+
+def _compute_chunk_in_worker(args):
+    """子进程入口：计算完毕后关闭本进程的数据库连接"""
+    try:
+        return compute_chunk(*args)
+    finally:
+        connections.close_all()
+
+
+def save_snapshots(snapshots):
+    """按用户批量写入快照，已有快照直接覆盖"""
+    PlanningSnapshot.objects.bulk_create(
+        snapshots,
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=SNAPSHOT_FIELDS,
+    )
+
+
+def precompute_snapshots(today=None, workers=None, chunk_size=200, user_ids=None):
+    """
+    为所有活跃用户预先计算建议快照，返回写入的快照数
+
+    用户按ID分块交给进程池并行计算，结果由主进程统一写库，避免多个进程争用写锁。
+    workers 为 1 时在当前进程内顺序计算。
+    """
+    today = today or timezone.localdate()
+    if user_ids is None:
+        user_ids = User.objects.filter(is_active=True).order_by('id').values_list('id', flat=True)
+    user_ids = list(user_ids)
+    chunks = [(user_ids[i:i + chunk_size], today) for i in range(0, len(user_ids), chunk_size)]
+
+    workers = workers or multiprocessing.cpu_count()
+    # 子进程依赖 fork 继承已初始化的 Django 环境，不支持 fork 的平台顺序计算
+    if workers == 1 or len(chunks) <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        results = (compute_chunk(*chunk) for chunk in chunks)
+        return sum(_save_chunk(snapshots) for snapshots in results)
+
+    # fork 前关闭连接，子进程各自建立新连接，不共享父进程的套接字
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+    with context.Pool(processes=min(workers, len(chunks))) as pool:
+        return sum(
+            _save_chunk(snapshots)
+            for snapshots in pool.imap_unordered(_compute_chunk_in_worker, chunks)
+        )
+
+
+def _save_chunk(snapshots):
+    if snapshots:
+        save_snapshots(snapshots)
+    return len(snapshots)
@@ -30,6 +30,9 @@ class TrendDataSerializer(serializers.Serializer):
     """趋势数据项序列化器"""
     year = serializers.IntegerField()
     month = serializers.IntegerField()
+    label = serializers.CharField()
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
     income = serializers.DecimalField(max_digits=12, decimal_places=2)
     expense = serializers.DecimalField(max_digits=12, decimal_places=2)
     balance = serializers.DecimalField(max_digits=12, decimal_places=2)
@@ -38,6 +41,9 @@ class TrendDataSerializer(serializers.Serializer):
 class TrendSerializer(serializers.Serializer):
     """收支趋势序列化器"""
     range = serializers.CharField()
+    granularity = serializers.CharField()
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
     periods = TrendDataSerializer(many=True)
 
 
@@ -48,12 +54,34 @@ class PredictionSerializer(serializers.Serializer):
     predicted_income = serializers.DecimalField(max_digits=12, decimal_places=2)
     predicted_expense = serializers.DecimalField(max_digits=12, decimal_places=2)
     predicted_balance = serializers.DecimalField(max_digits=12, decimal_places=2)
+    income_lower = serializers.DecimalField(max_digits=12, decimal_places=2)
+    income_upper = serializers.DecimalField(max_digits=12, decimal_places=2)
+    expense_lower = serializers.DecimalField(max_digits=12, decimal_places=2)
+    expense_upper = serializers.DecimalField(max_digits=12, decimal_places=2)
     confidence = serializers.FloatField()
 
 
+class CategoryPredictionItemSerializer(serializers.Serializer):
+    """分类支出预测项序列化器"""
+    year = serializers.IntegerField()
+    month = serializers.IntegerField()
+    predicted_expense = serializers.DecimalField(max_digits=12, decimal_places=2)
+    lower = serializers.DecimalField(max_digits=12, decimal_places=2)
+    upper = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class CategoryPredictionSerializer(serializers.Serializer):
+    """分类支出预测序列化器"""
+    category = serializers.CharField()
+    predictions = CategoryPredictionItemSerializer(many=True)
+
+
 class PredictionListSerializer(serializers.Serializer):
     """财务预测列表序列化器"""
     predictions = PredictionSerializer(many=True)
+    category_predictions = CategoryPredictionSerializer(many=True)
+    model = serializers.CharField()
+    confidence_level = serializers.FloatField()
     based_on_months = serializers.IntegerField()
 
 
@@ -84,4 +112,18 @@ class RecommendationSerializer(serializers.Serializer):
     """建议数据序列化器"""
     budget_recommendations = BudgetRecommendationSerializer(many=True)
     savings_advice = SavingsAdviceItemSerializer(many=True)
-    financial_health = FinancialHealthSerializer()
\ No newline at end of file
+    financial_health = FinancialHealthSerializer()
+
+class CohortCellSerializer(serializers.Serializer):
+    """群体立方体单元格序列化器"""
+    dimensions = serializers.DictField()
+    total_amount = serializers.DecimalField(max_digits=16, decimal_places=2)
+    transaction_count = serializers.IntegerField()
+
+
+class CohortSerializer(serializers.Serializer):
+    """群体收支分析序列化器"""
+    group_by = serializers.ListField(child=serializers.CharField())
+    cells = CohortCellSerializer(many=True)
+    total_amount = serializers.DecimalField(max_digits=16, decimal_places=2)
+    transaction_count = serializers.IntegerField()
@@ -6,6 +6,7 @@ urlpatterns = [
     path('statistics/summary/', views.StatisticsSummaryView.as_view(), name='statistics-summary'),
     path('statistics/categories/', views.StatisticsCategoriesView.as_view(), name='statistics-categories'),
     path('statistics/trend/', views.StatisticsTrendView.as_view(), name='statistics-trend'),
+    path('statistics/cohorts/', views.StatisticsCohortView.as_view(), name='statistics-cohorts'),
     
     # 数据规划接口
     path('planning/prediction/', views.PlanningPredictionView.as_view(), name='planning-prediction'),
@@ -1,18 +1,33 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.db.models import Sum, Count, Avg, Q
 from django.utils import timezone
 from datetime import datetime, timedelta, date
 from decimal import Decimal
 from transactions.models import Transaction, TransactionCategory
+from transactions.rollups import monthly_totals, iter_months, to_date
+from transactions.versioning import conditional_get, request_version
+from .analytics import (
+    summarize_range,
+    bucketed_trend,
+    add_months,
+    monthly_category_totals,
+    cohort_rollup,
+    parse_month,
+    TRUNC_FUNCTIONS,
+    COHORT_FILTERS
+)
+from .forecasting import forecast, MIN_HISTORY
+from .planning import get_recommendations
+from .cache import cached_response
 from .serializers import (
     SummarySerializer,
     CategoryStatsSerializer,
     TrendSerializer,
     PredictionListSerializer,
-    RecommendationSerializer
+    CohortSerializer
 )
 
 
@@ -20,6 +35,8 @@ class StatisticsSummaryView(APIView):
     """交易统计摘要API"""
     permission_classes = [IsAuthenticated]
     
+    @conditional_get
+    @cached_response
     def get(self, request):
         """获取交易统计摘要"""
         # 获取查询参数
@@ -28,49 +45,19 @@ class StatisticsSummaryView(APIView):
         
         # 默认查询最近30天
         if not start_date:
-            start_date = timezone.now().date() - timedelta(days=30)
+            start_date = timezone.localdate() - timedelta(days=30)
         if not end_date:
-            end_date = timezone.now().date()
-        
-        # 构建查询条件
-        filters = {
-            'user': request.user,
-            'date__gte': start_date,
-            'date__lte': end_date
-        }
+            end_date = timezone.localdate()
         
-        # 获取总收入
-        total_income = Transaction.objects.filter(
-            **filters,
-            transaction_type='income'
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-        
-        # 获取总支出
-        total_expense = Transaction.objects.filter(
-            **filters,
-            transaction_type='expense'
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-        
-        # 计算净结余
-        net_balance = total_income - total_expense
-        
-        # 获取交易总数
-        transaction_count = Transaction.objects.filter(
-            **filters
-        ).count()
-        
-        # 计算平均交易金额
-        if transaction_count > 0:
-            avg_transaction = (total_income + total_expense) / transaction_count
-        else:
-            avg_transaction = Decimal('0')
+        # 通过每日分类台账的累计值计算区间合计
+        summary = summarize_range(request.user, start_date, end_date)
         
         data = {
-            'total_income': total_income,
-            'total_expense': total_expense,
-            'net_balance': net_balance,
-            'transaction_count': transaction_count,
-            'avg_transaction': avg_transaction,
+            'total_income': summary.total_income,
+            'total_expense': summary.total_expense,
+            'net_balance': summary.net_balance,
+            'transaction_count': summary.transaction_count,
+            'avg_transaction': summary.avg_transaction,
             'date_range': {
                 'start_date': start_date,
                 'end_date': end_date
@@ -88,11 +75,13 @@ class StatisticsCategoriesView(APIView):
     """分类统计分析API"""
     permission_classes = [IsAuthenticated]
     
+    @conditional_get
+    @cached_response
     def get(self, request):
         """获取分类统计"""
         # 获取查询参数
-        year = int(request.query_params.get('year', timezone.now().year))
-        month = int(request.query_params.get('month', timezone.now().month))
+        year = int(request.query_params.get('year', timezone.localdate().year))
+        month = int(request.query_params.get('month', timezone.localdate().month))
         trans_type = request.query_params.get('type', 'expense')
         
         # 构建时间范围
@@ -157,10 +146,13 @@ class StatisticsTrendView(APIView):
     """收支趋势分析API"""
     permission_classes = [IsAuthenticated]
     
+    @conditional_get
+    @cached_response
     def get(self, request):
-        """获取收支趋势"""
+        """获取收支趋势，支持 day/week/month/quarter/year 粒度和自定义时间范围"""
         # 获取时间范围
         range_param = request.query_params.get('range', '3m')
+        granularity = request.query_params.get('granularity', 'month')
         
         range_map = {
             '1m': 1,
@@ -169,54 +161,55 @@ class StatisticsTrendView(APIView):
             '1y': 12
         }
         
-        months_back = range_map.get(range_param, 3)
-        end_date = timezone.now().date()
-        start_date = end_date.replace(day=1) - timedelta(days=30 * months_back)
-        
-        periods_data = []
-        current_date = start_date.replace(day=1)
-        end_month = end_date.replace(day=1)
-        
-        while current_date <= end_month:
-            # 计算该月的结束日期
-            if current_date.month == 12:
-                month_end = date(current_date.year + 1, 1, 1) - timedelta(days=1)
-            else:
-                month_end = date(current_date.year, current_date.month + 1, 1) - timedelta(days=1)
-            
-            # 获取该月的收支数据
-            month_transactions = Transaction.objects.filter(
-                user=request.user,
-                date__gte=current_date,
-                date__lte=month_end
-            )
-            
-            income = month_transactions.filter(
-                transaction_type='income'
-            ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-            
-            expense = month_transactions.filter(
-                transaction_type='expense'
-            ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-            
-            balance = income - expense
-            
-            periods_data.append({
-                'year': current_date.year,
-                'month': current_date.month,
-                'income': income,
-                'expense': expense,
-                'balance': balance
-            })
-            
-            # 移动到下个月
-            if current_date.month == 12:
-                current_date = current_date.replace(year=current_date.year + 1, month=1)
-            else:
-                current_date = current_date.replace(month=current_date.month + 1)
+        if granularity not in TRUNC_FUNCTIONS:
+            return Response({
+                'code': 400,
+                'message': '无效的统计粒度',
+                'errors': {'granularity': [f"可选值: {', '.join(TRUNC_FUNCTIONS)}"]}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        end_date = to_date(request.query_params.get('end_date')) or timezone.localdate()
+        start_date = to_date(request.query_params.get('start_date'))
+        if start_date:
+            range_param = 'custom'
+        else:
+            months_back = range_map.get(range_param, 3)
+            start_date = add_months(end_date.replace(day=1), -months_back)
+        
+        if start_date > end_date:
+            return Response({
+                'code': 400,
+                'message': '开始日期不能晚于结束日期'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # 一次分组查询得到所有分桶
+        try:
+            buckets = bucketed_trend(request.user, start_date, end_date, granularity)
+        except ValueError as e:
+            return Response({
+                'code': 400,
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        periods_data = [
+            {
+                'year': bucket.start.year,
+                'month': bucket.start.month,
+                'label': bucket.label,
+                'start_date': bucket.start,
+                'end_date': bucket.end,
+                'income': bucket.income,
+                'expense': bucket.expense,
+                'balance': bucket.balance
+            }
+            for bucket in buckets
+        ]
         
         data = {
             'range': range_param,
+            'granularity': granularity,
+            'start_date': start_date,
+            'end_date': end_date,
             'periods': periods_data
         }
         
@@ -227,120 +220,146 @@ class StatisticsTrendView(APIView):
         })
 
 
+class StatisticsCohortView(APIView):
+    """全校学生群体收支分析API（管理员）"""
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        """按年级、班级、专业、分类、月份、类型的任意组合切片和上卷"""
+        group_by = [
+            dimension.strip()
+            for dimension in request.query_params.get('group_by', 'grade').split(',')
+            if dimension.strip()
+        ]
+        filters = {
+            dimension: request.query_params[dimension]
+            for dimension in COHORT_FILTERS
+            if request.query_params.get(dimension)
+        }
+        # 未按类型分组时默认只看支出，避免收入与支出混在一起合计
+        if 'type' not in group_by:
+            filters.setdefault('type', 'expense')
+        
+        try:
+            start_month = parse_month(request.query_params.get('start_month'))
+            end_month = parse_month(request.query_params.get('end_month'))
+            cells = cohort_rollup(group_by, filters, start_month, end_month)
+        except ValueError as e:
+            return Response({
+                'code': 400,
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        data = {
+            'group_by': group_by,
+            'cells': cells,
+            'total_amount': sum((cell.total_amount for cell in cells), Decimal('0')),
+            'transaction_count': sum(cell.transaction_count for cell in cells)
+        }
+        
+        serializer = CohortSerializer(data)
+        return Response({
+            'code': 200,
+            'data': serializer.data
+        })
+
+
 class PlanningPredictionView(APIView):
     """财务预测API"""
     permission_classes = [IsAuthenticated]
     
+    @cached_response
     def get(self, request):
         """获取财务预测"""
-        months = int(request.query_params.get('months', 3))
-        
-        # 获取最近6个月的历史数据作为预测基础
-        end_date = timezone.now().date()
-        start_date = end_date.replace(day=1) - timedelta(days=30 * 6)
-        
-        # 获取历史数据
-        historical_data = []
-        current_date = start_date.replace(day=1)
-        end_month = end_date.replace(day=1)
-        
-        while current_date <= end_month:
-            if current_date.month == 12:
-                month_end = date(current_date.year + 1, 1, 1) - timedelta(days=1)
-            else:
-                month_end = date(current_date.year, current_date.month + 1, 1) - timedelta(days=1)
-            
-            month_transactions = Transaction.objects.filter(
-                user=request.user,
-                date__gte=current_date,
-                date__lte=month_end
-            )
-            
-            income = month_transactions.filter(
-                transaction_type='income'
-            ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-            
-            expense = month_transactions.filter(
-                transaction_type='expense'
-            ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-            
-            historical_data.append({
-                'year': current_date.year,
-                'month': current_date.month,
-                'income': float(income),
-                'expense': float(expense)
+        try:
+            months = int(request.query_params.get('months', 3))
+            history = int(request.query_params.get('history', 6))
+            level = float(request.query_params.get('level', 0.95))
+        except ValueError:
+            return Response({
+                'code': 400,
+                'message': '预测参数必须为数字'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        model = request.query_params.get('model', 'linear')
+        
+        if not 1 <= months <= 24 or not MIN_HISTORY <= history <= 36:
+            return Response({
+                'code': 400,
+                'message': f'预测月数应在1-24之间，历史月数应在{MIN_HISTORY}-36之间'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # 以已结束的完整月份作为历史数据，当月尚未结束不参与拟合
+        current_month = timezone.localdate().replace(day=1)
+        start_date = add_months(current_month, -history)
+        end_date = current_month - timedelta(days=1)
+        history_months = [(d.year, d.month) for d in iter_months(start_date, end_date)]
+        
+        monthly = monthly_totals(request.user, start_date, end_date)
+        category_monthly = monthly_category_totals(request.user, start_date, end_date)
+        category_names = sorted(category_monthly, key=lambda name: name or '')
+        
+        # 收入、支出及各分类支出组成一个矩阵，一次完成批量拟合
+        series = [
+            [float(monthly[key]['income']) if key in monthly else 0.0 for key in history_months],
+            [float(monthly[key]['expense']) if key in monthly else 0.0 for key in history_months],
+        ] + [
+            [float(category_monthly[name].get(key, 0)) for key in history_months]
+            for name in category_names
+        ]
+        
+        # 第0步对应当月，从下个月开始返回
+        try:
+            result = forecast(series, months + 1, model=model, level=level)
+        except ValueError as e:
+            return Response({
+                'code': 400,
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        confidence = result.confidence
+        
+        def money(value):
+            return Decimal(str(round(float(value), 2)))
+        
+        predictions = []
+        pred_months = [add_months(current_month, i + 1) for i in range(months)]
+        for i, pred_date in enumerate(pred_months, start=1):
+            predicted_income = result.mean[0, i]
+            predicted_expense = result.mean[1, i]
+            predictions.append({
+                'year': pred_date.year,
+                'month': pred_date.month,
+                'predicted_income': money(predicted_income),
+                'predicted_expense': money(predicted_expense),
+                'predicted_balance': money(predicted_income - predicted_expense),
+                'income_lower': money(result.lower[0, i]),
+                'income_upper': money(result.upper[0, i]),
+                'expense_lower': money(result.lower[1, i]),
+                'expense_upper': money(result.upper[1, i]),
+                'confidence': round(float(confidence[:2, i].mean()), 2)
             })
-            
-            if current_date.month == 12:
-                current_date = current_date.replace(year=current_date.year + 1, month=1)
-            else:
-                current_date = current_date.replace(month=current_date.month + 1)
         
-        # 简单的线性回归预测
-        if len(historical_data) >= 3:
-            # 计算平均增长率
-            income_values = [d['income'] for d in historical_data]
-            expense_values = [d['expense'] for d in historical_data]
-            
-            avg_income = sum(income_values) / len(income_values)
-            avg_expense = sum(expense_values) / len(expense_values)
-            
-            # 简单的趋势计算
-            income_trend = (income_values[-1] - income_values[0]) / len(income_values) if len(income_values) > 1 else 0
-            expense_trend = (expense_values[-1] - expense_values[0]) / len(expense_values) if len(expense_values) > 1 else 0
-            
-            predictions = []
-            current_date = end_date.replace(day=1)
-            
-            for i in range(months):
-                # 预测下个月
-                if current_date.month == 12:
-                    pred_date = current_date.replace(year=current_date.year + 1, month=1)
-                else:
-                    pred_date = current_date.replace(month=current_date.month + 1)
-                
-                predicted_income = max(0, avg_income + income_trend * (i + 1))
-                predicted_expense = max(0, avg_expense + expense_trend * (i + 1))
-                predicted_balance = predicted_income - predicted_expense
-                
-                # 置信度随时间递减
-                confidence = max(0.5, 0.9 - (i * 0.1))
-                
-                predictions.append({
-                    'year': pred_date.year,
-                    'month': pred_date.month,
-                    'predicted_income': Decimal(str(round(predicted_income, 2))),
-                    'predicted_expense': Decimal(str(round(predicted_expense, 2))),
-                    'predicted_balance': Decimal(str(round(predicted_balance, 2))),
-                    'confidence': confidence
-                })
-                
-                current_date = pred_date
-        else:
-            # 数据不足，使用默认值
-            predictions = []
-            current_date = end_date.replace(day=1)
-            
-            for i in range(months):
-                if current_date.month == 12:
-                    pred_date = current_date.replace(year=current_date.year + 1, month=1)
-                else:
-                    pred_date = current_date.replace(month=current_date.month + 1)
-                
-                predictions.append({
-                    'year': pred_date.year,
-                    'month': pred_date.month,
-                    'predicted_income': Decimal('0'),
-                    'predicted_expense': Decimal('0'),
-                    'predicted_balance': Decimal('0'),
-                    'confidence': 0.5
-                })
-                
-                current_date = pred_date
+        category_predictions = []
+        for row, name in enumerate(category_names, start=2):
+            category_predictions.append({
+                'category': name or '未分类',
+                'predictions': [
+                    {
+                        'year': pred_date.year,
+                        'month': pred_date.month,
+                        'predicted_expense': money(result.mean[row, i]),
+                        'lower': money(result.lower[row, i]),
+                        'upper': money(result.upper[row, i])
+                    }
+                    for i, pred_date in enumerate(pred_months, start=1)
+                ]
+            })
         
         data = {
             'predictions': predictions,
-            'based_on_months': len(historical_data)
+            'category_predictions': category_predictions,
+            'model': result.model,
+            'confidence_level': level,
+            'based_on_months': len(history_months)
         }
         
         serializer = PredictionListSerializer(data)
@@ -354,126 +373,10 @@ class PlanningRecommendationsView(APIView):
     """获取预算建议API"""
     permission_classes = [IsAuthenticated]
     
+    @cached_response
     def get(self, request):
-        """获取预算和储蓄建议"""
-        # 获取最近3个月的数据
-        end_date = timezone.now().date()
-        start_date = end_date.replace(day=1) - timedelta(days=90)
-        
-        # 获取历史交易数据
-        transactions = Transaction.objects.filter(
-            user=request.user,
-            date__gte=start_date,
-            date__lte=end_date
-        )
-        
-        # 计算各类别的平均支出
-        expense_categories = transactions.filter(
-            transaction_type='expense'
-        ).values(
-            'category__name'
-        ).annotate(
-            total_amount=Sum('amount'),
-            count=Count('id'),
-            avg_amount=Avg('amount')
-        ).order_by('-total_amount')
-        
-        # 预算建议
-        budget_recommendations = []
-        for category in expense_categories[:5]:  # 取前5个主要支出类别
-            category_name = category['category__name']
-            avg_amount = category['avg_amount']
-            
-            # 基于数据给出建议
-            if avg_amount > 1000:
-                recommended = avg_amount * Decimal('0.9')
-                reason = "支出较高，建议适当控制"
-            elif avg_amount > 500:
-                recommended = avg_amount * Decimal('0.95')
-                reason = "支出中等，建议小幅优化"
-            else:
-                recommended = avg_amount
-                reason = "支出合理，建议保持"
-            
-            budget_recommendations.append({
-                'category': category_name,
-                'current_avg': avg_amount,
-                'recommended': recommended,
-                'reason': reason
-            })
-        
-        # 计算总收支
-        total_income = transactions.filter(
-            transaction_type='income'
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-        
-        total_expense = transactions.filter(
-            transaction_type='expense'
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-        
-        net_balance = total_income - total_expense
-        
-        # 储蓄建议
-        savings_advice = []
-        if net_balance > 0:
-            savings_advice.append({
-                'advice': f"本月可储蓄金额预计为{net_balance:.2f}元",
-                'amount': net_balance
-            })
-            savings_advice.append({
-                'advice': "建议将30%的结余用于紧急备用金",
-                'amount': net_balance * Decimal('0.3')
-            })
-        else:
-            savings_advice.append({
-                'advice': "当前支出超过收入，建议控制支出",
-                'amount': Decimal('0')
-            })
-        
-        # 财务健康度评分
-        if total_income > 0:
-            savings_rate = float(net_balance / total_income) * 100
-            if savings_rate >= 30:
-                health_score = 90
-                health_level = "优秀"
-            elif savings_rate >= 20:
-                health_score = 80
-                health_level = "良好"
-            elif savings_rate >= 10:
-                health_score = 70
-                health_level = "一般"
-            else:
-                health_score = 50
-                health_level = "需改善"
-        else:
-            health_score = 0
-            health_level = "无收入数据"
-        
-        # 改进建议
-        improvement_suggestions = []
-        if total_expense > total_income and total_income > 0:
-            improvement_suggestions.append("支出超过收入，需要开源节流")
-        elif savings_rate < 10 and savings_rate > 0:
-            improvement_suggestions.append("储蓄率偏低，建议增加收入或控制支出")
-        
-        if len(expense_categories) > 0:
-            top_category = expense_categories[0]
-            top_category_ratio = float(top_category['total_amount'] / total_expense) * 100
-            if top_category_ratio > 40:
-                improvement_suggestions.append(f"{top_category['category__name']}支出占比偏高({top_category_ratio:.1f}%)")
-        
-        data = {
-            'budget_recommendations': budget_recommendations,
-            'savings_advice': savings_advice,
-            'financial_health': {
-                'score': health_score,
-                'level': health_level,
-                'improvement_suggestions': improvement_suggestions
-            }
-        }
-        
-        serializer = RecommendationSerializer(data)
+        """获取预算和储蓄建议，优先读取夜间预先计算的快照"""
         return Response({
             'code': 200,
-            'data': serializer.data
+            'data': get_recommendations(request.user, request_version(request))
         })
\ No newline at end of file
@@ -0,0 +1,157 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.recorder import MigrationRecorder
+from django.utils import timezone
+from transactions.models import Transaction, TransactionCategory
+from alerts.models import Alert, SpendingBaseline
+from alerts.anomaly import update_state, z_score, WARMUP
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+
+class EwmaStateTest(TestCase):
+    """EWMA 状态更新测试"""
+    
+    def test_first_observation(self):
+        """测试第一个样本直接作为均值"""
+        self.assertEqual(update_state(0.0, 0.0, 0, 25.0), (25.0, 0.0, 1))
+    
+    def test_incremental_update(self):
+        """测试增量更新均值和方差"""
+        mean, variance, count = update_state(10.0, 0.0, 1, 20.0, alpha=0.2)
+        
+        self.assertAlmostEqual(mean, 12.0)
+        self.assertAlmostEqual(variance, 16.0)
+        self.assertEqual(count, 2)
+    
+    def test_std_floor(self):
+        """测试方差为0时使用标准差下限"""
+        self.assertAlmostEqual(z_score(100.0, 0.0, 130.0), 3.0)
+        self.assertAlmostEqual(z_score(2.0, 0.0, 5.0), 3.0)
+
+
+class AnomalyDetectorTest(TestCase):
+    """收支异常检测测试"""
+    
+    def setUp(self):
+        """测试前准备"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.food = TransactionCategory.objects.create(
+            name='餐饮', type='expense', created_by=self.user
+        )
+        self.salary = TransactionCategory.objects.create(
+            name='兼职', type='income', created_by=self.user
+        )
+        self.today = timezone.localdate()
+    
+    def create_transaction(self, amount, category=None, transaction_type='expense', days_ago=0):
+        return Transaction.objects.create(
+            user=self.user, category=category or self.food, amount=Decimal(amount),
+            transaction_type=transaction_type, date=self.today - timedelta(days=days_ago)
+        )
+    
+    def seed(self, amounts, **kwargs):
+        for index, amount in enumerate(amounts):
+            self.create_transaction(amount, days_ago=len(amounts) - index, **kwargs)
+    
+    def test_warmup_learns_without_alerts(self):
+        """测试样本不足时只学习不预警"""
+        self.seed(['20.00'] * (WARMUP - 1) + ['500.00'])
+        
+        self.assertFalse(Alert.objects.exists())
+        self.assertEqual(SpendingBaseline.objects.get(category=self.food).observations, WARMUP)
+    
+    def test_outlier_expense_raises_alert(self):
+        """测试明显偏高的支出触发预警"""
+        self.seed(['18.00', '22.00', '20.00', '25.00', '15.00', '21.00', '19.00'])
+        
+        transaction = self.create_transaction('300.00')
+        
+        alert = Alert.objects.get(user=self.user)
+        self.assertEqual(alert.alert_type, 'expense')
+        self.assertEqual(alert.priority, 'urgent')
+        self.assertEqual(alert.related_id, transaction.id)
+        self.assertEqual(alert.related_type, 'transaction')
+        self.assertIn('餐饮', alert.title)
+    
+    def test_normal_expense_no_alert(self):
+        """测试正常波动不触发预警"""
+        self.seed(['18.00', '22.00', '20.00', '25.00', '15.00', '21.00', '19.00'])
+        
+        self.create_transaction('26.00')
+        self.create_transaction('5.00')
+        
+        self.assertFalse(Alert.objects.exists())
+    
+    def test_income_anomaly_is_informational(self):
+        """测试收入异常仅作提示"""
+        self.seed(['1000.00'] * 6, category=self.salary, transaction_type='income')
+        
+        self.create_transaction('5000.00', category=self.salary, transaction_type='income')
+        
+        alert = Alert.objects.get(user=self.user)
+        self.assertEqual(alert.alert_type, 'income')
+        self.assertEqual(alert.priority, 'info')
+    
+    def test_state_is_per_category(self):
+        """测试不同分类的基线互不影响"""
+        rent = TransactionCategory.objects.create(name='房租', type='expense', created_by=self.user)
+        self.seed(['20.00'] * 6)
+        
+        self.create_transaction('1500.00', category=rent)
+        
+        self.assertFalse(Alert.objects.exists())
+        self.assertEqual(SpendingBaseline.objects.count(), 2)
+    
+    def test_update_does_not_touch_baseline(self):
+        """测试修改交易不再次计入基线"""
+        transaction = self.create_transaction('20.00')
+        transaction.amount = Decimal('30.00')
+        transaction.save()
+        
+        self.assertEqual(SpendingBaseline.objects.get().observations, 1)
+    
+    def test_rebuild_matches_incremental(self):
+        """测试重建命令回放历史得到与增量一致的基线"""
+        self.seed(['18.00', '22.00', '20.00', '25.00'])
+        self.seed(['1000.00', '1200.00'], category=self.salary, transaction_type='income')
+        expected = {
+            (b.category_id, b.transaction_type): (b.mean, b.variance, b.observations, b.last_amount)
+            for b in SpendingBaseline.objects.all()
+        }
+        SpendingBaseline.objects.all().delete()
+        out = StringIO()
+        
+        call_command('rebuild_anomaly_baselines', stdout=out)
+        
+        self.assertIn('共 2 行', out.getvalue())
+        for baseline in SpendingBaseline.objects.all():
+            mean, variance, observations, last_amount = expected[(baseline.category_id, baseline.transaction_type)]
+            self.assertAlmostEqual(baseline.mean, mean)
+            self.assertAlmostEqual(baseline.variance, variance)
+            self.assertEqual(baseline.observations, observations)
+            self.assertEqual(baseline.last_amount, last_amount)
+
+
+class SpendingBaselineMigrationTest(TestCase):
+    """收支基线表迁移测试"""
+
+    def test_created_by_migration(self):
+        """测试预警应用的表由迁移创建，新建交易时可写入基线"""
+        applied = MigrationRecorder(connection).applied_migrations()
+        self.assertIn(('alerts', '0001_initial'), applied)
+        self.assertIn(('alerts', '0002_spending_baseline'), applied)
+
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        category = TransactionCategory.objects.create(name='餐饮', type='expense', created_by=user)
+        Transaction.objects.create(
+            user=user, category=category, amount=Decimal('20.00'),
+            transaction_type='expense', date=timezone.now().date()
+        )
+        self.assertTrue(SpendingBaseline.objects.filter(user=user, category=category).exists())
@@ -0,0 +1,203 @@
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction as db_transaction
+from django.utils import timezone
+from transactions.models import Transaction, TransactionCategory, Budget
+from transactions.budgets import BudgetChange
+from alerts.models import Alert
+from alerts import budget_alerts
+from alerts.budget_alerts import BudgetAlertEngine, coalesce, crossed_threshold, evaluate
+from datetime import timedelta
+from decimal import Decimal
+import threading
+
+
+class ThresholdTest(TestCase):
+    """阈值判断与合并测试"""
+
+    def test_crossed_threshold(self):
+        """测试只在向上跨过阈值时返回，同时跨过两个阈值时取较高的"""
+        amount = Decimal('100')
+        self.assertIsNone(crossed_threshold(amount, Decimal('50'), Decimal('89.99')))
+        self.assertEqual(crossed_threshold(amount, Decimal('89.99'), Decimal('90'))[1], 'high')
+        self.assertIsNone(crossed_threshold(amount, Decimal('90'), Decimal('95')))
+        self.assertEqual(crossed_threshold(amount, Decimal('50'), Decimal('120'))[1], 'urgent')
+        self.assertIsNone(crossed_threshold(amount, Decimal('120'), Decimal('80')))
+        self.assertIsNone(crossed_threshold(Decimal('0'), Decimal('0'), Decimal('10')))
+
+    def test_coalesce(self):
+        """测试同一预算的连续变化合并为最早的写入前金额和最新的写入后金额"""
+        changes = [
+            BudgetChange(1, 1, Decimal('100'), True, Decimal('80'), Decimal('95')),
+            BudgetChange(2, 1, Decimal('100'), True, Decimal('0'), Decimal('10')),
+            BudgetChange(1, 1, Decimal('100'), True, Decimal('95'), Decimal('85')),
+        ]
+        merged = {change.budget_id: (change.before, change.after) for change in coalesce(changes)}
+        self.assertEqual(merged, {1: (Decimal('80'), Decimal('85')), 2: (Decimal('0'), Decimal('10'))})
+
+
+@override_settings(BUDGET_ALERT_ASYNC=False)
+class BudgetAlertEngineTest(TestCase):
+    """预算阈值预警测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.food = TransactionCategory.objects.create(name='餐饮', type='expense', created_by=self.user)
+        self.today = timezone.now().date()
+        self.budget = Budget.objects.create(
+            user=self.user,
+            category=self.food,
+            amount=Decimal('100.00'),
+            start_date=self.today - timedelta(days=10),
+            end_date=self.today + timedelta(days=10)
+        )
+
+    def spend(self, amount):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Transaction.objects.create(
+                user=self.user,
+                category=self.food,
+                amount=Decimal(amount),
+                transaction_type='expense',
+                date=self.today
+            )
+
+    def alerts(self):
+        return list(Alert.objects.filter(
+            alert_type='budget', related_type='budget', related_id=self.budget.id
+        ).order_by('id').values_list('priority', flat=True))
+
+    def test_alert_only_when_crossing(self):
+        """测试跨过90%和100%时各生成一条预警，未跨过时不生成"""
+        self.spend('50.00')
+        self.assertEqual(self.alerts(), [])
+
+        self.spend('45.00')
+        self.assertEqual(self.alerts(), ['high'])
+        alert = Alert.objects.get(related_id=self.budget.id)
+        self.assertEqual(alert.title, '预算预警 - 餐饮')
+        self.assertIn('95.0%', alert.message)
+
+        self.spend('1.00')
+        self.assertEqual(self.alerts(), ['high'])
+
+        self.spend('10.00')
+        self.assertEqual(self.alerts(), ['high', 'urgent'])
+        self.assertIn('6.00元', Alert.objects.get(priority='urgent').message)
+
+    def test_no_duplicate_after_dropping_below(self):
+        """测试删除后再次跨过阈值不重复生成预警"""
+        transaction = self.spend('95.00')
+        transaction.delete()
+        self.spend('92.00')
+
+        self.assertEqual(self.alerts(), ['high'])
+
+    def test_edit_crossing_threshold(self):
+        """测试修改金额跨过阈值时生成预警"""
+        transaction = self.spend('20.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            transaction.amount = Decimal('150.00')
+            transaction.save()
+
+        self.assertEqual(self.alerts(), ['urgent'])
+
+    def test_inactive_budget(self):
+        """测试停用的预算不生成预警"""
+        self.budget.is_active = False
+        self.budget.save()
+        self.spend('120.00')
+
+        self.assertEqual(self.alerts(), [])
+
+    def test_rolled_back_write(self):
+        """测试写入回滚后不生成预警"""
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with db_transaction.atomic():
+                    Transaction.objects.create(
+                        user=self.user, category=self.food, amount=Decimal('120.00'),
+                        transaction_type='expense', date=self.today
+                    )
+                    raise ValueError
+            except ValueError:
+                pass
+
+        self.assertEqual(self.alerts(), [])
+
+    def test_evaluated_after_commit(self):
+        """测试事务提交前不生成预警"""
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            Transaction.objects.create(
+                user=self.user, category=self.food, amount=Decimal('120.00'),
+                transaction_type='expense', date=self.today
+            )
+        self.assertEqual(self.alerts(), [])
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.alerts(), ['urgent'])
+
+    def test_concurrent_evaluation_single_alert(self):
+        """测试另一个判断在本次检查已有预警之后抢先写入时，数据库拒绝重复预警"""
+        change = BudgetChange(self.budget.id, self.user.id, Decimal('100'), True, Decimal('0'), Decimal('95'))
+        describe = budget_alerts._describe
+
+        def race(*args):
+            # 模拟并发的判断在本次读取已有预警之后完成写入
+            with mock.patch('alerts.budget_alerts._describe', side_effect=describe):
+                self.assertEqual(len(evaluate([change])), 1)
+            return describe(*args)
+
+        with mock.patch('alerts.budget_alerts._describe', side_effect=race):
+            self.assertEqual(evaluate([change]), [])
+        self.assertEqual(self.alerts(), ['high'])
+
+        with self.assertRaises(IntegrityError), db_transaction.atomic():
+            Alert.objects.create(
+                user=self.user, alert_type='budget', priority='high', title='预算预警',
+                message='重复', related_id=self.budget.id, related_type='budget'
+            )
+
+    def test_burst_coalesced(self):
+        """测试队列中同一预算的连续变化合并处理，只按最终状态生成一条预警"""
+        engine = BudgetAlertEngine()
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            for amount in ['60.00', '35.00', '10.00']:
+                Transaction.objects.create(
+                    user=self.user, category=self.food, amount=Decimal(amount),
+                    transaction_type='expense', date=self.today
+                )
+        with override_settings(BUDGET_ALERT_ASYNC=True), \
+                mock.patch('alerts.budget_alerts.engine', engine), \
+                mock.patch.object(engine, '_ensure_worker'):
+            for callback in callbacks:
+                callback()
+        self.assertEqual(engine.queue.qsize(), 3)
+
+        engine.flush()
+        self.assertEqual(self.alerts(), ['urgent'])
+
+    def test_worker_batches_submissions(self):
+        """测试后台线程在合并窗口内把多次提交合并为一批处理"""
+        change = BudgetChange(self.budget.id, self.user.id, Decimal('100'), True, Decimal('0'), Decimal('10'))
+        batches = []
+        done = threading.Event()
+
+        def record(batch):
+            batches.append(batch)
+            done.set()
+
+        engine = BudgetAlertEngine(window=0.2)
+        with override_settings(BUDGET_ALERT_ASYNC=True), \
+                mock.patch('alerts.budget_alerts.evaluate', side_effect=record):
+            for _ in range(3):
+                engine.submit([change])
+            self.assertTrue(done.wait(2))
+
+        self.assertEqual(batches, [[change] * 3])
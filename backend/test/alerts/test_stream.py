@@ -0,0 +1,163 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import AsyncClient
+from django.urls import reverse
+from asgiref.sync import sync_to_async
+from rest_framework_simplejwt.tokens import RefreshToken
+from alerts.models import Alert
+from alerts.stream import alert_events, broker
+import asyncio
+import json
+
+
+class AlertStreamTest(TestCase):
+    """预警推送测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        cache.clear()
+        self.url = reverse('alert-stream')
+
+    def create_alert(self, title='预算预警', user=None, commit=False):
+        """创建预警，commit 为 True 时执行提交回调（即进程内推送）"""
+        def create():
+            with self.captureOnCommitCallbacks(execute=commit):
+                return Alert.objects.create(
+                    user=user or self.user,
+                    alert_type='budget',
+                    title=title,
+                    message='预算使用率已达到90.0%',
+                    priority='high'
+                )
+        return sync_to_async(create)()
+
+    async def next_chunk(self, events, timeout=2):
+        return await asyncio.wait_for(events.__anext__(), timeout)
+
+    def parse(self, chunk):
+        lines = dict(line.split(': ', 1) for line in chunk.decode().strip().split('\n'))
+        return int(lines['id']), json.loads(lines['data'])
+
+    async def test_push_in_process(self):
+        """测试同一进程内新预警提交后立即推送，不依赖轮询"""
+        events = alert_events(self.user.id, poll_interval=60)
+        self.assertTrue((await self.next_chunk(events)).startswith(b'retry:'))
+
+        alert = await self.create_alert(commit=True)
+        alert_id, data = self.parse(await self.next_chunk(events))
+        self.assertEqual(alert_id, alert.id)
+        self.assertEqual(data['title'], '预算预警')
+        await events.aclose()
+        self.assertFalse(broker.has_subscribers(self.user.id))
+
+    async def test_polling_fallback(self):
+        """测试收不到进程内通知时由轮询补发，且推送过的预警不重复发送"""
+        events = alert_events(self.user.id, poll_interval=0.05)
+        await self.next_chunk(events)
+
+        pushed = await self.create_alert('推送', commit=True)
+        polled = await self.create_alert('轮询')
+        self.assertEqual(self.parse(await self.next_chunk(events))[0], pushed.id)
+        self.assertEqual(self.parse(await self.next_chunk(events))[0], polled.id)
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.next_chunk(events, timeout=0.2)
+        await events.aclose()
+
+    async def test_only_own_alerts(self):
+        """测试只推送给预警所属用户"""
+        other = await sync_to_async(User.objects.create_user)(username='other', password='testpass123')
+        events = alert_events(self.user.id, poll_interval=0.05)
+        await self.next_chunk(events)
+
+        await self.create_alert(user=other, commit=True)
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.next_chunk(events, timeout=0.2)
+        await events.aclose()
+
+    async def test_resume_from_last_event_id(self):
+        """测试带 Last-Event-ID 重连时补发之后的预警"""
+        first = await self.create_alert('第一条')
+        second = await self.create_alert('第二条')
+
+        events = alert_events(self.user.id, last_id=first.id, poll_interval=60)
+        await self.next_chunk(events)
+        self.assertEqual(self.parse(await self.next_chunk(events))[0], second.id)
+        await events.aclose()
+
+    async def test_heartbeat_and_max_duration(self):
+        """测试空闲时发送心跳，超过最长保持时间后结束"""
+        events = alert_events(self.user.id, poll_interval=60, heartbeat=0.05, max_duration=0.3)
+        await self.next_chunk(events)
+
+        self.assertEqual(await self.next_chunk(events), b': ping\n\n')
+        with self.assertRaises(StopAsyncIteration):
+            while True:
+                await self.next_chunk(events)
+
+    async def test_view_requires_token(self):
+        """测试未认证返回401，查询参数中的 JWT 不被接受"""
+        response = await AsyncClient().get(self.url)
+        self.assertEqual(response.status_code, 401)
+
+        response = await AsyncClient().get(self.url, {'ticket': 'invalid'})
+        self.assertEqual(response.status_code, 401)
+
+        token = await sync_to_async(lambda: str(RefreshToken.for_user(self.user).access_token))()
+        response = await AsyncClient().get(self.url, {'token': token})
+        self.assertEqual(response.status_code, 401)
+
+    async def ticket(self):
+        token = await sync_to_async(lambda: str(RefreshToken.for_user(self.user).access_token))()
+        response = await AsyncClient().post(
+            reverse('alert-stream-ticket'), headers={'Authorization': f'Bearer {token}'}
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']['ticket']
+
+    async def test_ticket_requires_authentication(self):
+        """测试签发票据需要认证"""
+        response = await AsyncClient().post(reverse('alert-stream-ticket'))
+        self.assertEqual(response.status_code, 401)
+
+    async def test_ticket_single_use_and_expires(self):
+        """测试票据只能使用一次，过期后失效"""
+        ticket = await self.ticket()
+        response = await AsyncClient().get(self.url, {'ticket': ticket})
+        self.assertEqual(response.status_code, 200)
+        await response.streaming_content.aclose()
+
+        response = await AsyncClient().get(self.url, {'ticket': ticket})
+        self.assertEqual(response.status_code, 401)
+
+        ticket = await self.ticket()
+        with override_settings(ALERT_STREAM_TICKET_TTL=-1):
+            response = await AsyncClient().get(self.url, {'ticket': ticket})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_view_streams_events(self):
+        """测试通过推送票据建立连接并按 Last-Event-ID 续传"""
+        alert = await self.create_alert()
+        ticket = await self.ticket()
+
+        response = await AsyncClient().get(self.url, {'ticket': ticket, 'last_event_id': alert.id - 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+
+        content = response.streaming_content
+        await self.next_chunk(content)
+        self.assertEqual(self.parse(await self.next_chunk(content))[0], alert.id)
+        await content.aclose()
+
+    async def test_view_rejects_invalid_last_event_id(self):
+        """测试无效的 Last-Event-ID 返回400"""
+        token = await sync_to_async(lambda: str(RefreshToken.for_user(self.user).access_token))()
+        response = await AsyncClient().get(
+            self.url, headers={'Authorization': f'Bearer {token}', 'Last-Event-ID': 'abc'}
+        )
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1 @@
+# 统计模块测试包初始化文件
\ No newline at end of file
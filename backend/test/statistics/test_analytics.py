@@ -0,0 +1,122 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from transactions.models import Transaction, TransactionCategory
+from students.models import Student
+from finance.models import FeeCategory, FeeRecord
+from statistics.analytics import summarize_range, spending_breakdown, summarize_fee_records
+from statistics.planning import build_recommendations
+from datetime import date, timedelta
+from decimal import Decimal
+
+
+class AnalyticsServiceTest(TestCase):
+    """统计分析服务层测试"""
+    
+    def setUp(self):
+        """测试前准备"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.food = TransactionCategory.objects.create(
+            name='餐饮', type='expense', created_by=self.user
+        )
+        self.rent = TransactionCategory.objects.create(
+            name='房租', type='expense', created_by=self.user
+        )
+        self.salary = TransactionCategory.objects.create(
+            name='兼职', type='income', created_by=self.user
+        )
+        today = timezone.localdate()
+        for amount in ['30.00', '50.00']:
+            Transaction.objects.create(
+                user=self.user, category=self.food, amount=Decimal(amount),
+                transaction_type='expense', date=today
+            )
+        Transaction.objects.create(
+            user=self.user, category=self.rent, amount=Decimal('800.00'),
+            transaction_type='expense', date=today - timedelta(days=3)
+        )
+        Transaction.objects.create(
+            user=self.user, category=self.salary, amount=Decimal('2000.00'),
+            transaction_type='income', date=today - timedelta(days=1)
+        )
+    
+    def test_summarize_range(self):
+        """测试区间收支汇总"""
+        summary = summarize_range(self.user)
+        
+        self.assertEqual(summary.total_income, Decimal('2000.00'))
+        self.assertEqual(summary.total_expense, Decimal('880.00'))
+        self.assertEqual(summary.net_balance, Decimal('1120.00'))
+        self.assertEqual(summary.transaction_count, 4)
+        self.assertEqual(summary.avg_transaction, Decimal('720.00'))
+    
+    def test_spending_breakdown_single_query(self):
+        """测试分类明细与收支汇总一次查询完成"""
+        with self.assertNumQueries(1):
+            breakdown = spending_breakdown(Transaction.objects.filter(user=self.user))
+        
+        self.assertEqual(breakdown.summary.total_income, Decimal('2000.00'))
+        self.assertEqual(breakdown.summary.expense_count, 3)
+        self.assertEqual(
+            [(c.name, c.total_amount, c.count) for c in breakdown.expense_categories],
+            [('房租', Decimal('800.00'), 1), ('餐饮', Decimal('80.00'), 2)]
+        )
+        self.assertEqual(breakdown.expense_categories[1].avg_amount, Decimal('40.00'))
+    
+    def test_recommendations_single_query(self):
+        """测试预算建议计算只查询一次"""
+        with self.assertNumQueries(1):
+            data = build_recommendations(self.user)
+        
+        self.assertEqual(data['budget_recommendations'][0]['category'], '房租')
+        self.assertEqual(data['financial_health']['score'], 90)
+    
+    def test_recommendations_without_income(self):
+        """测试没有收入数据时返回默认健康度"""
+        Transaction.objects.filter(transaction_type='income').delete()
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        
+        response = client.get(reverse('planning-recommendations'))
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['financial_health']['level'], '无收入数据')
+
+
+class FeeRecordSummaryTest(TestCase):
+    """缴费记录汇总测试"""
+    
+    def setUp(self):
+        """测试前准备"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        student = Student.objects.create(
+            user=self.user, student_id='2024001', name='张三', gender='M'
+        )
+        category = FeeCategory.objects.create(name='学费', amount=Decimal('5000.00'))
+        FeeRecord.objects.create(
+            student=student, category=category, amount=Decimal('5000.00'),
+            paid_amount=Decimal('5000.00'), status='paid', due_date=date(2024, 9, 1)
+        )
+        FeeRecord.objects.create(
+            student=student, category=category, amount=Decimal('3000.00'),
+            status='pending', due_date=date(2024, 10, 1)
+        )
+    
+    def test_fee_statistics_single_query(self):
+        """测试缴费统计一次查询完成"""
+        with self.assertNumQueries(1):
+            summary = summarize_fee_records()
+        
+        self.assertEqual(summary.total_records, 2)
+        self.assertEqual(summary.paid_records, 1)
+        self.assertEqual(summary.pending_amount, Decimal('3000.00'))
+        self.assertEqual(summary.collection_rate, Decimal('62.5'))
@@ -0,0 +1,180 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from transactions.models import Transaction, TransactionCategory, Budget, DataVersion
+from transactions.versioning import get_version, bump_versions
+from statistics.cache import get_metrics
+from datetime import timedelta
+from decimal import Decimal
+
+
+class DataVersionTest(TestCase):
+    """用户数据版本号测试"""
+    
+    def setUp(self):
+        """测试前准备"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.other = User.objects.create_user(
+            username='otheruser',
+            password='testpass123'
+        )
+        self.category = TransactionCategory.objects.create(
+            name='餐饮', type='expense', created_by=self.other
+        )
+    
+    def create_transaction(self, user, amount='10.00'):
+        return Transaction.objects.create(
+            user=user, category=self.category, amount=Decimal(amount),
+            transaction_type='expense', date=timezone.localdate()
+        )
+    
+    def test_transaction_writes_bump_version(self):
+        """测试交易新增、修改、删除都会改变版本号"""
+        versions = [get_version(self.user.id)]
+        transaction = self.create_transaction(self.user)
+        versions.append(get_version(self.user.id))
+        transaction.amount = Decimal('20.00')
+        transaction.save()
+        versions.append(get_version(self.user.id))
+        transaction.delete()
+        versions.append(get_version(self.user.id))
+        
+        self.assertEqual(len(set(versions)), 4)
+        self.assertEqual(DataVersion.objects.get(user=self.user).version, 3)
+    
+    def test_budget_write_bumps_version(self):
+        """测试预算写入改变版本号"""
+        before = get_version(self.user.id)
+        today = timezone.localdate()
+        Budget.objects.create(
+            user=self.user, category=self.category, amount=Decimal('500.00'),
+            start_date=today, end_date=today + timedelta(days=30)
+        )
+        
+        self.assertNotEqual(get_version(self.user.id), before)
+    
+    def test_category_change_bumps_referencing_users(self):
+        """测试分类修改影响引用该分类的用户"""
+        self.create_transaction(self.user)
+        before = get_version(self.user.id)
+        
+        self.category.color = '#ff0000'
+        self.category.save()
+        
+        self.assertNotEqual(get_version(self.user.id), before)
+    
+    def test_other_user_write_keeps_version(self):
+        """测试其他用户的写入不影响本用户版本号"""
+        self.create_transaction(self.user)
+        before = get_version(self.user.id)
+        
+        self.create_transaction(self.other)
+        
+        self.assertEqual(get_version(self.user.id), before)
+    
+    def test_delete_user_with_transactions(self):
+        """测试级联删除用户时不会为其重新建立版本记录"""
+        self.create_transaction(self.user)
+        
+        self.user.delete()
+        
+        self.assertFalse(DataVersion.objects.filter(user_id=self.user.id).exists())
+    
+    def test_bump_without_create(self):
+        """测试只更新已有记录"""
+        bump_versions([self.user.id], create=False)
+        
+        self.assertEqual(get_version(self.user.id), '0')
+
+
+class StatisticsCacheTest(TestCase):
+    """统计接口结果缓存测试"""
+    
+    def setUp(self):
+        """测试前准备"""
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.category = TransactionCategory.objects.create(
+            name='餐饮', type='expense', created_by=self.user
+        )
+        self.create_transaction('30.00')
+        self.url = reverse('statistics-summary')
+    
+    def create_transaction(self, amount):
+        return Transaction.objects.create(
+            user=self.user, category=self.category, amount=Decimal(amount),
+            transaction_type='expense', date=timezone.localdate()
+        )
+    
+    def test_repeat_request_hits_cache(self):
+        """测试重复请求命中缓存，只查询版本号"""
+        first = self.client.get(self.url)
+        
+        with self.assertNumQueries(1):
+            second = self.client.get(self.url)
+        
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+    
+    def test_query_params_normalized(self):
+        """测试查询参数顺序不同命中同一缓存"""
+        today = timezone.localdate().isoformat()
+        self.client.get(f"{self.url}?start_date={today}&end_date={today}")
+        
+        response = self.client.get(f"{self.url}?end_date={today}&start_date={today}")
+        
+        self.assertEqual(response['X-Cache'], 'HIT')
+    
+    def test_write_invalidates_cache(self):
+        """测试新增交易后缓存失效并返回最新数据"""
+        self.client.get(self.url)
+        self.create_transaction('70.00')
+        
+        response = self.client.get(self.url)
+        
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['data']['total_expense'], '100.00')
+    
+    def test_cache_is_per_user(self):
+        """测试不同用户互不共享缓存"""
+        self.client.get(self.url)
+        other = User.objects.create_user(username='otheruser', password='testpass123')
+        self.client.force_authenticate(user=other)
+        
+        response = self.client.get(self.url)
+        
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['data']['total_expense'], '0.00')
+    
+    def test_error_response_not_cached(self):
+        """测试错误响应不缓存"""
+        url = reverse('statistics-trend')
+        self.client.get(url, {'granularity': 'hour'})
+        
+        response = self.client.get(url, {'granularity': 'hour'})
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response['X-Cache'], 'MISS')
+    
+    def test_hit_miss_metrics(self):
+        """测试命中统计"""
+        for _ in range(3):
+            self.client.get(self.url)
+        
+        metrics = get_metrics()['StatisticsSummaryView']
+        self.assertEqual(metrics['miss'], 1)
+        self.assertEqual(metrics['hit'], 2)
+        self.assertAlmostEqual(metrics['hit_rate'], 0.6667)
@@ -0,0 +1,201 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from transactions.models import Transaction, TransactionCategory, CohortLedger
+from transactions.rollups import rebuild_cohort_ledger
+from students.models import Student
+from statistics.analytics import cohort_rollup
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+
+class CohortCubeTest(TestCase):
+    """学生群体收支立方体测试"""
+    
+    def setUp(self):
+        """测试前准备"""
+        self.admin = User.objects.create_user(
+            username='admin',
+            password='testpass123',
+            is_staff=True
+        )
+        self.food = TransactionCategory.objects.create(
+            name='餐饮', type='expense', created_by=self.admin
+        )
+        self.books = TransactionCategory.objects.create(
+            name='学习', type='expense', created_by=self.admin
+        )
+        self.alice = self.create_student('alice', '2023', '1班', '计算机')
+        self.bob = self.create_student('bob', '2023', '2班', '计算机')
+        self.carol = self.create_student('carol', '2024', '1班', '数学')
+        self.guest = User.objects.create_user(username='guest', password='testpass123')
+        
+        self.create_transaction(self.alice, self.food, '30.00', date(2024, 3, 1))
+        self.create_transaction(self.alice, self.books, '120.00', date(2024, 4, 2))
+        self.create_transaction(self.bob, self.food, '50.00', date(2024, 3, 15))
+        self.create_transaction(self.carol, self.food, '20.00', date(2024, 4, 20))
+        self.create_transaction(self.guest, self.food, '999.00', date(2024, 3, 1))
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+        self.url = reverse('statistics-cohorts')
+    
+    def create_student(self, username, grade, class_name, major):
+        user = User.objects.create_user(username=username, password='testpass123')
+        Student.objects.create(
+            user=user, student_id=f'S-{username}', name=username, gender='O',
+            grade=grade, class_name=class_name, major=major
+        )
+        return user
+    
+    def create_transaction(self, user, category, amount, day, transaction_type='expense'):
+        return Transaction.objects.create(
+            user=user, category=category, amount=Decimal(amount),
+            transaction_type=transaction_type, date=day
+        )
+    
+    def rollup(self, *group_by, **filters):
+        return {
+            tuple(cell.dimensions.values()): (cell.total_amount, cell.transaction_count)
+            for cell in cohort_rollup(group_by, filters)
+        }
+    
+    def cube_rows(self):
+        return sorted(CohortLedger.objects.filter(transaction_count__gt=0).values_list(
+            'grade', 'class_name', 'major', 'category_name', 'year', 'month',
+            'transaction_type', 'total_amount', 'transaction_count'
+        ))
+    
+    def test_rollup_by_grade(self):
+        """测试按年级上卷，没有学生档案的用户不计入"""
+        self.assertEqual(self.rollup('grade'), {
+            ('2023',): (Decimal('200.00'), 3),
+            ('2024',): (Decimal('20.00'), 1),
+        })
+    
+    def test_slice_and_multiple_dimensions(self):
+        """测试按专业、月份分组并按分类切片"""
+        self.assertEqual(self.rollup('major', 'month', category='餐饮'), {
+            ('计算机', '2024-03'): (Decimal('80.00'), 2),
+            ('数学', '2024-04'): (Decimal('20.00'), 1),
+        })
+    
+    def test_grand_total(self):
+        """测试不分组时返回总计"""
+        self.assertEqual(self.rollup(), {(): (Decimal('220.00'), 4)})
+    
+    def test_transaction_update_moves_cell(self):
+        """测试修改交易后立方体增量更新"""
+        transaction = Transaction.objects.get(user=self.bob)
+        transaction.amount = Decimal('80.00')
+        transaction.date = date(2024, 4, 1)
+        transaction.save()
+        
+        self.assertEqual(self.rollup('class_name', 'month', grade='2023'), {
+            ('1班', '2024-03'): (Decimal('30.00'), 1),
+            ('1班', '2024-04'): (Decimal('120.00'), 1),
+            ('2班', '2024-04'): (Decimal('80.00'), 1),
+        })
+    
+    def test_student_change_moves_contribution(self):
+        """测试学生转专业后其收支移到新的群体"""
+        student = Student.objects.get(user=self.alice)
+        student.major = '数学'
+        student.save()
+        
+        self.assertEqual(self.rollup('major'), {
+            ('数学',): (Decimal('170.00'), 3),
+            ('计算机',): (Decimal('50.00'), 1),
+        })
+    
+    def test_new_student_profile_adds_history(self):
+        """测试为已有交易的用户建立学生档案后计入其历史收支"""
+        Student.objects.create(
+            user=self.guest, student_id='S-guest', name='guest', gender='O',
+            grade='2024', class_name='3班', major='数学'
+        )
+        
+        self.assertEqual(self.rollup('grade')[('2024',)], (Decimal('1019.00'), 2))
+    
+    def test_incremental_matches_rebuild(self):
+        """测试删除学生、删除用户后的增量结果与重建一致"""
+        Student.objects.get(user=self.bob).delete()
+        self.carol.delete()
+        incremental = self.cube_rows()
+        
+        rebuild_cohort_ledger()
+        
+        self.assertEqual(incremental, self.cube_rows())
+        self.assertEqual(self.rollup('grade'), {('2023',): (Decimal('150.00'), 2)})
+    
+    def test_same_name_categories_share_cells(self):
+        """测试各用户自建的同名分类归入同一行，分类改名后收支移到新名称"""
+        carol_food = TransactionCategory.objects.create(name='餐饮', type='expense', created_by=self.carol)
+        self.create_transaction(self.carol, carol_food, '10.00', date(2024, 4, 21))
+
+        self.assertEqual(CohortLedger.objects.filter(grade='2024', category_name='餐饮').count(), 1)
+        self.assertEqual(self.rollup('category', grade='2024'), {('餐饮',): (Decimal('30.00'), 2)})
+
+        carol_food.name = '伙食'
+        carol_food.save()
+        self.assertEqual(self.rollup('category'), {
+            ('伙食',): (Decimal('10.00'), 1),
+            ('学习',): (Decimal('120.00'), 1),
+            ('餐饮',): (Decimal('100.00'), 3),
+        })
+        incremental = self.cube_rows()
+        rebuild_cohort_ledger()
+        self.assertEqual(incremental, self.cube_rows())
+
+    def test_api_rollup(self):
+        """测试管理员接口按维度上卷，默认只统计支出"""
+        self.create_transaction(self.alice, self.food, '500.00', date(2024, 3, 2), 'income')
+        
+        response = self.client.get(self.url, {'group_by': 'grade,class_name', 'start_month': '2024-04'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data['data']
+        self.assertEqual(data['group_by'], ['grade', 'class_name'])
+        self.assertEqual(
+            [(cell['dimensions'], cell['total_amount']) for cell in data['cells']],
+            [({'grade': '2023', 'class_name': '1班'}, '120.00'),
+             ({'grade': '2024', 'class_name': '1班'}, '20.00')]
+        )
+        self.assertEqual(data['total_amount'], '140.00')
+        self.assertEqual(data['transaction_count'], 2)
+    
+    def test_api_group_by_type(self):
+        """测试按类型分组时同时返回收入与支出"""
+        self.create_transaction(self.alice, self.food, '500.00', date(2024, 3, 2), 'income')
+        
+        response = self.client.get(self.url, {'group_by': 'type'})
+        
+        types = [cell['dimensions']['type'] for cell in response.data['data']['cells']]
+        self.assertEqual(types, ['expense', 'income'])
+    
+    def test_api_invalid_dimension(self):
+        """测试不支持的维度返回400"""
+        response = self.client.get(self.url, {'group_by': 'gender'})
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_api_requires_admin(self):
+        """测试普通用户无权访问"""
+        self.client.force_authenticate(user=self.alice)
+        
+        response = self.client.get(self.url)
+        
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+    
+    def test_rebuild_command(self):
+        """测试全量重建命令同时重建群体台账"""
+        CohortLedger.objects.all().delete()
+        out = StringIO()
+        
+        call_command('rebuild_ledger', stdout=out)
+        
+        self.assertIn('群体收支台账重建完成', out.getvalue())
+        self.assertEqual(self.rollup('grade')[('2023',)], (Decimal('200.00'), 3))
@@ -0,0 +1,92 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from transactions.models import Transaction, TransactionCategory
+from decimal import Decimal
+
+
+class ConditionalGetTest(TestCase):
+    """统计接口与交易列表的 ETag 条件请求测试"""
+    
+    def setUp(self):
+        """测试前准备"""
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.category = TransactionCategory.objects.create(
+            name='餐饮', type='expense', created_by=self.user
+        )
+        self.create_transaction('30.00')
+    
+    def create_transaction(self, amount):
+        return Transaction.objects.create(
+            user=self.user, category=self.category, amount=Decimal(amount),
+            transaction_type='expense', date=timezone.localdate()
+        )
+    
+    def test_endpoints_emit_etag(self):
+        """测试各接口返回强 ETag 并要求重新验证"""
+        for name in ['statistics-summary', 'statistics-categories', 'statistics-trend', 'transaction-list']:
+            response = self.client.get(reverse(name))
+            
+            self.assertEqual(response.status_code, status.HTTP_200_OK, name)
+            self.assertTrue(response['ETag'].startswith('"'), name)
+            self.assertIn('no-cache', response['Cache-Control'])
+            self.assertIn('private', response['Cache-Control'])
+    
+    def test_matching_etag_returns_304(self):
+        """测试 ETag 匹配时返回304且只查询版本号"""
+        for name in ['statistics-summary', 'statistics-categories', 'statistics-trend', 'transaction-list']:
+            url = reverse(name)
+            etag = self.client.get(url)['ETag']
+            
+            with self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED, name)
+            self.assertEqual(response['ETag'], etag)
+            self.assertFalse(response.content)
+    
+    def test_weak_and_multiple_etags(self):
+        """测试 If-None-Match 中的弱 ETag 和多个候选值"""
+        url = reverse('statistics-summary')
+        etag = self.client.get(url)['ETag']
+        
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=f'"stale", W/{etag}')
+        
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    def test_write_changes_etag(self):
+        """测试新增交易后 ETag 变化并返回完整数据"""
+        url = reverse('transaction-list')
+        etag = self.client.get(url)['ETag']
+        self.create_transaction('70.00')
+        
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['count'], 2)
+    
+    def test_etag_depends_on_query_params(self):
+        """测试不同查询参数得到不同 ETag"""
+        url = reverse('statistics-categories')
+        expense = self.client.get(url, {'type': 'expense'})['ETag']
+        income = self.client.get(url, {'type': 'income'})['ETag']
+        
+        self.assertNotEqual(expense, income)
+    
+    def test_error_response_has_no_etag(self):
+        """测试错误响应不带 ETag"""
+        response = self.client.get(reverse('statistics-trend'), {'granularity': 'hour'})
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(response.has_header('ETag'))
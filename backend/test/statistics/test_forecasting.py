@@ -0,0 +1,126 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from transactions.models import Transaction, TransactionCategory
+from statistics.analytics import add_months
+from statistics.forecasting import forecast, linear_trend, seasonal_naive, exponential_smoothing
+from decimal import Decimal
+import numpy as np
+
+
+class ForecastingEngineTest(TestCase):
+    """预测引擎测试"""
+    
+    def test_linear_trend_recovers_exact_line(self):
+        """测试线性趋势可精确外推无噪声序列"""
+        series = np.array([[10, 20, 30, 40, 50], [100, 100, 100, 100, 100]])
+        result = linear_trend(series, 2)
+        
+        np.testing.assert_allclose(result.mean, [[60, 70], [100, 100]])
+        np.testing.assert_allclose(result.lower, result.upper)
+        np.testing.assert_allclose(result.confidence, 1.0)
+    
+    def test_interval_widens_with_horizon(self):
+        """测试预测区间随预测期延长而变宽"""
+        rng = np.random.default_rng(0)
+        series = 500 + rng.normal(0, 50, size=(3, 12))
+        for model in ('linear', 'ets'):
+            result = forecast(series, 6, model=model)
+            width = result.upper - result.lower
+            self.assertTrue(np.all(np.diff(width, axis=1) >= 0), model)
+            self.assertTrue(np.all(result.lower <= result.mean))
+            self.assertTrue(np.all(result.mean <= result.upper))
+    
+    def test_seasonal_naive_repeats_last_season(self):
+        """测试季节性模型重复上一周期"""
+        season = np.arange(12, dtype=float)
+        series = np.concatenate([season, season + 1])[np.newaxis, :]
+        result = seasonal_naive(series, 3)
+        
+        np.testing.assert_allclose(result.mean, [[1, 2, 3]])
+    
+    def test_seasonal_falls_back_to_linear(self):
+        """测试历史不足一个周期时季节性模型退回线性趋势"""
+        result = forecast([[1, 2, 3, 4]], 2, model='seasonal')
+        
+        self.assertEqual(result.model, 'linear')
+    
+    def test_exponential_smoothing_constant_series(self):
+        """测试平稳序列的指数平滑预测"""
+        result = exponential_smoothing([[80, 80, 80, 80]], 3)
+        
+        np.testing.assert_allclose(result.mean, [[80, 80, 80]])
+    
+    def test_forecast_is_non_negative(self):
+        """测试收支预测不会出现负值"""
+        result = forecast([[50, 30, 10, 0]], 3)
+        
+        self.assertTrue(np.all(result.mean >= 0))
+        self.assertTrue(np.all(result.lower >= 0))
+    
+    def test_invalid_arguments(self):
+        """测试非法模型与历史不足"""
+        with self.assertRaises(ValueError):
+            forecast([[1, 2, 3]], 1, model='arima')
+        with self.assertRaises(ValueError):
+            forecast([[1, 2]], 1)
+
+
+class PlanningPredictionViewTest(TestCase):
+    """财务预测接口测试"""
+    
+    def setUp(self):
+        """测试前准备"""
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        food = TransactionCategory.objects.create(name='餐饮', type='expense', created_by=self.user)
+        books = TransactionCategory.objects.create(name='书籍', type='expense', created_by=self.user)
+        salary = TransactionCategory.objects.create(name='兼职', type='income', created_by=self.user)
+        current_month = timezone.localdate().replace(day=1)
+        for i in range(1, 7):
+            month = add_months(current_month, -i)
+            Transaction.objects.create(
+                user=self.user, category=food, amount=Decimal(1000 - i * 50),
+                transaction_type='expense', date=month
+            )
+            Transaction.objects.create(
+                user=self.user, category=books, amount=Decimal('100.00'),
+                transaction_type='expense', date=month
+            )
+            Transaction.objects.create(
+                user=self.user, category=salary, amount=Decimal('2000.00'),
+                transaction_type='income', date=month
+            )
+    
+    def test_prediction_with_intervals_and_categories(self):
+        """测试预测包含区间与分类预测"""
+        response = self.client.get(reverse('planning-prediction'), {'months': 2})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data['data']
+        self.assertEqual(data['model'], 'linear')
+        self.assertEqual(data['based_on_months'], 6)
+        self.assertEqual(len(data['predictions']), 2)
+        
+        first = data['predictions'][0]
+        # 餐饮每月递增50，书籍恒定100：当月为1100，下月为1150
+        self.assertEqual(Decimal(first['predicted_expense']), Decimal('1150.00'))
+        self.assertEqual(Decimal(first['predicted_income']), Decimal('2000.00'))
+        self.assertEqual(first['confidence'], 1.0)
+        
+        categories = {c['category']: c['predictions'] for c in data['category_predictions']}
+        self.assertEqual(set(categories), {'餐饮', '书籍'})
+        self.assertEqual(Decimal(categories['书籍'][1]['predicted_expense']), Decimal('100.00'))
+    
+    def test_invalid_model(self):
+        """测试无效预测模型返回400"""
+        response = self.client.get(reverse('planning-prediction'), {'model': 'arima'})
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,143 @@
+from unittest import mock
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from transactions.models import Transaction, TransactionCategory, PlanningSnapshot
+from statistics import planning
+from statistics.planning import build_recommendations, get_recommendations, precompute_snapshots
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+
+class PlanningSnapshotTest(TestCase):
+    """预算建议快照测试"""
+    
+    def setUp(self):
+        """测试前准备"""
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.other = User.objects.create_user(
+            username='otheruser',
+            password='testpass123'
+        )
+        self.food = TransactionCategory.objects.create(
+            name='餐饮', type='expense', created_by=self.user
+        )
+        self.salary = TransactionCategory.objects.create(
+            name='兼职', type='income', created_by=self.user
+        )
+        self.today = timezone.localdate()
+        for user in (self.user, self.other):
+            Transaction.objects.create(
+                user=user, category=self.food, amount=Decimal('300.00'),
+                transaction_type='expense', date=self.today
+            )
+            Transaction.objects.create(
+                user=user, category=self.salary, amount=Decimal('1000.00'),
+                transaction_type='income', date=self.today - timedelta(days=1)
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+    
+    def test_precompute_all_active_users(self):
+        """测试批量计算为每个活跃用户生成快照"""
+        User.objects.create_user(username='inactive', password='testpass123', is_active=False)
+        
+        count = precompute_snapshots(workers=1, chunk_size=1)
+        
+        self.assertEqual(count, 2)
+        snapshot = PlanningSnapshot.objects.get(user=self.user)
+        self.assertEqual(snapshot.period_end, self.today)
+        self.assertEqual(snapshot.data, build_recommendations(self.user, self.today))
+    
+    def test_precompute_overwrites_existing(self):
+        """测试重复执行覆盖旧快照"""
+        precompute_snapshots(workers=1)
+        precompute_snapshots(today=self.today + timedelta(days=1), workers=1)
+        
+        self.assertEqual(PlanningSnapshot.objects.count(), 2)
+        self.assertEqual(
+            PlanningSnapshot.objects.get(user=self.user).period_end,
+            self.today + timedelta(days=1)
+        )
+    
+    def test_view_serves_snapshot(self):
+        """测试接口直接返回当天快照"""
+        precompute_snapshots(workers=1)
+        PlanningSnapshot.objects.filter(user=self.user).update(
+            data={'budget_recommendations': [], 'savings_advice': [], 'financial_health': {'score': 1}}
+        )
+        
+        # 一次版本号查询加一次快照查询
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('planning-recommendations'))
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['financial_health']['score'], 1)
+    
+    def test_view_recomputes_stale_snapshot(self):
+        """测试快照过期时现场计算并回写"""
+        precompute_snapshots(today=self.today - timedelta(days=1), workers=1)
+        
+        response = self.client.get(reverse('planning-recommendations'))
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['financial_health']['score'], 90)
+        self.assertEqual(PlanningSnapshot.objects.get(user=self.user).period_end, self.today)
+    
+    def test_transaction_change_invalidates_snapshot(self):
+        """测试交易变动后只有本人的快照失效"""
+        precompute_snapshots(workers=1)
+        
+        Transaction.objects.create(
+            user=self.user, category=self.food, amount=Decimal('900.00'),
+            transaction_type='expense', date=self.today
+        )
+        
+        self.assertFalse(PlanningSnapshot.objects.filter(user=self.user).exists())
+        self.assertTrue(PlanningSnapshot.objects.filter(user=self.other).exists())
+        response = self.client.get(reverse('planning-recommendations'))
+        self.assertEqual(response.data['data']['financial_health']['score'], 50)
+    
+    def test_write_during_compute_not_masked(self):
+        """测试现场计算期间提交的交易不会被回写的快照掩盖"""
+        def build_then_write(user, today):
+            data = build_recommendations(user, today)
+            # 模拟计算完成后、回写之前另一个请求提交了交易并删除了快照
+            Transaction.objects.create(
+                user=self.user, category=self.food, amount=Decimal('900.00'),
+                transaction_type='expense', date=self.today
+            )
+            return data
+
+        with mock.patch.object(planning, 'build_recommendations', side_effect=build_then_write):
+            self.assertEqual(get_recommendations(self.user)['financial_health']['score'], 90)
+        self.assertTrue(PlanningSnapshot.objects.filter(user=self.user).exists())
+
+        self.assertEqual(get_recommendations(self.user)['financial_health']['score'], 50)
+
+    def test_category_rename_invalidates_snapshots(self):
+        """测试分类改名后使用该分类的用户快照失效"""
+        precompute_snapshots(workers=1)
+        
+        self.food.name = '伙食'
+        self.food.save()
+        
+        self.assertEqual(PlanningSnapshot.objects.count(), 0)
+    
+    def test_management_command(self):
+        """测试预计算命令"""
+        out = StringIO()
+        call_command('precompute_planning', '--workers', '1', stdout=out)
+        
+        self.assertIn('共 2 个用户', out.getvalue())
+        self.assertEqual(PlanningSnapshot.objects.count(), 2)
@@ -0,0 +1,101 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from transactions.models import Transaction, TransactionCategory
+from datetime import date
+from decimal import Decimal
+
+
+class StatisticsTrendGranularityTest(TestCase):
+    """多粒度收支趋势测试"""
+    
+    def setUp(self):
+        """测试前准备"""
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.food = TransactionCategory.objects.create(
+            name='餐饮', type='expense', created_by=self.user
+        )
+        self.salary = TransactionCategory.objects.create(
+            name='兼职', type='income', created_by=self.user
+        )
+        for day, amount in [(date(2023, 1, 2), '10.00'), (date(2023, 1, 8), '20.00'),
+                            (date(2023, 5, 20), '30.00'), (date(2024, 11, 30), '40.00')]:
+            Transaction.objects.create(
+                user=self.user, category=self.food, amount=Decimal(amount),
+                transaction_type='expense', date=day
+            )
+        Transaction.objects.create(
+            user=self.user, category=self.salary, amount=Decimal('500.00'),
+            transaction_type='income', date=date(2023, 2, 1)
+        )
+        self.url = reverse('statistics-trend')
+    
+    def test_quarterly_buckets_in_single_query(self):
+        """测试季度粒度一次聚合查询（另加一次版本号查询）并补齐空分桶"""
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {
+                'granularity': 'quarter',
+                'start_date': '2023-01-01',
+                'end_date': '2024-12-31'
+            })
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        periods = response.data['data']['periods']
+        self.assertEqual(len(periods), 8)
+        self.assertEqual(periods[0]['label'], '2023-Q1')
+        self.assertEqual(float(periods[0]['expense']), 30.00)
+        self.assertEqual(float(periods[0]['income']), 500.00)
+        self.assertEqual(float(periods[0]['balance']), 470.00)
+        self.assertEqual(float(periods[1]['expense']), 30.00)
+        self.assertEqual(float(periods[2]['expense']), 0.00)
+        self.assertEqual(float(periods[-1]['expense']), 40.00)
+    
+    def test_weekly_buckets(self):
+        """测试周粒度按周一分桶"""
+        response = self.client.get(self.url, {
+            'granularity': 'week',
+            'start_date': '2023-01-01',
+            'end_date': '2023-01-15'
+        })
+        
+        periods = response.data['data']['periods']
+        self.assertEqual([p['label'] for p in periods], ['2022-W52', '2023-W01', '2023-W02'])
+        self.assertEqual(periods[0]['start_date'], '2023-01-01')
+        self.assertEqual(periods[1]['start_date'], '2023-01-02')
+        self.assertEqual([float(p['expense']) for p in periods], [0.00, 30.00, 0.00])
+    
+    def test_legacy_range_uses_calendar_months(self):
+        """测试兼容 range 参数并按自然月计算起点"""
+        response = self.client.get(self.url, {'range': '6m'})
+        
+        data = response.data['data']
+        self.assertEqual(data['range'], '6m')
+        self.assertEqual(data['granularity'], 'month')
+        self.assertEqual(len(data['periods']), 7)
+        self.assertEqual(data['periods'][-1]['month'], timezone.localdate().month)
+    
+    def test_invalid_granularity(self):
+        """测试无效粒度返回400"""
+        response = self.client.get(self.url, {'granularity': 'hour'})
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_too_many_buckets(self):
+        """测试分桶过多返回400"""
+        response = self.client.get(self.url, {
+            'granularity': 'day',
+            'start_date': '2015-01-01',
+            'end_date': '2024-12-31'
+        })
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
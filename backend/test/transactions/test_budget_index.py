@@ -0,0 +1,162 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from transactions.models import Transaction, TransactionCategory, Budget
+from transactions import budget_index
+from transactions.budget_index import IntervalTree
+from datetime import date, timedelta
+from decimal import Decimal
+import random
+
+
+class IntervalTreeTest(TestCase):
+    """区间树测试"""
+
+    def test_matches_brute_force(self):
+        """测试覆盖查询与逐个比较的结果一致，含重叠、嵌套和端点"""
+        rng = random.Random(7)
+        base = date(2024, 1, 1)
+        intervals = []
+        for item in range(200):
+            start = base + timedelta(days=rng.randint(0, 365))
+            intervals.append((start, start + timedelta(days=rng.choice([0, 1, 6, 30, 90, 365])), item))
+        tree = IntervalTree(intervals)
+
+        for offset in range(-5, 740):
+            day = base + timedelta(days=offset)
+            expected = sorted(item for start, end, item in intervals if start <= day <= end)
+            self.assertEqual(sorted(tree.covering(day)), expected, day)
+
+
+class BudgetIndexTest(TestCase):
+    """启用预算区间索引测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        cache.clear()
+        budget_index.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.food = TransactionCategory.objects.create(name='餐饮', type='expense', created_by=self.user)
+        self.travel = TransactionCategory.objects.create(name='交通', type='expense', created_by=self.user)
+        self.today = timezone.now().date()
+
+    def create_budget(self, category, start_offset=-10, end_offset=10):
+        return Budget.objects.create(
+            user=self.user,
+            category=category,
+            amount=Decimal('500.00'),
+            start_date=self.today + timedelta(days=start_offset),
+            end_date=self.today + timedelta(days=end_offset)
+        )
+
+    def covering(self, category=None, day=None):
+        return sorted(budget_index.covering(self.user.id, (category or self.food).id, day or self.today))
+
+    def test_lookup_without_query(self):
+        """测试加载后查询覆盖某日期的预算不访问数据库，重叠预算都能返回"""
+        month = self.create_budget(self.food)
+        week = self.create_budget(self.food, -2, 2)
+        self.create_budget(self.travel)
+        self.covering()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.covering(), [month.id, week.id])
+            self.assertEqual(self.covering(day=self.today + timedelta(days=5)), [month.id])
+            self.assertEqual(self.covering(day=self.today + timedelta(days=30)), [])
+
+    def test_invalidated_on_budget_changes(self):
+        """测试预算新建、修改周期、停用和删除后索引随之更新"""
+        budget = self.create_budget(self.food)
+        self.assertEqual(self.covering(), [budget.id])
+
+        budget.start_date = self.today + timedelta(days=1)
+        budget.save()
+        self.assertEqual(self.covering(), [])
+
+        budget.start_date = self.today
+        budget.save()
+        other = self.create_budget(self.food)
+        self.assertEqual(self.covering(), [budget.id, other.id])
+
+        other.is_active = False
+        other.save()
+        self.assertEqual(self.covering(), [budget.id])
+
+        budget.delete()
+        self.assertEqual(self.covering(), [])
+
+    def test_reloads_when_version_changes_elsewhere(self):
+        """测试其他进程更新版本戳后重新加载"""
+        self.covering()
+        budget = Budget.objects.bulk_create([Budget(
+            user=self.user, category=self.food, amount=Decimal('100.00'),
+            start_date=self.today, end_date=self.today
+        )])[0]
+        self.assertEqual(self.covering(), [])
+
+        cache.set(f'budget-index:{self.user.id}', 'other-process')
+        self.assertEqual(self.covering(), [budget.id])
+
+    def test_reloads_when_version_evicted(self):
+        """测试版本戳被缓存淘汰后不沿用旧索引"""
+        self.covering()
+        budget = Budget.objects.bulk_create([Budget(
+            user=self.user, category=self.food, amount=Decimal('100.00'),
+            start_date=self.today, end_date=self.today
+        )])[0]
+
+        cache.delete(f'budget-index:{self.user.id}')
+        self.assertEqual(self.covering(), [budget.id])
+
+    def test_insert_path_ignores_stale_index(self):
+        """测试其他进程新建的预算未反映到本进程索引时，新增支出仍计入已用金额"""
+        self.covering()
+        budget = Budget.objects.bulk_create([Budget(
+            user=self.user, category=self.food, amount=Decimal('500.00'),
+            start_date=self.today - timedelta(days=1), end_date=self.today
+        )])[0]
+        self.assertEqual(self.covering(), [])
+
+        Transaction.objects.create(
+            user=self.user, category=self.food, amount=Decimal('20.00'),
+            transaction_type='expense', date=self.today
+        )
+        self.assertEqual(Budget.objects.get(pk=budget.pk).spent_amount, Decimal('20.00'))
+
+    def test_reactivated_budget_resums(self):
+        """测试停用期间的支出在重新启用时计入已用金额"""
+        budget = self.create_budget(self.food)
+        budget.is_active = False
+        budget.save()
+        Transaction.objects.create(
+            user=self.user, category=self.food, amount=Decimal('30.00'),
+            transaction_type='expense', date=self.today
+        )
+
+        budget.is_active = True
+        budget.save()
+        self.assertEqual(Budget.objects.get(pk=budget.pk).spent_amount, Decimal('30.00'))
+
+    def test_current_endpoint(self):
+        """测试当前预算接口按索引返回覆盖今天的预算"""
+        current = self.create_budget(self.food)
+        self.create_budget(self.travel, 5, 30)
+
+        response = self.client.get(reverse('budget-current'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in response.data['data']], [current.id])
+
+        Budget.objects.all().delete()
+        self.client.get(reverse('budget-current'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('budget-current'))
+        self.assertEqual(response.data['data'], [])
@@ -0,0 +1,167 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from transactions.models import Transaction, TransactionCategory, Budget
+from transactions.serializers import BudgetSerializer
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+
+class BudgetSpentAmountTest(TestCase):
+    """预算已用金额增量维护测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.food = TransactionCategory.objects.create(name='餐饮', type='expense', created_by=self.user)
+        self.travel = TransactionCategory.objects.create(name='交通', type='expense', created_by=self.user)
+        self.today = timezone.now().date()
+        self.budget = self.create_budget(self.food)
+
+    def create_budget(self, category, amount='500.00', start=None, end=None):
+        return Budget.objects.create(
+            user=self.user,
+            category=category,
+            amount=Decimal(amount),
+            start_date=start or self.today - timedelta(days=10),
+            end_date=end or self.today + timedelta(days=10)
+        )
+
+    def create(self, amount, category=None, day=None, transaction_type='expense'):
+        return Transaction.objects.create(
+            user=self.user,
+            category=category or self.food,
+            amount=Decimal(amount),
+            transaction_type=transaction_type,
+            date=day or self.today
+        )
+
+    def spent(self, budget=None):
+        return Budget.objects.get(pk=(budget or self.budget).pk).spent_amount
+
+    def test_create_and_delete(self):
+        """测试新增支出累加、删除扣减，收入和周期外支出不计入"""
+        first = self.create('12.50')
+        self.create('30.00')
+        self.create('99.00', transaction_type='income')
+        self.create('99.00', day=self.today - timedelta(days=30))
+        self.assertEqual(self.spent(), Decimal('42.50'))
+
+        first.delete()
+        self.assertEqual(self.spent(), Decimal('30.00'))
+
+    def test_edit_moves_between_budgets(self):
+        """测试修改金额、分类、日期和类型时从原预算移到新预算"""
+        travel_budget = self.create_budget(self.travel)
+        transaction = self.create('20.00')
+
+        transaction.amount = Decimal('25.00')
+        transaction.save()
+        self.assertEqual(self.spent(), Decimal('25.00'))
+
+        transaction.category = self.travel
+        transaction.save()
+        self.assertEqual((self.spent(), self.spent(travel_budget)), (Decimal('0'), Decimal('25.00')))
+
+        transaction.date = self.today + timedelta(days=30)
+        transaction.save()
+        self.assertEqual(self.spent(travel_budget), Decimal('0'))
+
+        transaction.date = self.today
+        transaction.transaction_type = 'income'
+        transaction.save()
+        self.assertEqual(self.spent(travel_budget), Decimal('0'))
+
+    def test_overlapping_budgets(self):
+        """测试同一分类的多个预算各自按周期累加"""
+        monthly = self.create_budget(self.food, start=self.today - timedelta(days=2), end=self.today)
+        self.create('10.00')
+        self.create('5.00', day=self.today - timedelta(days=5))
+
+        self.assertEqual(self.spent(), Decimal('15.00'))
+        self.assertEqual(self.spent(monthly), Decimal('10.00'))
+
+    def test_bulk_create(self):
+        """测试批量新增交易后更新预算"""
+        response = self.client.post(reverse('transaction-bulk'), [
+            {'category': self.food.id, 'amount': '5.00', 'transaction_type': 'expense',
+             'date': self.today.isoformat()}
+            for _ in range(3)
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.spent(), Decimal('15.00'))
+
+    def test_budget_scope_change_recomputes(self):
+        """测试新建预算或修改预算分类、周期后重新汇总"""
+        self.create('8.00', category=self.travel)
+        self.create('3.00', day=self.today - timedelta(days=20))
+        budget = self.create_budget(self.travel)
+        self.assertEqual(budget.spent_amount, Decimal('8.00'))
+
+        self.budget.start_date = self.today - timedelta(days=30)
+        self.budget.save()
+        self.assertEqual(self.spent(), Decimal('3.00'))
+
+    def test_saving_stale_instance_keeps_spent(self):
+        """测试用加载较早的预算实例保存其他字段，不会覆盖期间新增的支出"""
+        budget = Budget.objects.get(pk=self.budget.pk)
+        self.create('20.00')
+
+        budget.amount = Decimal('800.00')
+        budget.save()
+        self.assertEqual(self.spent(), Decimal('20.00'))
+
+    def test_serializer_values(self):
+        """测试序列化输出与原先按交易汇总的结果一致"""
+        self.create('450.50')
+        data = BudgetSerializer(Budget.objects.get(pk=self.budget.pk)).data
+
+        self.assertEqual(data['current_spent'], 450.5)
+        self.assertEqual(data['remaining'], 49.5)
+        self.assertAlmostEqual(data['progress_percentage'], 90.1)
+
+    def test_list_query_count_constant(self):
+        """测试预算列表和当前预算的查询数不随预算数增长"""
+        def count_queries(url):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(context.captured_queries)
+
+        self.create('10.00')
+        self.client.get(reverse('budget-current'))
+        with self.assertNumQueries(1):
+            self.client.get(reverse('budget-current'))
+        few = count_queries(reverse('budget-list'))
+        for _ in range(5):
+            self.create_budget(self.travel)
+        self.assertEqual(count_queries(reverse('budget-list')), few)
+
+    def test_reconcile_command(self):
+        """测试校对命令修复绕过信号造成的偏差"""
+        self.create('10.00')
+        Budget.objects.filter(pk=self.budget.pk).update(spent_amount=Decimal('999.00'))
+        Transaction.objects.filter(user=self.user).update(amount=Decimal('12.00'))
+
+        out = StringIO()
+        call_command('reconcile_budget_spent', stdout=out)
+        self.assertIn('修复 1 条', out.getvalue())
+        self.assertEqual(self.spent(), Decimal('12.00'))
+
+        out = StringIO()
+        call_command('reconcile_budget_spent', user_id=self.user.id, stdout=out)
+        self.assertIn('修复 0 条', out.getvalue())
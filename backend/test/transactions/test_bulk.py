@@ -0,0 +1,180 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from transactions.models import (
+    Transaction, TransactionCategory, Budget, MonthlyLedger, DailyCategoryLedger, DataVersion
+)
+from alerts.models import Alert, SpendingBaseline
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+
+class BulkCreateTransactionTest(TestCase):
+    """批量创建交易接口测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.food = TransactionCategory.objects.create(
+            name='餐饮',
+            type='expense',
+            created_by=self.user
+        )
+        self.salary = TransactionCategory.objects.create(
+            name='兼职',
+            type='income',
+            created_by=self.user
+        )
+        self.today = timezone.localdate()
+        self.url = reverse('transaction-bulk')
+
+    def entries(self, count, amount='10.00'):
+        return [
+            {
+                'category': self.food.id,
+                'amount': amount,
+                'transaction_type': 'expense',
+                'date': (self.today - timedelta(days=i % 5)).isoformat(),
+                'description': f'第{i}笔',
+            }
+            for i in range(count)
+        ]
+
+    def test_bulk_create(self):
+        """测试批量创建交易"""
+        data = self.entries(3) + [{
+            'category': self.salary.id,
+            'amount': '500.00',
+            'transaction_type': 'income',
+            'date': self.today.isoformat(),
+        }]
+
+        response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['code'], 201)
+        self.assertEqual(len(response.data['data']), 4)
+        self.assertTrue(all(item['id'] for item in response.data['data']))
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 4)
+
+    def test_string_category_id(self):
+        """测试分类主键为数字字符串时与单条创建一样可以创建，非数字主键报错"""
+        data = self.entries(2)
+        data[0]['category'] = str(self.food.id)
+
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Transaction.objects.filter(category=self.food).count(), 2)
+
+        data[0]['category'] = 'abc'
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('category', response.data['errors'][0])
+
+    def test_invalid_entry_rejects_whole_batch(self):
+        """测试任一条校验失败时整批不入库"""
+        data = self.entries(2)
+        data[1]['amount'] = '-5'
+
+        response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('amount', response.data['errors'][1])
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_rejects_non_list_and_oversized_batch(self):
+        """测试请求体不是列表或超过上限时报错"""
+        response = self.client.post(self.url, self.entries(1)[0], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(self.url, [], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(self.url, self.entries(501), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_ledgers_match_rebuild(self):
+        """测试批量写入后的台账与重建结果一致"""
+        Transaction.objects.create(
+            user=self.user, category=self.food, amount=Decimal('7.00'),
+            transaction_type='expense', date=self.today - timedelta(days=10)
+        )
+        self.client.post(self.url, self.entries(12), format='json')
+
+        monthly_fields = ('year', 'month', 'transaction_type', 'total_amount', 'transaction_count')
+        daily_fields = ('category_id', 'date', 'total_amount', 'cumulative_amount', 'cumulative_count')
+        monthly = list(MonthlyLedger.objects.order_by(*monthly_fields).values_list(*monthly_fields))
+        daily = list(DailyCategoryLedger.objects.order_by(*daily_fields).values_list(*daily_fields))
+
+        call_command('rebuild_ledger', stdout=StringIO())
+
+        self.assertEqual(
+            list(MonthlyLedger.objects.order_by(*monthly_fields).values_list(*monthly_fields)), monthly
+        )
+        self.assertEqual(
+            list(DailyCategoryLedger.objects.order_by(*daily_fields).values_list(*daily_fields)), daily
+        )
+
+    def test_version_bumped_once_per_batch(self):
+        """测试整批只递增一次版本号"""
+        self.client.post(self.url, self.entries(1), format='json')
+        before = DataVersion.objects.get(user=self.user).version
+
+        self.client.post(self.url, self.entries(20), format='json')
+
+        self.assertEqual(DataVersion.objects.get(user=self.user).version, before + 1)
+
+    @override_settings(BUDGET_ALERT_ASYNC=False)
+    def test_budget_alert_once_per_budget(self):
+        """测试每个受影响的预算在提交后只评估一次并生成一条预警"""
+        budget = Budget.objects.create(
+            user=self.user,
+            category=self.food,
+            amount=Decimal('100.00'),
+            start_date=self.today - timedelta(days=30),
+            end_date=self.today + timedelta(days=30)
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, self.entries(3, amount='40.00'), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        alerts = Alert.objects.filter(user=self.user, alert_type='budget', related_id=budget.id)
+        self.assertEqual(alerts.count(), 1)
+        self.assertEqual(alerts.get().priority, 'urgent')
+
+    def test_anomaly_baseline_updated_per_category(self):
+        """测试批量写入按分类合并更新异常检测基线"""
+        self.client.post(self.url, self.entries(8), format='json')
+
+        baseline = SpendingBaseline.objects.get(user=self.user, category=self.food)
+        self.assertEqual(baseline.observations, 8)
+
+    def test_query_count_independent_of_batch_size(self):
+        """测试查询次数不随批量条数增长"""
+        def count_queries(size):
+            Transaction.objects.all().delete()
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post(self.url, self.entries(size), format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            return len(context.captured_queries)
+
+        # 首批会新建异常检测基线，先预热；日期在5天内循环，两批涉及的台账行相同
+        # 两批都在 SQLite 单条 INSERT 的参数上限内
+        count_queries(10)
+        self.assertEqual(count_queries(10), count_queries(60))
@@ -0,0 +1,175 @@
+from django.test import TestCase, TransactionTestCase
+from django.contrib.auth.models import User
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from transactions.models import Transaction, TransactionCategory, FinancialGoal, GoalContribution
+from decimal import Decimal
+from threading import Barrier, Thread
+
+
+def ledger_total(goal):
+    return sum(goal.contributions.values_list('amount', flat=True), Decimal('0'))
+
+
+class GoalContributionTest(TestCase):
+    """财务目标进度记录测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.goal = FinancialGoal.objects.create(
+            user=self.user,
+            name='旅行基金',
+            goal_type='savings',
+            target_amount=Decimal('1000.00')
+        )
+        self.category = TransactionCategory.objects.create(name='储蓄', type='income', created_by=self.user)
+
+    def progress(self, **data):
+        return self.client.post(reverse('financialgoal-update-progress', args=[self.goal.id]), data, format='json')
+
+    def test_update_progress(self):
+        """测试追加进度记录并累加当前金额，金额按十进制精确计算"""
+        for amount in ['0.10', '0.20', 0.1]:
+            response = self.progress(amount=amount)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(response.data['data']['current_amount'], '0.40')
+        self.goal.refresh_from_db()
+        self.assertEqual(self.goal.current_amount, Decimal('0.40'))
+        self.assertEqual(list(self.goal.contributions.values_list('source', flat=True)), ['manual'] * 3)
+
+        # 负数金额记为取出
+        self.progress(amount='-0.15', note='取出')
+        self.goal.refresh_from_db()
+        self.assertEqual(self.goal.current_amount, Decimal('0.25'))
+
+    def test_invalid_amount(self):
+        """测试无效金额和零金额不写入"""
+        for data in [{'amount': 'abc'}, {'amount': 0}, {}]:
+            response = self.progress(**data)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.data['message'], '无效金额')
+
+        self.assertFalse(GoalContribution.objects.exists())
+
+    def test_link_transaction(self):
+        """测试关联存入交易，金额默认取交易金额，同一交易不能重复计入"""
+        deposit = Transaction.objects.create(
+            user=self.user, category=self.category, amount=Decimal('200.00'),
+            transaction_type='income', date=timezone.now().date()
+        )
+        response = self.progress(transaction=deposit.id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        contribution = GoalContribution.objects.get()
+        self.assertEqual((contribution.amount, contribution.source), (Decimal('200.00'), 'transaction'))
+
+        response = self.progress(transaction=deposit.id, amount='50.00')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.goal.refresh_from_db()
+        self.assertEqual(self.goal.current_amount, Decimal('200.00'))
+
+        # 交易删除后进度记录保留
+        deposit.delete()
+        self.assertIsNone(GoalContribution.objects.get().transaction)
+
+    def test_link_other_users_transaction(self):
+        """测试不能关联其他用户的交易"""
+        other = User.objects.create_user(username='other', password='testpass123')
+        deposit = Transaction.objects.create(
+            user=other, category=self.category, amount=Decimal('200.00'),
+            transaction_type='income', date=timezone.now().date()
+        )
+
+        response = self.progress(transaction=deposit.id)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(GoalContribution.objects.exists())
+
+    def test_create_and_edit_keep_ledger_consistent(self):
+        """测试新建时的期初金额和手动修改当前金额都记为调整记录，修改其他字段不回写当前金额"""
+        response = self.client.post(reverse('financialgoal-list'), {
+            'name': '电脑', 'goal_type': 'savings', 'target_amount': '5000.00', 'current_amount': '300.00'
+        }, format='json')
+        goal = FinancialGoal.objects.get(pk=response.data['id'])
+        self.assertEqual(goal.current_amount, Decimal('300.00'))
+
+        stale = FinancialGoal.objects.get(pk=goal.pk)
+        self.goal = goal
+        self.progress(amount='50.00')
+        self.client.patch(reverse('financialgoal-detail', args=[stale.id]), {'name': '笔记本电脑'}, format='json')
+        goal.refresh_from_db()
+        self.assertEqual((goal.name, goal.current_amount), ('笔记本电脑', Decimal('350.00')))
+
+        self.client.patch(reverse('financialgoal-detail', args=[goal.id]), {'current_amount': '100.00'}, format='json')
+        goal.refresh_from_db()
+        self.assertEqual(goal.current_amount, Decimal('100.00'))
+        self.assertEqual(ledger_total(goal), Decimal('100.00'))
+        self.assertEqual(goal.contributions.filter(source='adjustment').count(), 2)
+
+    def test_contributions(self):
+        """测试获取进度记录"""
+        self.progress(amount='10.00', note='第一笔')
+        self.progress(amount='20.00')
+
+        response = self.client.get(reverse('financialgoal-contributions', args=[self.goal.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['amount'] for item in response.data['data']], ['20.00', '10.00'])
+
+
+class GoalContributionConcurrencyTest(TransactionTestCase):
+    """财务目标并发进度更新测试"""
+
+    THREADS = 8
+    PER_THREAD = 25
+
+    def setUp(self):
+        """测试前准备"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.goal = FinancialGoal.objects.create(
+            user=self.user,
+            name='旅行基金',
+            goal_type='savings',
+            target_amount=Decimal('1000.00')
+        )
+
+    def test_concurrent_updates_not_lost(self):
+        """测试多个线程同时追加进度，总额等于全部请求金额之和"""
+        barrier = Barrier(self.THREADS)
+        failures = []
+
+        def worker(index):
+            client = APIClient()
+            client.force_authenticate(user=self.user)
+            url = reverse('financialgoal-update-progress', args=[self.goal.id])
+            try:
+                barrier.wait()
+                for _ in range(self.PER_THREAD):
+                    response = client.post(url, {'amount': f'0.{index + 1:02d}'}, format='json')
+                    if response.status_code != status.HTTP_200_OK:
+                        failures.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [Thread(target=worker, args=(index,)) for index in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(failures, [])
+        expected = sum(Decimal(f'0.{index + 1:02d}') * self.PER_THREAD for index in range(self.THREADS))
+        self.goal.refresh_from_db()
+        self.assertEqual(self.goal.current_amount, expected)
+        self.assertEqual(self.goal.contributions.count(), self.THREADS * self.PER_THREAD)
+        self.assertEqual(ledger_total(self.goal), expected)
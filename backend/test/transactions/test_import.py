@@ -0,0 +1,302 @@
+import os
+import tempfile
+from unittest import mock, skipUnless
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from transactions.models import Transaction, TransactionCategory, MonthlyLedger, ImportTask
+from transactions import importers
+from transactions.importers import chunked, iter_records, run_import
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+
+@override_settings(IMPORT_ASYNC=False)
+class TransactionImportTest(TestCase):
+    """交易流水导入测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.food = TransactionCategory.objects.create(
+            name='餐饮',
+            type='expense',
+            created_by=self.user
+        )
+        self.url = reverse('importtask-list')
+        self.day = (timezone.localdate() - timedelta(days=3)).isoformat()
+
+    def statement(self, lines, encoding='utf-8-sig'):
+        return '\n'.join(lines).encode(encoding)
+
+    def upload(self, content, name='statement.csv'):
+        return self.client.post(
+            self.url,
+            {'file': SimpleUploadedFile(name, content)},
+            format='multipart'
+        )
+
+    def write_file(self, content, suffix='.csv'):
+        handle = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
+        handle.write(content)
+        handle.close()
+        self.addCleanup(os.remove, handle.name)
+        return handle.name
+
+    def test_import_csv(self):
+        """测试导入 CSV 流水并按名称映射分类"""
+        content = self.statement([
+            '交易日期,收支类型,金额,分类,备注',
+            f'{self.day},支出,25.50,餐饮,午餐',
+            f'{self.day},收入,"1,200.00",兼职,家教',
+            f'{self.day},支出,¥8,,公交',
+        ])
+
+        response = self.upload(content)
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        data = response.data['data']
+        self.assertEqual(data['status'], 'completed')
+        self.assertEqual(data['imported_count'], 3)
+        self.assertEqual(data['processed_rows'], 3)
+
+        self.assertEqual(
+            Transaction.objects.get(description='午餐').category, self.food
+        )
+        income = Transaction.objects.get(description='家教')
+        self.assertEqual(income.amount, Decimal('1200.00'))
+        self.assertEqual((income.category.name, income.category.type), ('兼职', 'income'))
+        self.assertEqual(Transaction.objects.get(description='公交').category.name, '其他')
+
+    def test_reimport_skips_duplicates(self):
+        """测试重复导入同一流水时按内容哈希跳过"""
+        content = self.statement([
+            '日期,金额,备注',
+            f'{self.day},-30.00,早餐',
+            f'{self.day},-30.00,早餐',
+            f'{self.day},-12.00,晚餐',
+        ])
+
+        first = self.upload(content).data['data']
+        second = self.upload(content).data['data']
+
+        self.assertEqual((first['imported_count'], first['duplicate_count']), (2, 1))
+        self.assertEqual((second['imported_count'], second['duplicate_count']), (0, 3))
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 2)
+
+    def test_reference_distinguishes_identical_rows(self):
+        """测试流水号不同的相同金额交易都会导入"""
+        content = self.statement([
+            '交易流水号,日期,金额',
+            f'A001,{self.day},-10.00',
+            f'A002,{self.day},-10.00',
+        ])
+
+        data = self.upload(content).data['data']
+
+        self.assertEqual(data['imported_count'], 2)
+
+    def test_amount_sign_sets_type(self):
+        """测试没有类型列时按金额正负判断收支"""
+        content = self.statement([
+            'date,amount,description',
+            f'{self.day},-15.00,咖啡',
+            f'{self.day},500.00,奖学金',
+        ])
+
+        self.upload(content)
+
+        self.assertEqual(Transaction.objects.get(description='咖啡').transaction_type, 'expense')
+        self.assertEqual(Transaction.objects.get(description='咖啡').amount, Decimal('15.00'))
+        self.assertEqual(Transaction.objects.get(description='奖学金').transaction_type, 'income')
+
+    def test_gbk_encoded_csv(self):
+        """测试导入 GBK 编码的流水"""
+        content = self.statement([
+            '日期,类型,金额,分类,备注',
+            f'{self.day},支出,18.00,餐饮,食堂',
+        ], encoding='gbk')
+
+        data = self.upload(content).data['data']
+
+        self.assertEqual(data['imported_count'], 1)
+        self.assertTrue(Transaction.objects.filter(description='食堂', category=self.food).exists())
+
+    def test_invalid_rows_are_reported(self):
+        """测试不合法的行记录错误明细，其余行照常导入"""
+        future = (timezone.localdate() + timedelta(days=5)).isoformat()
+        content = self.statement([
+            '日期,类型,金额',
+            f'{self.day},支出,abc',
+            f'{future},支出,10.00',
+            f'{self.day},转账,10.00',
+            f'{self.day},支出,0',
+            f'{self.day},支出,10.00',
+        ])
+
+        data = self.upload(content).data['data']
+
+        self.assertEqual(data['status'], 'completed')
+        self.assertEqual(data['imported_count'], 1)
+        self.assertEqual(data['error_count'], 4)
+        self.assertEqual([error['row'] for error in data['row_errors']], [2, 3, 4, 5])
+
+    def test_missing_required_column_fails(self):
+        """测试缺少必需列时任务失败"""
+        response = self.upload(self.statement(['备注,分类', '午餐,餐饮']))
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['data']['status'], 'failed')
+        self.assertIn('金额', response.data['data']['error_message'])
+        self.assertEqual(ImportTask.objects.get().status, 'failed')
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_rejects_unsupported_file(self):
+        """测试拒绝不支持的文件格式"""
+        response = self.upload(b'data', name='statement.pdf')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(ImportTask.objects.exists())
+
+    def test_import_runs_off_request(self):
+        """测试上传后立即返回等待中的任务，由后台线程导入并删除临时文件"""
+        saved = []
+        save_upload = importers.save_upload
+
+        def save(upload):
+            saved.append(save_upload(upload))
+            return saved[-1]
+
+        with override_settings(IMPORT_ASYNC=True), \
+                mock.patch('transactions.views.save_upload', side_effect=save), \
+                mock.patch.object(importers.runner, '_ensure_worker'):
+            response = self.upload(self.statement(['日期,金额', f'{self.day},-5.00']))
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['data']['status'], 'pending')
+        self.assertFalse(Transaction.objects.exists())
+
+        importers.runner.flush()
+        response = self.client.get(reverse('importtask-detail', args=[response.data['data']['id']]))
+        self.assertEqual((response.data['status'], response.data['imported_count']), ('completed', 1))
+        self.assertFalse(os.path.exists(saved[0]))
+
+    def test_task_visible_only_to_owner(self):
+        """测试只能查看自己的导入任务"""
+        self.upload(self.statement(['日期,金额', f'{self.day},-5.00']))
+        other = User.objects.create_user(username='other', password='testpass123')
+        self.client.force_authenticate(user=other)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 0)
+
+    def test_chunks_update_progress_and_ledger(self):
+        """测试分批导入时逐批更新进度，台账与逐条写入一致"""
+        lines = ['日期,金额']
+        lines += [f'{self.day},-{i + 1}.00' for i in range(7)]
+        path = self.write_file(self.statement(lines))
+        task = ImportTask.objects.create(
+            user=self.user, task_id='chunked', file_name='statement.csv', file_format='csv'
+        )
+        progress = []
+
+        run_import(task, path, chunk_size=3, on_progress=lambda task: progress.append(task.processed_rows))
+
+        self.assertEqual(progress, [3, 6, 7])
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.imported_count), ('completed', 7))
+        day = timezone.localdate() - timedelta(days=3)
+        self.assertEqual(
+            MonthlyLedger.objects.filter(
+                user=self.user, year=day.year, month=day.month, transaction_type='expense'
+            ).values_list('total_amount', 'transaction_count').get(),
+            (Decimal('28.00'), 7)
+        )
+
+    def test_unexpected_error_fails_task(self):
+        """测试批次写入出现意外错误时任务标记为失败并结束，已导入的批次保留"""
+        lines = ['日期,金额']
+        lines += [f'{self.day},-{i + 1}.00' for i in range(5)]
+        path = self.write_file(self.statement(lines))
+        task = ImportTask.objects.create(
+            user=self.user, task_id='broken', file_name='statement.csv', file_format='csv'
+        )
+        import_chunk = importers.import_chunk
+        calls = []
+
+        def flaky(*args):
+            calls.append(args)
+            if len(calls) > 1:
+                raise OperationalError('database is locked')
+            return import_chunk(*args)
+
+        with mock.patch('transactions.importers.import_chunk', side_effect=flaky), \
+                self.assertLogs('transactions.importers', level='ERROR'):
+            run_import(task, path, chunk_size=3)
+
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.processed_rows, task.imported_count), ('failed', 3, 3))
+        self.assertTrue(task.error_message)
+        self.assertIsNotNone(task.completed_at)
+
+    def test_records_are_parsed_lazily(self):
+        """测试解析按需读取，取一批时不会读完整个文件"""
+        consumed = []
+
+        def rows():
+            yield ['日期', '金额']
+            for i in range(100000):
+                consumed.append(i)
+                yield [self.day, '-1.00']
+
+        first = next(chunked(iter_records(rows()), 50))
+
+        self.assertEqual(len(first), 50)
+        self.assertLessEqual(len(consumed), 51)
+
+    def test_management_command(self):
+        """测试导入命令"""
+        path = self.write_file(self.statement(['日期,金额,备注', f'{self.day},-9.90,文具']))
+        out = StringIO()
+
+        call_command('import_transactions', path, user_id=self.user.id, stdout=out)
+
+        self.assertIn('新增 1 条', out.getvalue())
+        self.assertTrue(Transaction.objects.filter(user=self.user, description='文具').exists())
+
+    @skipUnless(openpyxl, '需要安装 openpyxl')
+    def test_import_excel(self):
+        """测试导入 Excel 流水"""
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(['交易日期', '收支类型', '金额', '分类'])
+        sheet.append([timezone.localdate() - timedelta(days=1), '支出', 42.5, '餐饮'])
+        path = self.write_file(b'', suffix='.xlsx')
+        workbook.save(path)
+
+        with open(path, 'rb') as handle:
+            data = self.upload(handle.read(), name='statement.xlsx').data['data']
+
+        self.assertEqual(data['imported_count'], 1)
+        self.assertTrue(Transaction.objects.filter(amount=Decimal('42.50'), category=self.food).exists())
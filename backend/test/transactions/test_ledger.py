@@ -0,0 +1,266 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from django.db.models import Sum, Count
+from transactions.models import Transaction, TransactionCategory, MonthlyLedger, DailyCategoryLedger
+from transactions.rollups import range_totals
+from transactions.signals import transactions_bulk_created
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+
+class MonthlyLedgerTest(TestCase):
+    """月度台账增量维护测试"""
+    
+    def setUp(self):
+        """测试前准备"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.food = TransactionCategory.objects.create(
+            name='餐饮',
+            type='expense',
+            created_by=self.user
+        )
+        self.salary = TransactionCategory.objects.create(
+            name='兼职',
+            type='income',
+            created_by=self.user
+        )
+    
+    def ledger(self, year, month, transaction_type):
+        return MonthlyLedger.objects.filter(
+            user=self.user,
+            year=year,
+            month=month,
+            transaction_type=transaction_type
+        ).values_list('total_amount', 'transaction_count').first()
+    
+    def test_create_updates_ledger(self):
+        """测试新增交易累加台账"""
+        Transaction.objects.create(
+            user=self.user, category=self.food, amount=Decimal('20.50'),
+            transaction_type='expense', date=date(2024, 3, 5)
+        )
+        Transaction.objects.create(
+            user=self.user, category=self.food, amount=Decimal('9.50'),
+            transaction_type='expense', date=date(2024, 3, 20)
+        )
+        
+        self.assertEqual(self.ledger(2024, 3, 'expense'), (Decimal('30.00'), 2))
+    
+    def test_update_moves_amount_between_months(self):
+        """测试修改日期和类型后台账随之迁移"""
+        transaction = Transaction.objects.create(
+            user=self.user, category=self.food, amount=Decimal('100.00'),
+            transaction_type='expense', date=date(2024, 3, 5)
+        )
+        transaction.date = date(2024, 4, 1)
+        transaction.amount = Decimal('80.00')
+        transaction.transaction_type = 'income'
+        transaction.category = self.salary
+        transaction.save()
+        
+        self.assertEqual(self.ledger(2024, 3, 'expense'), (Decimal('0.00'), 0))
+        self.assertEqual(self.ledger(2024, 4, 'income'), (Decimal('80.00'), 1))
+    
+    def test_delete_updates_ledger(self):
+        """测试删除交易扣减台账"""
+        transaction = Transaction.objects.create(
+            user=self.user, category=self.food, amount=Decimal('15.00'),
+            transaction_type='expense', date=date(2024, 3, 5)
+        )
+        transaction.delete()
+        
+        self.assertEqual(self.ledger(2024, 3, 'expense'), (Decimal('0.00'), 0))
+    
+    def test_rebuild_command_matches_incremental(self):
+        """测试重建命令与增量结果一致"""
+        for day, amount in [(1, '10.00'), (15, '25.00'), (28, '5.00')]:
+            Transaction.objects.create(
+                user=self.user, category=self.food, amount=Decimal(amount),
+                transaction_type='expense', date=date(2024, 2, day)
+            )
+        incremental = list(MonthlyLedger.objects.values_list(
+            'year', 'month', 'transaction_type', 'total_amount', 'transaction_count'
+        ))
+        
+        MonthlyLedger.objects.all().delete()
+        call_command('rebuild_ledger', stdout=StringIO())
+        
+        rebuilt = list(MonthlyLedger.objects.values_list(
+            'year', 'month', 'transaction_type', 'total_amount', 'transaction_count'
+        ))
+        self.assertEqual(rebuilt, incremental)
+    
+    def test_user_delete_cascades(self):
+        """测试删除用户时台账一并删除"""
+        Transaction.objects.create(
+            user=self.user, category=self.food, amount=Decimal('15.00'),
+            transaction_type='expense', date=date(2024, 3, 5)
+        )
+        self.user.delete()
+        
+        self.assertFalse(MonthlyLedger.objects.exists())
+
+
+class DailyCategoryLedgerTest(TestCase):
+    """每日分类台账累计值测试"""
+    
+    def setUp(self):
+        """测试前准备"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.food = TransactionCategory.objects.create(
+            name='餐饮',
+            type='expense',
+            created_by=self.user
+        )
+        self.books = TransactionCategory.objects.create(
+            name='书籍',
+            type='expense',
+            created_by=self.user
+        )
+        start = date(2024, 1, 1)
+        self.transactions = []
+        for i in range(40):
+            self.transactions.append(Transaction.objects.create(
+                user=self.user,
+                category=self.food if i % 3 else self.books,
+                amount=Decimal(i + 1),
+                transaction_type='expense',
+                date=start + timedelta(days=(i * 7) % 60)
+            ))
+    
+    def assertMatchesRaw(self, start, end):
+        """区间合计应与直接聚合原始交易一致"""
+        raw = {
+            row['category_id']: (row['total'], row['count'])
+            for row in Transaction.objects.filter(
+                user=self.user, date__gte=start, date__lte=end
+            ).values('category_id').annotate(total=Sum('amount'), count=Count('id'))
+        }
+        totals = {
+            t.category_id: (t.amount, t.count)
+            for t in range_totals(self.user, start, end)
+        }
+        self.assertEqual(totals, raw)
+    
+    def test_range_totals_match_raw_aggregation(self):
+        """测试任意区间合计与原始聚合一致"""
+        for start, end in [
+            (date(2024, 1, 1), date(2024, 3, 1)),
+            (date(2024, 1, 10), date(2024, 1, 20)),
+            (date(2024, 2, 1), date(2024, 2, 1)),
+            (date(2023, 1, 1), date(2023, 12, 31)),
+        ]:
+            self.assertMatchesRaw(start, end)
+    
+    def test_backdated_insert_shifts_later_cumulatives(self):
+        """测试补录早期交易后累计值整体平移"""
+        Transaction.objects.create(
+            user=self.user, category=self.food, amount=Decimal('1000.00'),
+            transaction_type='expense', date=date(2023, 12, 31)
+        )
+        self.transactions[5].delete()
+        self.transactions[9].date = date(2024, 2, 25)
+        self.transactions[9].save()
+        
+        self.assertMatchesRaw(date(2024, 1, 1), date(2024, 3, 1))
+        self.assertMatchesRaw(date(2023, 12, 1), date(2024, 1, 15))
+    
+    def test_multi_day_batch_matches_rebuild(self):
+        """测试一批交易跨多天（含已有日期、新日期和更早日期）时累计值正确"""
+        days = [date(2023, 12, 30), date(2024, 1, 1), date(2024, 1, 3), date(2024, 1, 8), date(2024, 3, 5)]
+        instances = Transaction.objects.bulk_create([
+            Transaction(
+                user=self.user, category=self.food, amount=Decimal('3.50'),
+                transaction_type='expense', date=day
+            )
+            for day in days * 2
+        ])
+        transactions_bulk_created.send(sender=Transaction, instances=instances)
+    
+        fields = ('category_id', 'date', 'total_amount', 'transaction_count', 'cumulative_amount', 'cumulative_count')
+        incremental = list(DailyCategoryLedger.objects.order_by(*fields).values_list(*fields))
+        call_command('rebuild_ledger', stdout=StringIO())
+        rebuilt = list(DailyCategoryLedger.objects.order_by(*fields).values_list(*fields))
+        self.assertEqual(rebuilt, incremental)
+    
+    def test_rebuild_matches_incremental(self):
+        """测试重建结果与增量维护一致"""
+        fields = ('category_id', 'date', 'total_amount', 'cumulative_amount', 'cumulative_count')
+        incremental = list(DailyCategoryLedger.objects.order_by(*fields).values_list(*fields))
+        
+        call_command('rebuild_ledger', stdout=StringIO())
+        
+        rebuilt = list(DailyCategoryLedger.objects.order_by(*fields).values_list(*fields))
+        self.assertEqual(rebuilt, incremental)
+    
+    def test_summary_uses_single_query(self):
+        """测试摘要接口只查询一次台账"""
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        url = reverse('transaction-summary')
+        
+        with self.assertNumQueries(1):
+            response = client.get(url, {'start_date': '2024-01-10', 'end_date': '2024-02-10'})
+        
+        expected = Transaction.objects.filter(
+            user=self.user, date__gte=date(2024, 1, 10), date__lte=date(2024, 2, 10)
+        ).aggregate(total=Sum('amount'), count=Count('id'))
+        self.assertEqual(response.data['data']['total_expense'], float(expected['total']))
+        self.assertEqual(response.data['data']['transaction_count'], expected['count'])
+
+
+class StatisticsTrendLedgerTest(TestCase):
+    """收支趋势读取月度台账测试"""
+    
+    def setUp(self):
+        """测试前准备"""
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.category = TransactionCategory.objects.create(
+            name='餐饮',
+            type='expense',
+            created_by=self.user
+        )
+    
+    def test_trend_uses_single_query(self):
+        """测试趋势接口查询次数与月份数无关（一次版本号查询加一次聚合查询）"""
+        Transaction.objects.create(
+            user=self.user, category=self.category, amount=Decimal('42.00'),
+            transaction_type='expense', date=timezone.localdate()
+        )
+        url = reverse('statistics-trend')
+        
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'range': '1y'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        periods = response.data['data']['periods']
+        self.assertEqual(float(periods[-1]['expense']), 42.00)
+        self.assertEqual(float(periods[0]['expense']), 0.00)
+    
+    def test_prediction_uses_constant_queries(self):
+        """测试预测接口只查询版本号、月度台账和分类台账各一次"""
+        url = reverse('planning-prediction')
+        
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -0,0 +1,118 @@
+from unittest import skipUnless
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from transactions.models import Transaction, TransactionCategory
+from datetime import date, timedelta
+from decimal import Decimal
+
+
+class KeysetPaginationTest(TestCase):
+    """交易列表键集分页测试"""
+    
+    def setUp(self):
+        """测试前准备"""
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.category = TransactionCategory.objects.create(
+            name='餐饮', type='expense', created_by=self.user
+        )
+        start = date(2024, 1, 1)
+        for index in range(45):
+            Transaction.objects.create(
+                user=self.user, category=self.category, amount=Decimal('10.00') + index,
+                transaction_type='income' if index % 3 == 0 else 'expense',
+                date=start + timedelta(days=index // 4)
+            )
+        # 同一天、同一创建时间的记录只能靠 id 区分先后
+        Transaction.objects.filter(date=start).update(created_at=timezone.now())
+        self.url = reverse('transaction-list')
+    
+    def expected_ids(self, **filters):
+        return list(Transaction.objects.filter(user=self.user, **filters).order_by(
+            '-date', '-created_at', '-id'
+        ).values_list('id', flat=True))
+    
+    def walk(self, params):
+        ids, pages = [], 0
+        response = self.client.get(self.url, {'pagination': 'cursor', **params})
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(item['id'] for item in response.data['results'])
+            pages += 1
+            if response.data['next'] is None:
+                self.assertIsNone(response.data['next_cursor'])
+                return ids, pages
+            response = self.client.get(response.data['next'])
+    
+    def test_walk_all_pages(self):
+        """测试逐页遍历不重不漏且顺序正确"""
+        ids, pages = self.walk({'page_size': 10})
+        
+        self.assertEqual(ids, self.expected_ids())
+        self.assertEqual(pages, 5)
+    
+    def test_cursor_with_filters(self):
+        """测试游标与筛选条件组合"""
+        ids, _ = self.walk({'page_size': 4, 'type': 'income'})
+        
+        self.assertEqual(ids, self.expected_ids(transaction_type='income'))
+    
+    def test_no_count_query(self):
+        """测试键集分页不统计总数"""
+        first = self.client.get(self.url, {'pagination': 'cursor', 'page_size': 10})
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'cursor': first.data['next_cursor'], 'page_size': 10})
+        
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertNotIn('count', response.data)
+        self.assertFalse(any('COUNT(' in query['sql'].upper() for query in queries.captured_queries))
+        self.assertFalse(any('OFFSET' in query['sql'].upper() for query in queries.captured_queries))
+    
+    def test_page_size_capped(self):
+        """测试每页条数上限"""
+        response = self.client.get(self.url, {'pagination': 'cursor', 'page_size': 1000})
+        
+        self.assertEqual(len(response.data['results']), 45)
+        self.assertIsNone(response.data['next'])
+    
+    def test_invalid_cursor(self):
+        """测试无效游标返回404"""
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_page_number_mode_unchanged(self):
+        """测试默认仍使用页码分页"""
+        response = self.client.get(self.url, {'page': 2})
+        
+        self.assertEqual(response.data['count'], 45)
+        self.assertEqual(len(response.data['results']), 20)
+    
+    @skipUnless(connection.vendor == 'sqlite', '查询计划断言基于 SQLite')
+    def test_uses_keyset_index(self):
+        """测试翻页查询使用复合索引定位"""
+        position = Transaction.objects.filter(user=self.user).order_by('-date', '-created_at', '-id')[9]
+        queryset = Transaction.objects.filter(user=self.user, date__lte=position.date).order_by(
+            '-date', '-created_at', '-id'
+        )[:11]
+        
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        
+        self.assertIn('transaction_user_keyset_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
@@ -0,0 +1,198 @@
+import re
+from unittest import skipUnless
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.recorder import MigrationRecorder
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from transactions.models import Transaction, TransactionCategory, Budget
+from alerts.models import Alert
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+# 热点接口读取的表，查询计划中不允许出现全表扫描
+HOT_TABLES = {
+    'transactions_transaction',
+    'transactions_budget',
+    'transactions_monthlyledger',
+    'transactions_dailycategoryledger',
+    'transactions_tag',
+    'transactions_transactiontag',
+    'transactions_transactiontombstone',
+    'alerts_alert',
+}
+
+SCAN_PATTERN = re.compile(r'^SCAN (?:TABLE )?(\w+)')
+
+
+@skipUnless(connection.vendor == 'sqlite', '查询计划断言基于 SQLite')
+class HotPathQueryPlanTest(TestCase):
+    """热点接口查询计划测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+
+        self.food = TransactionCategory.objects.create(
+            name='餐饮', type='expense', created_by=self.user
+        )
+        self.salary = TransactionCategory.objects.create(
+            name='工资', type='income', created_by=self.user
+        )
+        today = timezone.localdate()
+        for i in range(30):
+            Transaction.objects.create(
+                user=self.user,
+                category=self.food,
+                amount=Decimal('20.00'),
+                transaction_type='expense',
+                date=today - timedelta(days=i * 3),
+                tags='午餐,食堂' if i % 2 else '午餐'
+            )
+        Transaction.objects.create(
+            user=self.user,
+            category=self.salary,
+            amount=Decimal('3000.00'),
+            transaction_type='income',
+            date=today
+        )
+        Budget.objects.create(
+            user=self.user,
+            category=self.food,
+            amount=Decimal('800.00'),
+            start_date=today.replace(day=1),
+            end_date=today + timedelta(days=30)
+        )
+        Alert.objects.create(
+            user=self.user,
+            alert_type='budget',
+            title='预算提醒',
+            message='餐饮预算即将用完'
+        )
+
+    def explain(self, sql):
+        """返回一条已执行查询的查询计划行"""
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [str(row[-1]) for row in cursor.fetchall()]
+
+    def capture_plans(self, url, params=None):
+        """请求接口并返回其中每条 SELECT 的 (SQL, 查询计划)"""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+
+        plans = []
+        for query in context.captured_queries:
+            sql = query['sql']
+            if sql.lstrip().upper().startswith('SELECT'):
+                plans.append((sql, self.explain(sql)))
+        return plans
+
+    def assert_no_table_scan(self, url, params=None):
+        """断言接口的查询都经由索引定位热点表"""
+        plans = self.capture_plans(url, params)
+        for sql, plan in plans:
+            for line in plan:
+                match = SCAN_PATTERN.match(line)
+                if match and match.group(1) in HOT_TABLES:
+                    self.fail(f'{url} 全表扫描 {match.group(1)}:\n{sql}\n' + '\n'.join(plan))
+        return plans
+
+    def plan_lines(self, plans, table):
+        """筛选访问指定表的查询计划行"""
+        return [line for _, plan in plans for line in plan if f' {table} ' in f' {line} ']
+
+    def test_transaction_endpoints(self):
+        """测试交易接口不扫描全表"""
+        today = timezone.localdate()
+        cases = [
+            (reverse('transaction-list'), {}),
+            (reverse('transaction-list'), {
+                'type': 'expense',
+                'category': self.food.id,
+                'start_date': (today - timedelta(days=30)).isoformat(),
+                'end_date': today.isoformat(),
+            }),
+            (reverse('transaction-list'), {'pagination': 'cursor', 'page_size': 5}),
+            (reverse('transaction-list'), {'q': '午餐'}),
+            (reverse('transaction-list'), {'tag': '午餐,食堂'}),
+            (reverse('transaction-list'), {'tag': '午餐,食堂', 'tag_mode': 'any'}),
+            (reverse('transaction-changes'), {'since': 0}),
+            (reverse('transaction-summary'), {}),
+            (reverse('transaction-category-trends'), {}),
+            (reverse('transaction-monthly-trends'), {}),
+            (reverse('tag-list'), {}),
+            (reverse('tag-summary'), {'start_date': (today - timedelta(days=30)).isoformat()}),
+        ]
+        for url, params in cases:
+            with self.subTest(url=url, params=params):
+                self.assert_no_table_scan(url, params)
+
+    def test_statistics_endpoints(self):
+        """测试统计与规划接口不扫描全表"""
+        for name in ['statistics-summary', 'statistics-categories', 'statistics-trend',
+                     'planning-prediction', 'planning-recommendations']:
+            with self.subTest(name=name):
+                self.assert_no_table_scan(reverse(name))
+
+    def test_budget_and_alert_endpoints(self):
+        """测试预算与预警接口不扫描全表"""
+        for url in [reverse('budget-list'), reverse('budget-current'),
+                    '/api/alerts/alerts/', '/api/alerts/alerts/unread/']:
+            with self.subTest(url=url):
+                self.assert_no_table_scan(url)
+
+    def test_list_endpoints_read_in_index_order(self):
+        """测试列表接口沿索引顺序读取，不额外排序"""
+        cases = [
+            (reverse('transaction-list'), 'transactions_transaction', 'transaction_user_keyset_idx'),
+            (reverse('budget-list'), 'transactions_budget', 'budget_user_created_idx'),
+            ('/api/alerts/alerts/unread/', 'alerts_alert', 'alert_user_created_idx'),
+        ]
+        for url, table, index in cases:
+            with self.subTest(url=url):
+                plans = self.capture_plans(url)
+                ordered = [plan for _, plan in plans if any(index in line for line in plan)]
+                self.assertTrue(ordered, f'{url} 未使用 {index}')
+                for plan in ordered:
+                    self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', plan)
+
+    def test_range_sums_use_covering_index(self):
+        """测试区间汇总只读索引，不回表"""
+        cases = [
+            (reverse('statistics-categories'), {}),
+            (reverse('transaction-monthly-trends'), {}),
+        ]
+        for url, params in cases:
+            with self.subTest(url=url):
+                plans = self.capture_plans(url, params)
+                sums = [
+                    plan for sql, plan in plans
+                    if 'SUM(' in sql and '"transactions_transaction"' in sql
+                ]
+                self.assertTrue(sums, f'{url} 未汇总交易表')
+                for plan in sums:
+                    lines = self.plan_lines([('', plan)], 'transactions_transaction')
+                    self.assertTrue(lines)
+                    self.assertTrue(all('COVERING INDEX' in line for line in lines), '\n'.join(plan))
+
+
+class HotPathIndexMigrationTest(TestCase):
+    """热点索引迁移测试"""
+
+    def test_indexes_shipped_in_migrations(self):
+        """测试模型上的索引都有对应迁移，已部署的数据库执行 migrate 即可获得"""
+        applied = MigrationRecorder(connection).applied_migrations()
+        self.assertIn(('alerts', '0003_alert_user_created_idx'), applied)
+        call_command('makemigrations', 'alerts', 'transactions', check=True, dry_run=True, stdout=StringIO())
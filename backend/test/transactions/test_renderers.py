@@ -0,0 +1,91 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework import status
+from config.renderers import FastJSONRenderer
+from transactions.models import Transaction, TransactionCategory
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+import uuid
+
+
+class FastJSONRendererTest(TestCase):
+    """orjson 渲染器测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_same_bytes_as_drf(self):
+        """测试常见类型的输出与 DRF JSONRenderer 逐字节一致"""
+        data = {
+            'code': 200,
+            'message': '获取成功',
+            'data': [{
+                'amount': Decimal('12.50'),
+                'big': Decimal('12345678.90'),
+                'date': date(2024, 3, 1),
+                'utc': datetime(2024, 3, 1, 8, 30, tzinfo=dt_timezone.utc),
+                'local': datetime(2024, 3, 1, 8, 30, 15, 123456, tzinfo=dt_timezone(timedelta(hours=8))),
+                'naive': datetime(2024, 3, 1, 8, 30),
+                'time': time(8, 30),
+                'uuid': uuid.UUID(int=1),
+                'duration': timedelta(days=1, seconds=5),
+                'lazy': gettext_lazy('预算预警'),
+                'tuple': (1, 2),
+                'emoji': '午餐 🍜 "引号"',
+                1: None,
+            }]
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_line_separators_escaped(self):
+        """测试 U+2028、U+2029 与 DRF 一样被转义"""
+        data = {'message': '第一行\u2028第二行\u2029'}
+        rendered = FastJSONRenderer().render(data)
+        self.assertIn(b'\\u2028', rendered)
+        self.assertEqual(rendered, JSONRenderer().render(data))
+
+    def test_indent_falls_back_to_drf(self):
+        """测试请求缩进时退回 DRF 实现"""
+        data = {'code': 200, 'data': [1, 2]}
+        context = {'indent': 2}
+        self.assertEqual(
+            FastJSONRenderer().render(data, 'application/json', context),
+            JSONRenderer().render(data, 'application/json', context)
+        )
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_api_uses_fast_renderer(self):
+        """测试接口默认使用 orjson 渲染器"""
+        category = TransactionCategory.objects.create(name='餐饮', type='expense', created_by=self.user)
+        Transaction.objects.create(
+            user=self.user, category=category, amount=Decimal('12.50'),
+            transaction_type='expense', date=timezone.localdate(), description='午餐'
+        )
+
+        response = self.client.get(reverse('transaction-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(response.accepted_renderer, FastJSONRenderer)
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+    def test_benchmark_command(self):
+        """测试渲染耗时对比命令"""
+        out = StringIO()
+        call_command('benchmark_renderers', rows=20, repeat=1, stdout=out)
+
+        for name in ['交易列表', '预警列表', '缴费记录']:
+            self.assertIn(name, out.getvalue())
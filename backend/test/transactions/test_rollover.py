@@ -0,0 +1,164 @@
+from unittest import mock
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from transactions.models import Transaction, TransactionCategory, Budget
+from transactions import budget_index
+from transactions.rollover import shift_months_clamped, next_period, rollover_budgets
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+
+class NextPeriodTest(TestCase):
+    """续期周期计算测试"""
+
+    def test_shift_months_clamped(self):
+        """测试顺延月份，目标月份没有该日时取月末"""
+        self.assertEqual(shift_months_clamped(date(2024, 1, 31), 1), date(2024, 2, 29))
+        self.assertEqual(shift_months_clamped(date(2024, 12, 1), 1), date(2025, 1, 1))
+        self.assertEqual(shift_months_clamped(date(2024, 3, 1), -1), date(2024, 2, 1))
+
+    def test_next_period(self):
+        """测试月度、年度预算的下一周期，任务停过一段时间时顺延到未结束的周期"""
+        self.assertEqual(next_period(date(2024, 1, 31), 'monthly', date(2024, 2, 1)),
+                         (date(2024, 2, 1), date(2024, 2, 29), False))
+        self.assertEqual(next_period(date(2023, 12, 31), 'yearly', date(2024, 1, 1)),
+                         (date(2024, 1, 1), date(2024, 12, 31), False))
+        self.assertEqual(next_period(date(2024, 1, 14), 'monthly', date(2024, 2, 10)),
+                         (date(2024, 1, 15), date(2024, 2, 14), False))
+        self.assertEqual(next_period(date(2024, 1, 31), 'monthly', date(2024, 3, 5)),
+                         (date(2024, 3, 1), date(2024, 3, 31), True))
+
+
+class BudgetRolloverTest(TestCase):
+    """预算续期测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        cache.clear()
+        budget_index.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.food = TransactionCategory.objects.create(name='餐饮', type='expense', created_by=self.user)
+        self.on = date(2024, 3, 1)
+
+    def create_budget(self, amount='500.00', start=date(2024, 2, 1), end=date(2024, 2, 29), **fields):
+        return Budget.objects.create(
+            user=self.user,
+            category=fields.pop('category', self.food),
+            amount=Decimal(amount),
+            start_date=start,
+            end_date=end,
+            **fields
+        )
+
+    def spend(self, amount, day):
+        Transaction.objects.create(
+            user=self.user, category=self.food, amount=Decimal(amount),
+            transaction_type='expense', date=day
+        )
+
+    def test_rollover_is_idempotent(self):
+        """测试生成下一周期预算，重复执行不再生成"""
+        budget = self.create_budget()
+
+        self.assertEqual(rollover_budgets(self.on), 1)
+        self.assertEqual(rollover_budgets(self.on), 0)
+
+        successor = Budget.objects.get(previous=budget)
+        self.assertEqual((successor.start_date, successor.end_date), (date(2024, 3, 1), date(2024, 3, 31)))
+        self.assertEqual(successor.amount, Decimal('500.00'))
+        self.assertEqual(successor.carried_over, Decimal('0'))
+        self.assertTrue(successor.auto_renew)
+
+    def test_conflicts_not_counted(self):
+        """测试已被其他任务生成的后继因唯一约束跳过，不计入生成条数"""
+        budget = self.create_budget()
+        other = self.create_budget(category=TransactionCategory.objects.create(
+            name='交通', type='expense', created_by=self.user
+        ))
+        rollover_budgets(self.on)
+        Budget.objects.filter(previous=other).delete()
+
+        # 模拟另一个任务在本任务读取到期预算之后、写入之前已经生成了后继
+        due = Budget.objects.filter(pk__in=[budget.pk, other.pk])
+        with mock.patch('transactions.rollover.due_budgets', return_value=due):
+            self.assertEqual(rollover_budgets(self.on), 1)
+        self.assertEqual(Budget.objects.filter(previous=budget).count(), 1)
+
+    def test_skips_non_recurring_and_old_budgets(self):
+        """测试不续期未到期、停用、关闭自动续期和久远的预算"""
+        self.create_budget(end=date(2024, 3, 31))
+        self.create_budget(is_active=False)
+        self.create_budget(auto_renew=False)
+        self.create_budget(start=date(2023, 11, 1), end=date(2023, 11, 30))
+
+        self.assertEqual(rollover_budgets(self.on), 0)
+
+    def test_carry_over_unused_amount(self):
+        """测试结余结转按台账计算上一周期的已用金额，超支时不结转"""
+        budget = self.create_budget(carry_over=True)
+        self.spend('120.00', date(2024, 2, 10))
+        self.spend('200.00', date(2024, 2, 29))
+        self.spend('999.00', date(2024, 1, 31))
+        overspent = self.create_budget(
+            '100.00', carry_over=True,
+            category=TransactionCategory.objects.create(name='交通', type='expense', created_by=self.user)
+        )
+        Transaction.objects.create(
+            user=self.user, category=overspent.category, amount=Decimal('150.00'),
+            transaction_type='expense', date=date(2024, 2, 5)
+        )
+
+        rollover_budgets(self.on)
+        successor = Budget.objects.get(previous=budget)
+        self.assertEqual((successor.amount, successor.carried_over), (Decimal('680.00'), Decimal('180.00')))
+        self.assertEqual(Budget.objects.get(previous=overspent).amount, Decimal('100.00'))
+
+        # 再次续期时以原预算金额为基数，加上本周期的结余
+        self.spend('80.00', date(2024, 3, 3))
+        rollover_budgets(date(2024, 4, 1))
+        third = Budget.objects.get(previous=successor)
+        self.assertEqual((third.amount, third.carried_over), (Decimal('1100.00'), Decimal('600.00')))
+
+    def test_new_budget_tracks_spending(self):
+        """测试新预算计入新周期已有的支出，续期后新增支出也会累计"""
+        self.create_budget()
+        self.spend('15.00', date(2024, 3, 1))
+
+        rollover_budgets(self.on)
+        successor = Budget.objects.get(start_date=date(2024, 3, 1))
+        self.assertEqual(successor.spent_amount, Decimal('15.00'))
+
+        self.spend('5.00', date(2024, 3, 2))
+        self.assertEqual(Budget.objects.get(pk=successor.pk).spent_amount, Decimal('20.00'))
+
+    def test_query_count_independent_of_budget_count(self):
+        """测试查询次数不随到期预算数增长"""
+        categories = [
+            TransactionCategory.objects.create(name=f'分类{index}', type='expense', created_by=self.user)
+            for index in range(20)
+        ]
+        self.create_budget(category=categories[0])
+        with CaptureQueriesContext(connection) as few:
+            self.assertEqual(rollover_budgets(self.on), 1)
+
+        for category in categories[1:]:
+            self.create_budget(start=date(2024, 4, 1), end=date(2024, 4, 30), category=category)
+        with CaptureQueriesContext(connection) as many:
+            self.assertEqual(rollover_budgets(date(2024, 5, 1)), 19)
+        self.assertEqual(len(many.captured_queries), len(few.captured_queries))
+
+    def test_command(self):
+        """测试续期命令"""
+        self.create_budget()
+
+        out = StringIO()
+        call_command('rollover_budgets', date='2024-03-01', stdout=out)
+        self.assertIn('生成 1 条', out.getvalue())
@@ -0,0 +1,129 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework import status
+from transactions.models import Transaction, TransactionCategory
+from transactions.rows import TRANSACTION_COLUMNS
+from transactions.serializers import TransactionSerializer
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+
+class TransactionListRowsTest(TestCase):
+    """交易列表快速序列化测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.categories = [
+            TransactionCategory.objects.create(
+                name=f'分类{i}',
+                type='expense',
+                color=f'#00000{i}',
+                created_by=self.user
+            )
+            for i in range(4)
+        ]
+        self.today = timezone.localdate()
+        self.url = reverse('transaction-list')
+
+    def create(self, count):
+        amounts = ['50.5', '100', '0.01', '12345678.90', '7.25']
+        for i in range(count):
+            Transaction.objects.create(
+                user=self.user,
+                category=self.categories[i % len(self.categories)],
+                amount=Decimal(amounts[i % len(amounts)]),
+                transaction_type='income' if i % 3 == 0 else 'expense',
+                date=self.today - timedelta(days=i),
+                description='' if i % 4 == 0 else f'第{i}笔 "备注"',
+                tags='旅行,北京' if i % 2 else ''
+            )
+
+    def expected(self):
+        queryset = Transaction.objects.filter(user=self.user).order_by('-date', '-created_at')
+        return TransactionSerializer(queryset, many=True).data
+
+    def test_columns_match_serializer(self):
+        """测试行映射的字段及顺序与 TransactionSerializer 一致"""
+        self.assertEqual(
+            [column.key for column in TRANSACTION_COLUMNS],
+            TransactionSerializer.Meta.fields
+        )
+
+    def test_same_json_as_serializer(self):
+        """测试分页和键集分页的输出与 TransactionSerializer 逐字节一致"""
+        self.create(10)
+        expected = JSONRenderer().render(self.expected())
+
+        response = self.client.get(self.url, {'page_size': 50})
+        self.assertEqual(JSONRenderer().render(response.data['results']), expected)
+
+        response = self.client.get(self.url, {'pagination': 'cursor', 'page_size': 50})
+        self.assertEqual(JSONRenderer().render(response.data['results']), expected)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        """测试查询数不随行数增长，不再逐行查询分类"""
+        def count_queries():
+            cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(self.url, {'page_size': 100})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(context.captured_queries)
+
+        self.create(4)
+        few = count_queries()
+        self.create(40)
+        self.assertEqual(count_queries(), few)
+
+    def test_sparse_fields(self):
+        """测试 fields 只返回指定字段，按原有字段顺序输出"""
+        self.create(3)
+
+        response = self.client.get(self.url, {'fields': 'amount, id,category_name'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        expected = [
+            {'id': item['id'], 'category_name': item['category_name'], 'amount': item['amount']}
+            for item in self.expected()
+        ]
+        self.assertEqual(response.data['results'], expected)
+        self.assertEqual(list(response.data['results'][0]), ['id', 'category_name', 'amount'])
+
+    def test_sparse_fields_with_cursor(self):
+        """测试只取部分字段时键集分页游标仍然可用"""
+        self.create(5)
+
+        response = self.client.get(self.url, {'fields': 'amount', 'pagination': 'cursor', 'page_size': 3})
+        self.assertEqual(response.data['results'], [{'amount': item['amount']} for item in self.expected()[:3]])
+
+        response = self.client.get(self.url, {'fields': 'id', 'cursor': response.data['next_cursor']})
+        self.assertEqual(response.data['results'], [{'id': item['id']} for item in self.expected()[3:]])
+        self.assertIsNone(response.data['next_cursor'])
+
+    def test_unknown_field(self):
+        """测试不支持的字段返回400"""
+        response = self.client.get(self.url, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('password', response.data['message'])
+
+    def test_benchmark_command(self):
+        """测试序列化耗时对比命令，测试数据不会保留"""
+        out = StringIO()
+        call_command('benchmark_transaction_list', rows=[20], repeat=1, stdout=out)
+
+        self.assertIn('20', out.getvalue())
+        self.assertFalse(Transaction.objects.exclude(user=self.user).exists())
@@ -0,0 +1,171 @@
+from unittest import mock, skipUnless
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from transactions.models import Transaction, TransactionCategory
+from transactions.search import build_match, is_available, segment, FTS_TABLE
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+
+class SearchSyntaxTest(TestCase):
+    """检索表达式测试"""
+
+    def test_segment_splits_cjk(self):
+        """测试汉字逐字切分，字母和数字保持连续"""
+        self.assertEqual(segment('食堂coffee2杯').split(), ['食', '堂', 'coffee2', '杯'])
+
+    def test_build_match(self):
+        """测试汉字词组按短语匹配，英文词按前缀匹配，双引号被转义"""
+        self.assertEqual(build_match(['食堂']), '" 食  堂 "')
+        self.assertEqual(build_match(['coff']), '"coff" *')
+        self.assertEqual(build_match(['a"b', '书']), '"a""b" * AND " 书 "')
+
+
+class TransactionSearchTest(TestCase):
+    """交易全文检索测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.food = TransactionCategory.objects.create(
+            name='餐饮',
+            type='expense',
+            created_by=self.user
+        )
+        self.today = timezone.localdate()
+        self.url = reverse('transaction-list')
+
+    def create(self, description, tags='', days_ago=0, user=None):
+        return Transaction.objects.create(
+            user=user or self.user,
+            category=self.food,
+            amount=Decimal('10.00'),
+            transaction_type='expense',
+            date=self.today - timedelta(days=days_ago),
+            description=description,
+            tags=tags
+        )
+
+    def search(self, keyword, **params):
+        response = self.client.get(self.url, {'q': keyword, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['description'] for item in response.data['results']]
+
+    def test_cjk_substring(self):
+        """测试中文关键词匹配词组中间的字"""
+        self.create('食堂午餐')
+        self.create('在二食堂吃饭', days_ago=400)
+        self.create('食品超市')
+
+        self.assertCountEqual(self.search('食堂'), ['食堂午餐', '在二食堂吃饭'])
+        self.assertEqual(self.search('午餐'), ['食堂午餐'])
+
+    def test_terms_are_combined_with_and(self):
+        """测试多个关键词同时匹配"""
+        self.create('食堂午餐')
+        self.create('食堂晚餐')
+
+        self.assertEqual(self.search('食堂 晚餐'), ['食堂晚餐'])
+
+    def test_tags_and_prefix(self):
+        """测试匹配标签，英文按前缀且不区分大小写"""
+        self.create('早餐', tags='Coffee')
+        self.create('教材', tags='书籍')
+
+        self.assertEqual(self.search('coff'), ['早餐'])
+        self.assertEqual(self.search('书籍'), ['教材'])
+
+    def test_results_ranked_by_relevance(self):
+        """测试按相关度排序，关键词出现越集中越靠前"""
+        self.create('这一笔是周末和同学一起去市区看电影之后顺便买的奶茶', days_ago=1)
+        self.create('奶茶', days_ago=30)
+
+        self.assertEqual(self.search('奶茶')[0], '奶茶')
+
+    def test_only_own_transactions(self):
+        """测试只检索当前用户的交易"""
+        other = User.objects.create_user(username='other', password='testpass123')
+        self.create('食堂午餐', user=other)
+
+        self.assertEqual(self.search('食堂'), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        """测试修改和删除交易后索引同步更新"""
+        transaction = self.create('食堂午餐')
+        transaction.description = '打印资料'
+        transaction.save()
+
+        self.assertEqual(self.search('食堂'), [])
+        self.assertEqual(self.search('打印'), ['打印资料'])
+
+        transaction.delete()
+        self.assertEqual(self.search('打印'), [])
+
+    def test_bulk_created_transactions_are_indexed(self):
+        """测试批量创建的交易写入索引"""
+        response = self.client.post(reverse('transaction-bulk'), [
+            {'category': self.food.id, 'amount': '8.00', 'transaction_type': 'expense',
+             'date': self.today.isoformat(), 'description': '食堂早餐'},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(self.search('早餐'), ['食堂早餐'])
+
+    def test_combines_with_filters_and_cursor(self):
+        """测试检索与日期筛选、键集分页组合使用"""
+        for days_ago in range(5):
+            self.create(f'食堂第{days_ago}天', days_ago=days_ago)
+        self.create('超市', days_ago=0)
+
+        recent = self.search('食堂', start_date=(self.today - timedelta(days=1)).isoformat())
+        self.assertCountEqual(recent, ['食堂第0天', '食堂第1天'])
+
+        response = self.client.get(self.url, {'q': '食堂', 'pagination': 'cursor', 'page_size': 3})
+        self.assertEqual(
+            [item['description'] for item in response.data['results']],
+            ['食堂第0天', '食堂第1天', '食堂第2天']
+        )
+
+    def test_blank_and_symbol_queries(self):
+        """测试空白关键词不筛选，只有符号的关键词没有结果"""
+        self.create('食堂午餐')
+
+        self.assertEqual(self.search('  '), ['食堂午餐'])
+        self.assertEqual(self.search('"*'), [])
+
+    def test_fallback_without_fts(self):
+        """测试没有 FTS5 索引时退回模糊匹配"""
+        self.create('食堂午餐')
+        self.create('食品超市')
+
+        with mock.patch('transactions.search.is_available', return_value=False):
+            self.assertEqual(self.search('食堂'), ['食堂午餐'])
+
+    @skipUnless(connection.vendor == 'sqlite', '全文索引基于 SQLite FTS5')
+    def test_rebuild_command(self):
+        """测试重建命令恢复缺失的索引"""
+        self.assertTrue(is_available())
+        self.create('食堂午餐')
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        self.assertEqual(self.search('食堂'), [])
+
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+
+        self.assertIn('1 条', out.getvalue())
+        self.assertEqual(self.search('食堂'), ['食堂午餐'])
@@ -0,0 +1,195 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from transactions.models import Transaction, TransactionCategory, TransactionTombstone, DataVersion
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+
+class TransactionChangesTest(TestCase):
+    """交易增量同步测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.food = TransactionCategory.objects.create(
+            name='餐饮',
+            type='expense',
+            created_by=self.user
+        )
+        self.today = timezone.localdate()
+        self.url = reverse('transaction-changes')
+
+    def create(self, amount='10.00', user=None, description=''):
+        return Transaction.objects.create(
+            user=user or self.user,
+            category=self.food,
+            amount=Decimal(amount),
+            transaction_type='expense',
+            date=self.today,
+            description=description
+        )
+
+    def changes(self, since=None, **params):
+        if since is not None:
+            params['since'] = since
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['data']
+
+    def test_first_sync_resets(self):
+        """测试首次同步返回 reset 和当前游标"""
+        self.create()
+
+        data = self.changes()
+        self.assertTrue(data['reset'])
+        self.assertEqual(data['changed'], [])
+        self.assertEqual(data['cursor'], DataVersion.objects.get(user=self.user).version)
+
+    def test_created_updated_and_deleted(self):
+        """测试新增、修改、删除后只下发变化的部分"""
+        kept = self.create(description='保留')
+        cursor = self.changes()['cursor']
+
+        created = self.create(description='新增')
+        kept.description = '已修改'
+        kept.save()
+        data = self.changes(cursor)
+        self.assertFalse(data['reset'])
+        self.assertEqual([item['description'] for item in data['changed']], ['新增', '已修改'])
+        self.assertEqual(data['deleted'], [])
+
+        response = self.client.delete(reverse('transaction-detail', args=[created.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = self.changes(data['cursor'])
+        self.assertEqual(data['changed'], [])
+        self.assertEqual(data['deleted'], [created.id])
+
+    def test_rows_match_list_output(self):
+        """测试下发的交易与列表接口的输出一致，并支持 fields"""
+        cursor = self.changes()['cursor']
+        self.create('12.50', description='午餐')
+
+        listed = self.client.get(reverse('transaction-list')).data['results']
+        self.assertEqual(self.changes(cursor)['changed'], listed)
+        self.assertEqual(self.changes(cursor, fields='id,amount')['changed'], [
+            {'id': listed[0]['id'], 'amount': '12.50'}
+        ])
+
+    def test_unchanged_costs_one_query(self):
+        """测试数据没有变化时只查询版本号"""
+        self.create()
+        cursor = self.changes()['cursor']
+
+        with self.assertNumQueries(1):
+            data = self.changes(cursor)
+        self.assertEqual(data['cursor'], cursor)
+        self.assertEqual(data['changed'], [])
+
+    def test_bulk_create_shares_one_change(self):
+        """测试批量创建的交易共用一个变更序号，同一页返回"""
+        cursor = self.changes()['cursor']
+        response = self.client.post(reverse('transaction-bulk'), [
+            {'category': self.food.id, 'amount': '5.00', 'transaction_type': 'expense',
+             'date': self.today.isoformat(), 'description': f'第{i}笔'}
+            for i in range(3)
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(len(set(Transaction.objects.values_list('change_seq', flat=True))), 1)
+        data = self.changes(cursor, limit=2)
+        self.assertEqual(len(data['changed']), 3)
+
+    def test_paging(self):
+        """测试超过 limit 时分页，游标推进后不重复也不遗漏"""
+        cursor = self.changes()['cursor']
+        created = [self.create(description=f'第{i}笔') for i in range(5)]
+        ids = [transaction.id for transaction in created]
+        created[0].delete()
+
+        seen, deleted = [], []
+        while True:
+            data = self.changes(cursor, limit=2)
+            seen.extend(item['id'] for item in data['changed'])
+            deleted.extend(data['deleted'])
+            cursor = data['cursor']
+            if not data['has_more']:
+                break
+        self.assertEqual(seen, ids[1:])
+        self.assertEqual(deleted, ids[:1])
+        self.assertEqual(self.changes(cursor)['changed'], [])
+
+    def test_category_change_resends_transactions(self):
+        """测试分类改名后，使用该分类的交易重新下发"""
+        transaction = self.create()
+        cursor = self.changes()['cursor']
+
+        self.food.name = '伙食'
+        self.food.save()
+        data = self.changes(cursor)
+        self.assertEqual([(item['id'], item['category_name']) for item in data['changed']], [
+            (transaction.id, '伙食')
+        ])
+
+    def test_only_own_changes(self):
+        """测试只下发当前用户的变更"""
+        cursor = self.changes()['cursor']
+        other = User.objects.create_user(username='other', password='testpass123')
+        self.create(user=other).delete()
+
+        data = self.changes(cursor)
+        self.assertEqual((data['changed'], data['deleted']), ([], []))
+
+    def test_stale_or_future_cursor_resets(self):
+        """测试游标晚于当前版本（数据已回滚）时重新加载"""
+        self.create()
+        cursor = self.changes()['cursor']
+
+        self.assertTrue(self.changes(cursor + 10)['reset'])
+
+    def test_invalid_params(self):
+        """测试无效游标和字段返回400"""
+        for params in [{'since': 'abc'}, {'since': 1, 'limit': 'x'}, {'since': 1, 'fields': 'password'}]:
+            with self.subTest(params=params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_compact_tombstones(self):
+        """测试清理过期墓碑后，早于清理位置的游标需要重新加载"""
+        old_cursor = self.changes()['cursor']
+        self.create().delete()
+        recent_cursor = self.changes(old_cursor)['cursor']
+        self.create().delete()
+        TransactionTombstone.objects.filter(change_seq__lte=recent_cursor).update(
+            deleted_at=timezone.now() - timedelta(days=40)
+        )
+
+        out = StringIO()
+        call_command('compact_tombstones', days=30, stdout=out)
+
+        self.assertIn('1 条', out.getvalue())
+        self.assertEqual(TransactionTombstone.objects.count(), 1)
+        self.assertTrue(self.changes(old_cursor)['reset'])
+        data = self.changes(recent_cursor)
+        self.assertFalse(data['reset'])
+        self.assertEqual(len(data['deleted']), 1)
+
+    def test_deleting_user_leaves_no_tombstones(self):
+        """测试删除用户时级联删除交易，不再记录墓碑"""
+        self.create()
+        self.user.delete()
+
+        self.assertFalse(TransactionTombstone.objects.exists())
+        self.assertFalse(Transaction.objects.exists())
@@ -0,0 +1,184 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from transactions.models import Transaction, TransactionCategory, Tag, TransactionTag
+from transactions.tagging import parse_tags
+from datetime import timedelta
+from decimal import Decimal
+
+
+class TransactionTagTest(TestCase):
+    """交易标签倒排索引测试"""
+
+    def setUp(self):
+        """测试前准备"""
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.food = TransactionCategory.objects.create(
+            name='餐饮',
+            type='expense',
+            created_by=self.user
+        )
+        self.today = timezone.localdate()
+
+    def create(self, amount, tags, days_ago=0, user=None, transaction_type='expense'):
+        return Transaction.objects.create(
+            user=user or self.user,
+            category=self.food,
+            amount=Decimal(amount),
+            transaction_type=transaction_type,
+            date=self.today - timedelta(days=days_ago),
+            description=f'{tags} {amount}',
+            tags=tags
+        )
+
+    def tag_names(self, transaction):
+        return sorted(transaction.tag_set.values_list('name', flat=True))
+
+    def filter(self, **params):
+        response = self.client.get(reverse('transaction-list'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return sorted(item['description'] for item in response.data['results'])
+
+    def test_parse_tags(self):
+        """测试中英文分隔符拆分，去掉空白和重复标签"""
+        self.assertEqual(parse_tags(' 旅行，北京, ;旅行、 课程 '), ['旅行', '北京', '课程'])
+        self.assertEqual(parse_tags(''), [])
+
+    def test_index_follows_writes(self):
+        """测试新增、修改、删除交易后倒排索引同步更新"""
+        transaction = self.create('50.00', '旅行,北京')
+        self.assertEqual(self.tag_names(transaction), ['北京', '旅行'])
+
+        transaction.tags = '旅行,上海'
+        transaction.save()
+        self.assertEqual(self.tag_names(transaction), ['上海', '旅行'])
+
+        transaction.delete()
+        self.assertFalse(TransactionTag.objects.exists())
+
+    def test_tags_are_shared_per_user(self):
+        """测试同一用户的同名标签只建一次，不同用户各自独立"""
+        other = User.objects.create_user(username='other', password='testpass123')
+        self.create('10.00', '旅行')
+        self.create('20.00', '旅行')
+        self.create('30.00', '旅行', user=other)
+
+        self.assertEqual(Tag.objects.filter(user=self.user, name='旅行').count(), 1)
+        self.assertEqual(Tag.objects.filter(name='旅行').count(), 2)
+
+    def test_api_normalizes_tags(self):
+        """测试接口写入时统一标签分隔符"""
+        response = self.client.post(reverse('transaction-list'), {
+            'category': self.food.id,
+            'amount': '12.00',
+            'transaction_type': 'expense',
+            'date': self.today.isoformat(),
+            'tags': '旅行， 北京,旅行'
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['data']['tags'], '旅行,北京')
+
+        transaction = Transaction.objects.get(pk=response.data['data']['id'])
+        self.assertEqual(self.tag_names(transaction), ['北京', '旅行'])
+
+    def test_bulk_created_transactions_are_indexed(self):
+        """测试批量创建的交易写入倒排索引"""
+        response = self.client.post(reverse('transaction-bulk'), [
+            {'category': self.food.id, 'amount': '8.00', 'transaction_type': 'expense',
+             'date': self.today.isoformat(), 'tags': '课程,教材'},
+            {'category': self.food.id, 'amount': '9.00', 'transaction_type': 'expense',
+             'date': self.today.isoformat(), 'tags': '课程'},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(Tag.objects.get(name='课程').transactions.count(), 2)
+        self.assertEqual(Tag.objects.get(name='教材').transactions.count(), 1)
+
+    def test_filter_all_and_any(self):
+        """测试默认需带有全部标签，tag_mode=any 时带有任一标签即可"""
+        self.create('10.00', '旅行,北京')
+        self.create('20.00', '旅行,上海')
+        self.create('30.00', '课程')
+
+        self.assertEqual(self.filter(tag='旅行'), ['旅行,上海 20.00', '旅行,北京 10.00'])
+        self.assertEqual(self.filter(tag='旅行,北京'), ['旅行,北京 10.00'])
+        self.assertEqual(self.filter(tag=['旅行', '上海']), ['旅行,上海 20.00'])
+        self.assertEqual(
+            self.filter(tag='北京,课程', tag_mode='any'),
+            ['旅行,北京 10.00', '课程 30.00']
+        )
+
+    def test_filter_unknown_tag(self):
+        """测试不存在的标签：全部匹配时没有结果，任一匹配时忽略该标签"""
+        self.create('10.00', '旅行')
+
+        self.assertEqual(self.filter(tag='旅行,不存在'), [])
+        self.assertEqual(self.filter(tag='旅行,不存在', tag_mode='any'), ['旅行 10.00'])
+        self.assertEqual(self.filter(tag='不存在', tag_mode='any'), [])
+
+    def test_filter_only_own_tags(self):
+        """测试只按当前用户的标签筛选"""
+        other = User.objects.create_user(username='other', password='testpass123')
+        self.create('10.00', '旅行', user=other)
+
+        self.assertEqual(self.filter(tag='旅行'), [])
+
+    def test_tag_list(self):
+        """测试标签列表带交易笔数，不含已没有交易的标签"""
+        self.create('10.00', '旅行,北京')
+        self.create('20.00', '旅行')
+        self.create('30.00', '课程').delete()
+
+        response = self.client.get(reverse('tag-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(item['name'], item['transaction_count']) for item in response.data['data']],
+            [('北京', 1), ('旅行', 2)]
+        )
+
+    def test_tag_summary(self):
+        """测试按标签汇总区间内的支出"""
+        self.create('10.00', '旅行,北京')
+        self.create('25.50', '旅行', days_ago=3)
+        self.create('40.00', '旅行', days_ago=40)
+        self.create('5.00', '课程')
+        self.create('100.00', '旅行', transaction_type='income')
+
+        response = self.client.get(reverse('tag-summary'), {
+            'start_date': (self.today - timedelta(days=30)).isoformat()
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(item['tag'], item['total_amount'], item['transaction_count']) for item in response.data['data']],
+            [('旅行', 35.5, 2), ('北京', 10.0, 1), ('课程', 5.0, 1)]
+        )
+
+        response = self.client.get(reverse('tag-summary'), {'transaction_type': 'income'})
+        self.assertEqual(
+            [(item['tag'], item['total_amount']) for item in response.data['data']],
+            [('旅行', 100.0)]
+        )
+
+    def test_tag_summary_conditional_get(self):
+        """测试标签汇总支持 ETag，交易变动后重新计算"""
+        self.create('10.00', '旅行')
+        response = self.client.get(reverse('tag-summary'))
+        etag = response['ETag']
+
+        response = self.client.get(reverse('tag-summary'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.create('20.00', '旅行')
+        response = self.client.get(reverse('tag-summary'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data'][0]['total_amount'], 30.0)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Transaction, TransactionCategory, Budget, FinancialGoal
+from .models import Transaction, TransactionCategory, Budget, FinancialGoal, GoalContribution
 
 
 @admin.register(TransactionCategory)
@@ -32,4 +32,22 @@ class FinancialGoalAdmin(admin.ModelAdmin):
     list_display = ['user', 'name', 'goal_type', 'target_amount', 'current_amount', 'progress_percentage', 'deadline', 'is_active']
     list_filter = ['goal_type', 'is_active', 'created_at']
     search_fields = ['user__username', 'name']
-    readonly_fields = ['created_at', 'updated_at', 'progress_percentage']
\ No newline at end of file
+    readonly_fields = ['created_at', 'updated_at', 'progress_percentage']
+
+
+@admin.register(GoalContribution)
+class GoalContributionAdmin(admin.ModelAdmin):
+    list_display = ['goal', 'user', 'amount', 'source', 'transaction', 'created_at']
+    list_filter = ['source', 'created_at']
+    search_fields = ['goal__name', 'user__username', 'note']
+    readonly_fields = ['created_at']
+
+    # 进度记录经 transactions.goals 追加并同步累加目标金额，后台只读
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
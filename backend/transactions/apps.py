@@ -3,4 +3,8 @@ from django.apps import AppConfig
 
 class TransactionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'transactions'
\ No newline at end of file
+    name = 'transactions'
+
+    def ready(self):
+        """导入信号处理器"""
+        import transactions.signals
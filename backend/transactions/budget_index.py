@@ -0,0 +1,158 @@
+"""
+启用预算的进程内区间索引
+
+按用户缓存其启用中预算的周期，每个分类一棵区间树，“哪些预算覆盖某一天”在内存中即可回答，
+当前预算接口不再用 start_date/end_date 范围条件查询数据库。索引可能短暂滞后，只供只读接口
+使用；交易写入路径维护 Budget.spent_amount 时按数据库查询覆盖的预算（见 transactions.budgets）。
+
+预算保存或删除时为该用户生成新的版本戳并写入 Django 缓存，各进程查询时比较本地索引的
+版本戳，不一致则重新加载该用户的预算（一次查询）。版本戳在写入时和事务提交后各更新一次：
+前者让同一事务内的后续写入立即看到新预算，后者保证其他进程不会把提交前读到的旧数据
+当作新版本缓存。版本戳被缓存淘汰时生成新的版本戳，本地索引随之重新加载。多进程部署需使用
+共享缓存（见 settings.CACHES）；本地索引另有 TTL 秒的有效期，极端情况下（如使用进程内缓存
+或预算写入被回滚）的偏差不会长期存在。
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+
+from django.core.cache import cache
+from django.db import transaction as db_transaction
+
+from .models import Budget
+
+KEY_PREFIX = 'budget-index'
+
+# 本地最多缓存的用户数，超出后淘汰最久未使用的
+MAX_USERS = 10000
+
+# 本地索引的最长有效期（秒）
+TTL = 300
+
+
+class IntervalTree:
+    """
+    静态中心区间树
+
+    每个节点保存跨过中心点的区间（分别按起点升序、终点降序排列），完全在中心点左侧或
+    右侧的区间分到左右子树。查询覆盖某一点的区间为 O(log n + k)。
+    """
+    __slots__ = ('center', 'by_start', 'by_end', 'left', 'right')
+
+    def __init__(self, intervals):
+        """intervals 为 (start, end, item) 列表，区间为闭区间"""
+        points = sorted(point for start, end, _ in intervals for point in (start, end))
+        self.center = points[len(points) // 2]
+        overlapping, left, right = [], [], []
+        for interval in intervals:
+            if interval[1] < self.center:
+                left.append(interval)
+            elif interval[0] > self.center:
+                right.append(interval)
+            else:
+                overlapping.append(interval)
+        self.by_start = sorted(overlapping, key=lambda interval: interval[0])
+        self.by_end = sorted(overlapping, key=lambda interval: interval[1], reverse=True)
+        self.left = IntervalTree(left) if left else None
+        self.right = IntervalTree(right) if right else None
+
+    def covering(self, point):
+        """返回覆盖 point 的区间的 item 列表"""
+        found = []
+        node = self
+        while node is not None:
+            if point < node.center:
+                for start, _, item in node.by_start:
+                    if start > point:
+                        break
+                    found.append(item)
+                node = node.left
+            elif point > node.center:
+                for _, end, item in node.by_end:
+                    if end < point:
+                        break
+                    found.append(item)
+                node = node.right
+            else:
+                found.extend(item for _, _, item in node.by_start)
+                break
+        return found
+
+
+class UserBudgets:
+    """一个用户的启用预算：分类 ID → 区间树"""
+    __slots__ = ('version', 'loaded_at', 'trees')
+
+    def __init__(self, version, rows):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        intervals = defaultdict(list)
+        for budget_id, category_id, start_date, end_date in rows:
+            intervals[category_id].append((start_date, end_date, budget_id))
+        self.trees = {category_id: IntervalTree(items) for category_id, items in intervals.items()}
+
+    def covering(self, category_id, day):
+        tree = self.trees.get(category_id)
+        return tree.covering(day) if tree is not None else []
+
+    def covering_any(self, day):
+        """覆盖 day 的全部分类的预算"""
+        return [budget_id for tree in self.trees.values() for budget_id in tree.covering(day)]
+
+
+_lock = threading.Lock()
+_entries = OrderedDict()
+
+
+def _version_key(user_id):
+    return f"{KEY_PREFIX}:{user_id}"
+
+
+def get_user_budgets(user_id):
+    """返回用户的启用预算索引，版本戳变化或过期时重新加载"""
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        # 尚无版本戳或已被淘汰：写入新版本戳，不沿用淘汰前加载的本地索引
+        cache.add(_version_key(user_id), uuid.uuid4().hex, timeout=None)
+        version = cache.get(_version_key(user_id))
+    with _lock:
+        entry = _entries.get(user_id)
+        if entry is not None and entry.version == version and time.monotonic() - entry.loaded_at < TTL:
+            _entries.move_to_end(user_id)
+            return entry
+
+    rows = Budget.objects.filter(user_id=user_id, is_active=True).values_list(
+        'id', 'category_id', 'start_date', 'end_date'
+    ).order_by()
+    entry = UserBudgets(version, rows)
+    with _lock:
+        _entries[user_id] = entry
+        _entries.move_to_end(user_id)
+        while len(_entries) > MAX_USERS:
+            _entries.popitem(last=False)
+    return entry
+
+
+def covering(user_id, category_id, day):
+    """覆盖 day 的该分类启用预算 ID 列表"""
+    return get_user_budgets(user_id).covering(category_id, day)
+
+
+def _stamp(user_ids):
+    cache.set_many({_version_key(user_id): uuid.uuid4().hex for user_id in user_ids}, timeout=None)
+
+
+def invalidate(user_ids):
+    """预算变化后更新用户的版本戳，提交后再更新一次"""
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if not user_ids:
+        return
+    _stamp(user_ids)
+    db_transaction.on_commit(lambda: _stamp(user_ids))
+
+
+def clear():
+    """清空本进程的索引"""
+    with _lock:
+        _entries.clear()
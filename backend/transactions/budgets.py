@@ -0,0 +1,134 @@
+"""
+预算已用金额
+
+Budget.spent_amount 冗余保存预算周期内该分类的支出合计，预算列表无需再逐条汇总交易。
+交易新增、修改（金额、分类、日期、类型变化）和删除时，按交易快照给覆盖该日期的启用预算加减金额
+（覆盖的预算按数据库查询确定，不使用进程内的预算索引，缓存过期或失效不会导致漏记）；
+预算的用户、分类或起止日期变化，或重新启用时重新汇总该预算。原始 SQL 或 loaddata 等绕过信号的写入
+造成的偏差由 reconcile_budget_spent 命令修复。
+"""
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+
+from django.db.models import F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Budget, DailyCategoryLedger, Transaction
+
+# 决定预算已用金额的预算字段，变化时需要重新汇总
+SCOPE_FIELDS = ('user_id', 'category_id', 'start_date', 'end_date')
+
+# 查询覆盖预算时每批的（用户, 分类）数
+SCOPE_BATCH = 200
+
+# 一次写入前后的预算已用金额，before、after 均为本次写入所在事务中的准确值
+BudgetChange = namedtuple('BudgetChange', ['budget_id', 'user_id', 'amount', 'is_active', 'before', 'after'])
+
+
+def apply_changes(removed=(), added=()):
+    """
+    把交易变化同步到预算已用金额，返回各预算的 BudgetChange 列表
+
+    removed、added 为 rollups.snapshot 生成的交易快照，含义与 rollups.apply_changes 相同。
+    先按增量更新再读回，读回的是本事务写入后的值，减去增量即为写入前的值。
+    """
+    changes = defaultdict(lambda: defaultdict(Decimal))
+    for sign, entries in ((-1, removed), (1, added)):
+        for entry in entries:
+            if entry.transaction_type == 'expense':
+                changes[(entry.user_id, entry.category_id)][entry.date] += sign * entry.amount
+
+    changes = {
+        key: {day: amount for day, amount in amounts.items() if amount}
+        for key, amounts in changes.items()
+    }
+    # 只改了备注等字段时增减相互抵消，无需更新
+    changes = {key: amounts for key, amounts in changes.items() if amounts}
+    if not changes:
+        return []
+
+    # 覆盖各日期的启用预算以数据库为准，按范围条件查询，不依赖进程内索引的缓存版本；
+    # 每次查询最多 SCOPE_BATCH 个（用户, 分类），避免 OR 条件过长
+    keys = list(changes)
+    candidates = []
+    for offset in range(0, len(keys), SCOPE_BATCH):
+        scope = Q()
+        for user_id, category_id in keys[offset:offset + SCOPE_BATCH]:
+            amounts = changes[(user_id, category_id)]
+            scope |= Q(
+                user_id=user_id, category_id=category_id,
+                start_date__lte=max(amounts), end_date__gte=min(amounts)
+            )
+        candidates.extend(Budget.objects.filter(scope, is_active=True).values_list(
+            'id', 'user_id', 'category_id', 'start_date', 'end_date'
+        ).order_by())
+
+    deltas = {}
+    for budget_id, user_id, category_id, start_date, end_date in candidates:
+        delta = sum(
+            (amount for day, amount in changes[(user_id, category_id)].items() if start_date <= day <= end_date),
+            Decimal('0')
+        )
+        if delta:
+            Budget.objects.filter(pk=budget_id).update(spent_amount=F('spent_amount') + delta)
+            deltas[budget_id] = delta
+
+    if not deltas:
+        return []
+    rows = Budget.objects.filter(pk__in=deltas).values_list('id', 'user_id', 'amount', 'is_active', 'spent_amount')
+    return [
+        BudgetChange(budget_id, user_id, amount, is_active, spent - deltas[budget_id], spent)
+        for budget_id, user_id, amount, is_active, spent in rows
+    ]
+
+
+def spent_in_scope(user_id, category_id, start_date, end_date):
+    """汇总预算周期内该分类的支出"""
+    return Transaction.objects.filter(
+        user_id=user_id,
+        category_id=category_id,
+        transaction_type='expense',
+        date__range=[start_date, end_date]
+    ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+
+
+def actual_spent():
+    """按交易汇总的实际已用金额，用于 annotate 或 update 预算查询集"""
+    totals = Transaction.objects.filter(
+        user_id=OuterRef('user_id'),
+        category_id=OuterRef('category_id'),
+        transaction_type='expense',
+        date__gte=OuterRef('start_date'),
+        date__lte=OuterRef('end_date')
+    ).order_by().values('user_id').annotate(total=Sum('amount')).values('total')
+    output_field = Budget._meta.get_field('spent_amount')
+    return Coalesce(Subquery(totals, output_field=output_field), Value(Decimal('0'), output_field=output_field))
+
+
+def ledger_spent():
+    """
+    按每日分类台账计算的已用金额，用于 annotate 或 update 预算查询集
+
+    与 rollups.range_totals 相同，取截至结束日和开始日之前最后一条台账的累计值相减，
+    每个预算只需两次索引查找，不扫描交易表。
+    """
+    output_field = Budget._meta.get_field('spent_amount')
+    series = DailyCategoryLedger.objects.filter(
+        user_id=OuterRef('user_id'),
+        category_id=OuterRef('category_id'),
+        transaction_type='expense'
+    ).order_by('-date').values('cumulative_amount')
+    zero = Value(Decimal('0'), output_field=output_field)
+    return (
+        Coalesce(Subquery(series.filter(date__lte=OuterRef('end_date'))[:1], output_field=output_field), zero)
+        - Coalesce(Subquery(series.filter(date__lt=OuterRef('start_date'))[:1], output_field=output_field), zero)
+    )
+
+
+def reconcile(queryset=None):
+    """修复已用金额与交易不一致的预算，返回修复条数"""
+    queryset = Budget.objects.all() if queryset is None else queryset
+    drifted = queryset.annotate(actual=actual_spent()).exclude(spent_amount=F('actual')).order_by()
+    return Budget.objects.filter(pk__in=list(drifted.values_list('pk', flat=True))).update(
+        spent_amount=actual_spent()
+    )
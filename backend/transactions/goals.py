@@ -0,0 +1,56 @@
+"""
+财务目标进度
+
+目标的每次进度变化追加一条 GoalContribution 记录（只追加不修改），current_amount 在数据库中
+用 F() 表达式原子累加，并发的进度更新不会相互覆盖，也不再整行回写目标。累加和追加记录在
+同一事务中完成，current_amount 始终等于该目标全部记录的金额合计。
+
+事务先执行 UPDATE 再插入记录：PostgreSQL 上目标行锁只在这个短事务内持有；SQLite 上事务的
+第一条语句就是写入，直接申请写锁并按 busy timeout 排队，不会出现先读后写的锁升级冲突。
+"""
+from django.db import transaction as db_transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import FinancialGoal, GoalContribution
+
+
+def contribute(goal, amount, source='manual', transaction=None, note=''):
+    """
+    为目标追加一条进度记录并原子累加当前金额，返回新记录
+
+    goal.current_amount 更新为本次写入后的值。同一笔交易重复计入同一目标时抛出 IntegrityError，
+    整个事务回滚，当前金额不变。
+    """
+    with db_transaction.atomic():
+        FinancialGoal.objects.filter(pk=goal.pk).update(
+            current_amount=F('current_amount') + amount,
+            updated_at=timezone.now()
+        )
+        contribution = GoalContribution.objects.create(
+            goal=goal,
+            user_id=goal.user_id,
+            amount=amount,
+            source=source,
+            transaction=transaction,
+            note=note
+        )
+        goal.current_amount = FinancialGoal.objects.values_list('current_amount', flat=True).get(pk=goal.pk)
+    return contribution
+
+
+def adjust_to(goal, amount, note=''):
+    """
+    把目标的当前金额调整为 amount，差额记为一条金额调整记录
+
+    先写入 updated_at 取得目标的行锁（SQLite 上为写锁），再按数据库中的当前值计算差额，
+    与并发的进度记录互不覆盖；金额未变时不追加记录。
+    """
+    with db_transaction.atomic():
+        goals = FinancialGoal.objects.filter(pk=goal.pk)
+        goals.update(updated_at=timezone.now())
+        current = goals.values_list('current_amount', flat=True).get()
+        if current == amount:
+            goal.current_amount = current
+            return None
+        return contribute(goal, amount - current, source='adjustment', note=note)
@@ -0,0 +1,448 @@
+"""
+交易流水导入
+
+CSV 和 Excel 流水按行流式解析，每次只处理固定条数的一批：校验、映射分类、
+按内容哈希去重后 bulk_create，再通过 transactions_bulk_created 信号批量更新
+台账、版本号和预警。文件不会整体读入内存，几十万行的流水与几百行占用相同。
+
+接口上传的流水由 ImportRunner 的后台线程执行，请求只负责保存文件和创建任务，立即返回
+任务 ID，客户端轮询任务进度；进程退出时尚未执行完的任务停留在等待中或处理中，重新上传
+同一文件时已导入的记录按内容哈希跳过。
+"""
+import codecs
+import csv
+import hashlib
+import logging
+import os
+import queue
+import tempfile
+import threading
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from itertools import islice
+
+from django.conf import settings
+from django.db import close_old_connections, transaction as db_transaction
+from django.utils import timezone
+
+from .models import ImportTask, Transaction, TransactionCategory
+from .signals import transactions_bulk_created
+
+logger = logging.getLogger(__name__)
+
+# 每批处理的行数
+CHUNK_SIZE = 500
+
+# 去重时每次查询的哈希个数，低于 SQLite 旧版本的参数上限
+HASH_LOOKUP_SIZE = 500
+
+# 任务中保留的错误明细条数
+MAX_ROW_ERRORS = 100
+
+# 流水中没有分类列或分类为空时使用
+DEFAULT_CATEGORY = '其他'
+
+# 金额字段 max_digits=10、decimal_places=2 能表示的上限
+MAX_AMOUNT = Decimal('100000000')
+
+# 表头别名，匹配时忽略首尾空白和大小写
+COLUMN_ALIASES = {
+    'date': ['日期', '交易日期', '记账日期', '交易时间', 'date'],
+    'amount': ['金额', '交易金额', '收支金额', 'amount'],
+    'transaction_type': ['类型', '收支类型', '收/支', '收支', 'type', 'transaction_type'],
+    'category': ['分类', '类别', '交易分类', 'category'],
+    'description': ['备注', '摘要', '说明', '交易说明', 'description', 'notes'],
+    'tags': ['标签', 'tags'],
+    'reference': ['流水号', '交易流水号', '交易单号', 'reference'],
+}
+
+REQUIRED_COLUMNS = ('date', 'amount')
+
+TYPE_ALIASES = {
+    '支出': 'expense',
+    '支': 'expense',
+    'expense': 'expense',
+    '收入': 'income',
+    '收': 'income',
+    'income': 'income',
+}
+
+DATE_FORMATS = (
+    '%Y-%m-%d',
+    '%Y/%m/%d',
+    '%Y.%m.%d',
+    '%Y%m%d',
+    '%Y年%m月%d日',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d %H:%M',
+    '%Y/%m/%d %H:%M:%S',
+    '%Y/%m/%d %H:%M',
+)
+
+PROGRESS_FIELDS = ['processed_rows', 'imported_count', 'duplicate_count', 'error_count', 'row_errors']
+
+
+class ImportFileError(Exception):
+    """流水文件无法解析"""
+
+
+def detect_format(file_name):
+    """按扩展名判断文件格式"""
+    extension = os.path.splitext(file_name)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.xlsx', '.xlsm'):
+        return 'excel'
+    raise ImportFileError('仅支持 CSV 和 Excel（.xlsx）格式的流水文件')
+
+
+def save_upload(upload):
+    """把上传文件分块写入临时文件，返回文件路径"""
+    extension = os.path.splitext(upload.name)[1].lower()
+    with tempfile.NamedTemporaryFile(suffix=extension, delete=False) as handle:
+        for block in upload.chunks():
+            handle.write(block)
+    return handle.name
+
+
+def iter_rows(path, file_format):
+    """逐行产出单元格列表，第一行为表头"""
+    if file_format == 'excel':
+        return iter_excel_rows(path)
+    return iter_csv_rows(path)
+
+
+def iter_csv_rows(path):
+    with open(path, newline='', encoding=sniff_encoding(path)) as handle:
+        yield from csv.reader(handle)
+
+
+def sniff_encoding(path, sample_size=64 * 1024):
+    """根据文件开头判断编码：带 BOM 或能按 UTF-8 解码的视为 UTF-8，否则按 GB18030（兼容 GBK）"""
+    with open(path, 'rb') as handle:
+        sample = handle.read(sample_size)
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    try:
+        sample.decode('utf-8')
+    except UnicodeDecodeError as exc:
+        # 采样恰好截断在多字节字符中间时仍是 UTF-8
+        if exc.reason != 'unexpected end of data':
+            return 'gb18030'
+    return 'utf-8'
+
+
+def iter_excel_rows(path):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFileError('解析 Excel 文件需要安装 openpyxl')
+
+    # 只读模式按需读取工作表，不把整个表格载入内存
+    try:
+        workbook = load_workbook(path, read_only=True, data_only=True)
+    except Exception:
+        raise ImportFileError('无法读取 Excel 文件，请确认文件为 .xlsx 格式')
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def map_columns(header):
+    """根据表头返回 {字段: 列序号}，缺少必需列时抛出 ImportFileError"""
+    lookup = {
+        alias.lower(): field
+        for field, aliases in COLUMN_ALIASES.items()
+        for alias in aliases
+    }
+    columns = {}
+    for index, name in enumerate(header):
+        field = lookup.get(_text(name).lower())
+        if field and field not in columns:
+            columns[field] = index
+
+    missing = [COLUMN_ALIASES[field][0] for field in REQUIRED_COLUMNS if field not in columns]
+    if missing:
+        raise ImportFileError(f"缺少必需的列：{'、'.join(missing)}")
+    return columns
+
+
+def iter_records(rows):
+    """把原始行映射为字段字典，产出 (行号, 字段)，跳过空行"""
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        raise ImportFileError('文件内容为空')
+    columns = map_columns(header)
+
+    for number, row in enumerate(rows, start=2):
+        if not any(_text(cell) for cell in row):
+            continue
+        yield number, {
+            field: row[index] if index < len(row) else None
+            for field, index in columns.items()
+        }
+
+
+def chunked(iterable, size):
+    """把可迭代对象切分为不超过 size 条的列表"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parse_record(values, today):
+    """校验并规范化一行字段，不合法时抛出 ValueError"""
+    day = parse_day(values['date'])
+    if day > today:
+        raise ValueError('交易日期不能是未来日期')
+
+    amount = parse_amount(values['amount'])
+    transaction_type = parse_type(values.get('transaction_type'), amount)
+    amount = abs(amount)
+    if amount == 0:
+        raise ValueError('金额必须大于0')
+    if amount >= MAX_AMOUNT:
+        raise ValueError('金额超出范围')
+
+    return {
+        'date': day,
+        'amount': amount,
+        'transaction_type': transaction_type,
+        'category': _text(values.get('category'))[:100] or DEFAULT_CATEGORY,
+        'description': _text(values.get('description')),
+        'tags': _text(values.get('tags'))[:200],
+        'reference': _text(values.get('reference')),
+    }
+
+
+def parse_day(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = _text(value)
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f'日期格式不正确：{text}' if text else '日期不能为空')
+
+
+def parse_amount(value):
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        text = str(value)
+    else:
+        text = _text(value)
+        for symbol in (',', '，', '¥', '￥', '元', ' '):
+            text = text.replace(symbol, '')
+    try:
+        amount = Decimal(text)
+    except InvalidOperation:
+        raise ValueError(f'金额格式不正确：{_text(value)}' if text else '金额不能为空')
+    if not amount.is_finite():
+        raise ValueError(f'金额格式不正确：{_text(value)}')
+    return amount.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def parse_type(value, amount):
+    """有收支类型列时按列取值，否则按金额正负判断（负数为支出）"""
+    text = _text(value).lower()
+    if not text:
+        return 'expense' if amount < 0 else 'income'
+    if text not in TYPE_ALIASES:
+        raise ValueError(f'无法识别的收支类型：{_text(value)}')
+    return TYPE_ALIASES[text]
+
+
+def content_hash(record):
+    """
+    交易内容哈希，用于跨文件、跨批次去重
+
+    流水号参与计算：同一文件中所有字段都相同且没有流水号的两行视为重复。
+    """
+    raw = '\x1f'.join([
+        record['date'].isoformat(),
+        record['transaction_type'],
+        f"{record['amount']:.2f}",
+        record['category'],
+        record['description'],
+        record['reference'],
+    ])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class CategoryResolver:
+    """按 (名称, 类型) 查找用户分类，缺少时新建；只缓存分类，不随行数增长"""
+
+    def __init__(self, user):
+        self.user = user
+        # 同名分类优先使用启用中的
+        self.categories = {
+            (category.name, category.type): category
+            for category in TransactionCategory.objects.filter(created_by=user).order_by('is_active', 'id')
+        }
+
+    def get(self, name, transaction_type):
+        key = (name, transaction_type)
+        if key not in self.categories:
+            self.categories[key], _ = TransactionCategory.objects.get_or_create(
+                created_by=self.user, name=name, type=transaction_type
+            )
+        return self.categories[key]
+
+
+def import_chunk(user, records, categories):
+    """导入一批已校验的记录，返回 (导入条数, 重复条数)"""
+    # 批内重复只保留第一条
+    pending = {}
+    for record in records:
+        pending.setdefault(content_hash(record), record)
+
+    hashes = list(pending)
+    for start in range(0, len(hashes), HASH_LOOKUP_SIZE):
+        existing = Transaction.objects.filter(
+            user=user,
+            content_hash__in=hashes[start:start + HASH_LOOKUP_SIZE]
+        ).values_list('content_hash', flat=True)
+        for digest in existing:
+            pending.pop(digest, None)
+
+    instances = [
+        Transaction(
+            user=user,
+            category=categories.get(record['category'], record['transaction_type']),
+            amount=record['amount'],
+            transaction_type=record['transaction_type'],
+            date=record['date'],
+            description=record['description'],
+            tags=record['tags'],
+            content_hash=digest,
+        )
+        for digest, record in pending.items()
+    ]
+    if instances:
+        with db_transaction.atomic():
+            instances = Transaction.objects.bulk_create(instances)
+            transactions_bulk_created.send(sender=Transaction, instances=instances)
+    return len(instances), len(records) - len(instances)
+
+
+def run_import(task, path, chunk_size=CHUNK_SIZE, on_progress=None):
+    """
+    执行导入任务，每处理完一批更新一次任务进度，返回任务
+
+    文件格式或表头错误以及其他意外错误时任务标记为失败；单行错误只计数并记录明细，不中断导入。
+    已导入的批次不会因后续批次失败而回滚，重新导入同一文件时按内容哈希跳过。
+    """
+    task.status = 'processing'
+    task.save(update_fields=['status'])
+
+    today = timezone.localdate()
+    categories = CategoryResolver(task.user)
+    try:
+        records = iter_records(iter_rows(path, task.file_format))
+        for chunk in chunked(records, chunk_size):
+            valid = []
+            for number, values in chunk:
+                try:
+                    valid.append(parse_record(values, today))
+                except ValueError as exc:
+                    task.error_count += 1
+                    if len(task.row_errors) < MAX_ROW_ERRORS:
+                        task.row_errors.append({'row': number, 'error': str(exc)})
+
+            imported, duplicates = import_chunk(task.user, valid, categories)
+            task.processed_rows += len(chunk)
+            task.imported_count += imported
+            task.duplicate_count += duplicates
+            task.save(update_fields=PROGRESS_FIELDS)
+            if on_progress is not None:
+                on_progress(task)
+    except ImportFileError as exc:
+        task.status = 'failed'
+        task.error_message = str(exc)
+    except UnicodeDecodeError:
+        task.status = 'failed'
+        task.error_message = '无法识别文件编码，请另存为 UTF-8 或 GBK 编码的 CSV 文件'
+    except csv.Error as exc:
+        task.status = 'failed'
+        task.error_message = f'CSV 格式不正确：{exc}'
+    except Exception:
+        # 数据库或解析库的意外错误也要结束任务，否则任务一直停在处理中
+        logger.exception('导入任务 %s 执行失败', task.task_id)
+        task.status = 'failed'
+        task.error_message = '导入过程中发生内部错误，已导入的批次会保留，请稍后重新导入'
+    else:
+        task.status = 'completed'
+    task.completed_at = timezone.now()
+    task.save(update_fields=['status', 'error_message', 'completed_at'])
+    return task
+
+
+def run_upload(task_id, path):
+    """执行上传的导入任务并删除临时文件"""
+    try:
+        task = ImportTask.objects.get(pk=task_id)
+        run_import(task, path)
+    finally:
+        os.remove(path)
+
+
+class ImportRunner:
+    """导入任务队列和后台线程，导入不占用请求处理时间"""
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def submit(self, task_id, path):
+        """提交已保存的上传文件；未启用后台线程时在当前线程直接执行"""
+        if not settings.IMPORT_ASYNC:
+            run_upload(task_id, path)
+            return
+        self._ensure_worker()
+        self.queue.put((task_id, path))
+
+    def flush(self):
+        """在当前线程执行队列中剩余的任务"""
+        while True:
+            try:
+                task_id, path = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            run_upload(task_id, path)
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='transaction-import', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            task_id, path = self.queue.get()
+            close_old_connections()
+            try:
+                run_upload(task_id, path)
+            except Exception:
+                logger.exception('导入任务 %s 执行失败', task_id)
+            finally:
+                close_old_connections()
+
+
+runner = ImportRunner()
+
+
+def _text(value):
+    if value is None:
+        return ''
+    return str(value).strip()
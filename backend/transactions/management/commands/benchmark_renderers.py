@@ -0,0 +1,113 @@
+import json
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from alerts.models import Alert
+from alerts.serializers import AlertSerializer
+from config.renderers import FastJSONRenderer
+from finance.models import FeeCategory, FeeRecord
+from finance.serializers import FeeRecordSerializer
+from students.models import Student
+from transactions.rows import transaction_row_mapper
+
+
+class Command(BaseCommand):
+    help = '对比 DRF JSONRenderer 与 FastJSONRenderer 渲染大列表的耗时和字节数，数据在内存中构造，不访问数据库'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='每个列表的条数')
+        parser.add_argument('--repeat', type=int, default=3, help='每种渲染器重复次数，取最快一次')
+
+    def handle(self, *args, **options):
+        count = options['rows']
+        repeat = max(options['repeat'], 1)
+        values = self.transaction_values(count)
+        payloads = [
+            ('交易列表', transaction_row_mapper().map(values)),
+            ('交易原始值', values),
+            ('预警列表', AlertSerializer(self.alerts(count), many=True).data),
+            ('缴费记录', FeeRecordSerializer(self.fee_records(count), many=True).data),
+        ]
+
+        self.stdout.write(
+            f"{'数据':<8} {'条数':>8} {'DRF':>12} {'orjson':>12} {'加速':>8} {'DRF字节':>12} {'orjson字节':>12}"
+        )
+        for name, rows in payloads:
+            data = {'code': 200, 'message': '获取成功', 'data': rows}
+            default = self.measure(repeat, JSONRenderer(), data)
+            fast = self.measure(repeat, FastJSONRenderer(), data)
+            if default['payload'] != fast['payload'] and json.loads(default['payload']) != json.loads(fast['payload']):
+                raise CommandError(f'{name}的渲染结果不一致')
+
+            self.stdout.write(
+                f"{name:<8} {count:>8} {default['seconds'] * 1000:>10.1f}ms {fast['seconds'] * 1000:>10.1f}ms "
+                f"{default['seconds'] / fast['seconds']:>7.1f}x "
+                f"{len(default['payload']):>12} {len(fast['payload']):>12}"
+            )
+
+    def transaction_values(self, count):
+        """.values() 形式的交易行，包含 Decimal、date 和 datetime 原值"""
+        now = timezone.now()
+        return [
+            {
+                'id': index + 1,
+                'user_id': 1,
+                'category_id': index % 5 + 1,
+                'category__name': f'分类{index % 5}',
+                'category__color': '#409EFF',
+                'amount': Decimal(index % 500) + Decimal('0.50'),
+                'transaction_type': 'expense',
+                'date': (now - timedelta(days=index % 365)).date(),
+                'description': f'测试交易{index}',
+                'tags': '测试,旅行',
+                'created_at': now - timedelta(minutes=index),
+                'updated_at': now,
+            }
+            for index in range(count)
+        ]
+
+    def alerts(self, count):
+        now = timezone.now()
+        return [
+            Alert(
+                id=index + 1, alert_type='budget', title=f'预算预警{index}',
+                message=f'分类{index % 5}的支出已达到预算的 {80 + index % 20}%', priority='medium',
+                related_id=index % 50, related_type='budget', created_at=now,
+                expires_at=now + timedelta(days=7)
+            )
+            for index in range(count)
+        ]
+
+    def fee_records(self, count):
+        now = timezone.now()
+        students = [Student(id=index + 1, name=f'学生{index}') for index in range(50)]
+        categories = [
+            FeeCategory(id=index + 1, name=f'费用{index}', amount=Decimal('1200.00'))
+            for index in range(5)
+        ]
+        return [
+            FeeRecord(
+                id=index + 1, student=students[index % len(students)],
+                category=categories[index % len(categories)],
+                amount=Decimal('1200.00'), paid_amount=Decimal(index % 1200) + Decimal('0.50'),
+                due_date=now.date(), paid_date=now, status='partial', description='',
+                created_at=now, updated_at=now
+            )
+            for index in range(count)
+        ]
+
+    def measure(self, repeat, renderer, data):
+        """重复渲染，返回最快一次的耗时和输出"""
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            payload = renderer.render(data)
+            seconds = time.perf_counter() - started
+            if best is None or seconds < best['seconds']:
+                best = {'seconds': seconds, 'payload': payload}
+        return best
@@ -0,0 +1,89 @@
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction as db_transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from transactions.models import Transaction, TransactionCategory
+from transactions.rows import transaction_row_mapper
+from transactions.serializers import TransactionSerializer
+
+
+class Command(BaseCommand):
+    help = '对比交易列表使用 TransactionSerializer 与行映射输出的耗时，测试数据在回滚的事务中生成'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000], help='每轮的交易条数')
+        parser.add_argument('--repeat', type=int, default=3, help='每种方式重复次数，取最快一次')
+
+    def handle(self, *args, **options):
+        repeat = max(options['repeat'], 1)
+        self.stdout.write(
+            f"{'条数':>8} {'序列化器':>12} {'查询数':>6} {'序列化器+关联':>12} {'查询数':>6} "
+            f"{'行映射':>12} {'查询数':>6} {'加速':>8}"
+        )
+        for count in options['rows']:
+            with db_transaction.atomic():
+                queryset = self.create_transactions(count)
+                mapper = transaction_row_mapper()
+                serializer = self.measure(repeat, lambda: TransactionSerializer(queryset.all(), many=True).data)
+                related = self.measure(
+                    repeat, lambda: TransactionSerializer(queryset.select_related('category'), many=True).data
+                )
+                fast = self.measure(repeat, lambda: mapper.map(mapper.values(queryset)))
+                if not serializer['payload'] == related['payload'] == fast['payload']:
+                    raise CommandError(f'{count} 条数据的输出不一致')
+                db_transaction.set_rollback(True)
+
+            self.stdout.write(
+                f"{count:>8} {serializer['seconds'] * 1000:>10.1f}ms {serializer['queries']:>6} "
+                f"{related['seconds'] * 1000:>10.1f}ms {related['queries']:>6} "
+                f"{fast['seconds'] * 1000:>10.1f}ms {fast['queries']:>6} "
+                f"{serializer['seconds'] / fast['seconds']:>7.1f}x"
+            )
+
+    def create_transactions(self, count):
+        """生成一个临时用户及其交易，分类之间交替以体现逐行查询分类的开销"""
+        user = User.objects.create(username=f'benchmark-{uuid.uuid4().hex[:12]}')
+        categories = [
+            TransactionCategory.objects.create(name=f'分类{index}', created_by=user)
+            for index in range(5)
+        ]
+        today = timezone.localdate()
+        Transaction.objects.bulk_create([
+            Transaction(
+                user=user,
+                category=categories[index % len(categories)],
+                amount=Decimal(index % 500) + Decimal('0.5'),
+                transaction_type='expense',
+                date=today - timedelta(days=index % 365),
+                description=f'测试交易{index}',
+                tags='测试'
+            )
+            for index in range(count)
+        ], batch_size=500)
+        # 与原列表接口相同，不预先关联分类
+        return Transaction.objects.filter(user=user).order_by('-date', '-created_at', '-id')
+
+    def measure(self, repeat, build):
+        """重复查询、构造并渲染 JSON，返回最快一次的耗时、查询数和输出"""
+        best = None
+        for _ in range(repeat):
+            queries = []
+
+            def count_query(execute, sql, params, many, context):
+                queries.append(sql)
+                return execute(sql, params, many, context)
+
+            with connection.execute_wrapper(count_query):
+                started = time.perf_counter()
+                payload = JSONRenderer().render(build())
+                seconds = time.perf_counter() - started
+            if best is None or seconds < best['seconds']:
+                best = {'seconds': seconds, 'queries': len(queries), 'payload': payload}
+        return best
@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from transactions.sync import compact_tombstones
+
+
+class Command(BaseCommand):
+    help = '清理过期的交易删除记录（增量同步墓碑），建议每天定时执行'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.TOMBSTONE_RETENTION_DAYS,
+            help='保留最近多少天的删除记录，默认取 TOMBSTONE_RETENTION_DAYS'
+        )
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=max(options['days'], 0))
+        count = compact_tombstones(before)
+        self.stdout.write(self.style.SUCCESS(f'已清理 {count} 条删除记录'))
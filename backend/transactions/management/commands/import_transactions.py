@@ -0,0 +1,50 @@
+import os
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from transactions.importers import CHUNK_SIZE, ImportFileError, detect_format, run_import
+from transactions.models import ImportTask
+
+
+class Command(BaseCommand):
+    help = '从 CSV 或 Excel 流水文件导入交易记录'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='流水文件路径（.csv 或 .xlsx）')
+        parser.add_argument('--user', type=int, dest='user_id', required=True, help='导入到指定用户ID')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='每批处理的行数')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.isfile(path):
+            raise CommandError(f'文件不存在：{path}')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size 必须大于0')
+        try:
+            user = User.objects.get(pk=options['user_id'])
+        except User.DoesNotExist:
+            raise CommandError(f"用户不存在：{options['user_id']}")
+        try:
+            file_format = detect_format(path)
+        except ImportFileError as exc:
+            raise CommandError(str(exc))
+
+        task = ImportTask.objects.create(
+            user=user,
+            task_id=uuid.uuid4().hex,
+            file_name=os.path.basename(path)[:200],
+            file_format=file_format
+        )
+        run_import(
+            task,
+            path,
+            chunk_size=options['chunk_size'],
+            on_progress=lambda task: self.stdout.write(f'已处理 {task.processed_rows} 行')
+        )
+
+        if task.status == 'failed':
+            raise CommandError(f'导入失败：{task.error_message}')
+        self.stdout.write(self.style.SUCCESS(
+            f'导入完成：新增 {task.imported_count} 条，重复 {task.duplicate_count} 条，错误 {task.error_count} 条'
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from transactions.rollups import rebuild_monthly_ledger, rebuild_daily_ledger, rebuild_cohort_ledger
+
+
+class Command(BaseCommand):
+    help = '根据原始交易记录重建汇总台账'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, dest='user_id', help='只重建指定用户ID的台账')
+
+    def handle(self, *args, **options):
+        user_id = options.get('user_id')
+        monthly = rebuild_monthly_ledger(user_id=user_id)
+        daily = rebuild_daily_ledger(user_id=user_id)
+        self.stdout.write(self.style.SUCCESS(
+            f'汇总台账重建完成：月度台账 {monthly} 行，每日分类台账 {daily} 行'
+        ))
+        # 群体台账跨用户汇总，只在全量重建时重建
+        if user_id is None:
+            cohort = rebuild_cohort_ledger()
+            self.stdout.write(self.style.SUCCESS(f'群体收支台账重建完成：{cohort} 行'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from transactions.search import is_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = '根据交易记录重建备注和标签的全文索引'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, dest='user_id', help='只重建指定用户ID的索引')
+
+    def handle(self, *args, **options):
+        if not is_available():
+            self.stdout.write(self.style.WARNING('当前数据库未启用 FTS5 全文索引，检索使用模糊匹配，无需重建'))
+            return
+        count = rebuild_index(user_id=options.get('user_id'))
+        self.stdout.write(self.style.SUCCESS(f'全文索引重建完成：{count} 条交易记录'))
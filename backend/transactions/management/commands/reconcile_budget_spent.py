@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from transactions.budgets import reconcile
+from transactions.models import Budget
+
+
+class Command(BaseCommand):
+    help = '按交易重新汇总预算已用金额，修复与交易不一致的预算'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, dest='user_id', help='只校对指定用户ID的预算')
+
+    def handle(self, *args, **options):
+        queryset = Budget.objects.all()
+        if options.get('user_id') is not None:
+            queryset = queryset.filter(user_id=options['user_id'])
+        count = reconcile(queryset)
+        self.stdout.write(self.style.SUCCESS(f'预算已用金额校对完成：修复 {count} 条'))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from transactions.rollover import rollover_budgets
+
+
+class Command(BaseCommand):
+    help = '为周期已结束的自动续期预算生成下一周期的预算，建议每天凌晨定时执行，重复执行不会重复生成'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='以该日期（YYYY-MM-DD）判断预算是否到期，默认今天')
+
+    def handle(self, *args, **options):
+        on = None
+        if options.get('date'):
+            on = parse_date(options['date'])
+            if on is None:
+                raise CommandError(f"无效的日期格式: {options['date']}")
+        started = time.perf_counter()
+        count = rollover_budgets(on)
+        self.stdout.write(self.style.SUCCESS(
+            f'预算续期完成：生成 {count} 条预算，耗时 {time.perf_counter() - started:.2f} 秒'
+        ))
@@ -0,0 +1,64 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:31
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Sum, Count
+from django.db.models.functions import ExtractYear, ExtractMonth
+
+
+def populate_monthly_ledger(apps, schema_editor):
+    """根据已有交易初始化月度台账"""
+    Transaction = apps.get_model('transactions', 'Transaction')
+    MonthlyLedger = apps.get_model('transactions', 'MonthlyLedger')
+    rows = Transaction.objects.annotate(
+        year=ExtractYear('date'),
+        month=ExtractMonth('date')
+    ).values('user_id', 'year', 'month', 'transaction_type').annotate(
+        total=Sum('amount'),
+        count=Count('id')
+    ).order_by()
+    MonthlyLedger.objects.bulk_create([
+        MonthlyLedger(
+            user_id=row['user_id'],
+            year=row['year'],
+            month=row['month'],
+            transaction_type=row['transaction_type'],
+            total_amount=row['total'],
+            transaction_count=row['count'],
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('transactions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField(verbose_name='年份')),
+                ('month', models.PositiveSmallIntegerField(verbose_name='月份')),
+                ('transaction_type', models.CharField(choices=[('expense', '支出'), ('income', '收入')], max_length=10, verbose_name='交易类型')),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='合计金额')),
+                ('transaction_count', models.IntegerField(default=0, verbose_name='交易笔数')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_ledgers', to=settings.AUTH_USER_MODEL, verbose_name='用户')),
+            ],
+            options={
+                'verbose_name': '月度收支台账',
+                'verbose_name_plural': '月度收支台账',
+                'ordering': ['year', 'month'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='monthlyledger',
+            constraint=models.UniqueConstraint(fields=('user', 'year', 'month', 'transaction_type'), name='unique_monthly_ledger'),
+        ),
+        migrations.RunPython(populate_monthly_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:33
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from decimal import Decimal
+from django.db.models import Sum, Count
+
+
+def populate_daily_ledger(apps, schema_editor):
+    """根据已有交易初始化每日分类台账及累计值"""
+    Transaction = apps.get_model('transactions', 'Transaction')
+    DailyCategoryLedger = apps.get_model('transactions', 'DailyCategoryLedger')
+    rows = Transaction.objects.values(
+        'user_id', 'category_id', 'transaction_type', 'date'
+    ).annotate(
+        total=Sum('amount'),
+        count=Count('id')
+    ).order_by('user_id', 'category_id', 'transaction_type', 'date')
+
+    ledgers = []
+    series = None
+    cumulative_amount, cumulative_count = Decimal('0'), 0
+    for row in rows:
+        key = (row['user_id'], row['category_id'], row['transaction_type'])
+        if key != series:
+            series = key
+            cumulative_amount, cumulative_count = Decimal('0'), 0
+        cumulative_amount += row['total']
+        cumulative_count += row['count']
+        ledgers.append(DailyCategoryLedger(
+            user_id=row['user_id'],
+            category_id=row['category_id'],
+            transaction_type=row['transaction_type'],
+            date=row['date'],
+            total_amount=row['total'],
+            transaction_count=row['count'],
+            cumulative_amount=cumulative_amount,
+            cumulative_count=cumulative_count,
+        ))
+    DailyCategoryLedger.objects.bulk_create(ledgers, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('transactions', '0002_monthly_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCategoryLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transaction_type', models.CharField(choices=[('expense', '支出'), ('income', '收入')], max_length=10, verbose_name='交易类型')),
+                ('date', models.DateField(verbose_name='日期')),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='当日金额')),
+                ('transaction_count', models.IntegerField(default=0, verbose_name='当日笔数')),
+                ('cumulative_amount', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='累计金额')),
+                ('cumulative_count', models.IntegerField(default=0, verbose_name='累计笔数')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='transactions.transactioncategory', verbose_name='分类')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_ledgers', to=settings.AUTH_USER_MODEL, verbose_name='用户')),
+            ],
+            options={
+                'verbose_name': '每日分类台账',
+                'verbose_name_plural': '每日分类台账',
+                'ordering': ['date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailycategoryledger',
+            constraint=models.UniqueConstraint(fields=('user', 'category', 'transaction_type', 'date'), name='unique_daily_category_ledger'),
+        ),
+        migrations.RunPython(populate_daily_ledger, migrations.RunPython.noop),
+    ]
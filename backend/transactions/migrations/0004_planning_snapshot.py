@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('transactions', '0003_daily_category_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlanningSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_end', models.DateField(verbose_name='统计截止日')),
+                ('data', models.JSONField(verbose_name='建议数据')),
+                ('computed_at', models.DateTimeField(verbose_name='计算时间')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='planning_snapshot', to=settings.AUTH_USER_MODEL, verbose_name='用户')),
+            ],
+            options={
+                'verbose_name': '预算建议快照',
+                'verbose_name_plural': '预算建议快照',
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:45
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+def populate_data_versions(apps, schema_editor):
+    """为已有用户建立版本号记录，删除交易时只需递增无需建行"""
+    User = apps.get_model('auth', 'User')
+    DataVersion = apps.get_model('transactions', 'DataVersion')
+    now = timezone.now()
+    DataVersion.objects.bulk_create(
+        [DataVersion(user_id=user_id, version=1, changed_at=now)
+         for user_id in User.objects.values_list('id', flat=True)],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('transactions', '0004_planning_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='data_version', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='用户')),
+                ('version', models.BigIntegerField(default=0, verbose_name='版本号')),
+                ('changed_at', models.DateTimeField(verbose_name='变更时间')),
+            ],
+            options={
+                'verbose_name': '数据版本',
+                'verbose_name_plural': '数据版本',
+            },
+        ),
+        migrations.RunPython(populate_data_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Sum, Count
+from django.db.models.functions import ExtractYear, ExtractMonth
+
+
+def populate_cohort_ledger(apps, schema_editor):
+    """根据已有学生的交易初始化群体收支台账"""
+    Transaction = apps.get_model('transactions', 'Transaction')
+    CohortLedger = apps.get_model('transactions', 'CohortLedger')
+    rows = Transaction.objects.filter(user__student__isnull=False).annotate(
+        year=ExtractYear('date'),
+        month=ExtractMonth('date')
+    ).values(
+        'user__student__grade', 'user__student__class_name', 'user__student__major',
+        'category_id', 'year', 'month', 'transaction_type'
+    ).annotate(
+        total=Sum('amount'),
+        count=Count('id')
+    ).order_by()
+    CohortLedger.objects.bulk_create([
+        CohortLedger(
+            grade=row['user__student__grade'],
+            class_name=row['user__student__class_name'],
+            major=row['user__student__major'],
+            category_id=row['category_id'],
+            year=row['year'],
+            month=row['month'],
+            transaction_type=row['transaction_type'],
+            total_amount=row['total'],
+            transaction_count=row['count'],
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0001_initial'),
+        ('transactions', '0005_data_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CohortLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grade', models.CharField(blank=True, max_length=20, verbose_name='年级')),
+                ('class_name', models.CharField(blank=True, max_length=50, verbose_name='班级')),
+                ('major', models.CharField(blank=True, max_length=100, verbose_name='专业')),
+                ('year', models.IntegerField(verbose_name='年份')),
+                ('month', models.IntegerField(verbose_name='月份')),
+                ('transaction_type', models.CharField(choices=[('expense', '支出'), ('income', '收入')], max_length=10, verbose_name='交易类型')),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='合计金额')),
+                ('transaction_count', models.IntegerField(default=0, verbose_name='交易笔数')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='transactions.transactioncategory', verbose_name='分类')),
+            ],
+            options={
+                'verbose_name': '群体收支台账',
+                'verbose_name_plural': '群体收支台账',
+                'ordering': ['year', 'month'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='cohortledger',
+            constraint=models.UniqueConstraint(fields=('grade', 'class_name', 'major', 'category', 'year', 'month', 'transaction_type'), name='unique_cohort_ledger'),
+        ),
+        migrations.RunPython(populate_cohort_ledger, migrations.RunPython.noop),
+    ]
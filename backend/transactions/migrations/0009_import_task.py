@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:09
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('transactions', '0008_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_id', models.CharField(max_length=50, unique=True, verbose_name='任务ID')),
+                ('file_name', models.CharField(max_length=200, verbose_name='文件名')),
+                ('file_format', models.CharField(choices=[('csv', 'CSV'), ('excel', 'Excel')], max_length=10, verbose_name='文件格式')),
+                ('status', models.CharField(choices=[('pending', '等待中'), ('processing', '处理中'), ('completed', '已完成'), ('failed', '失败')], default='pending', max_length=20, verbose_name='任务状态')),
+                ('processed_rows', models.PositiveIntegerField(default=0, verbose_name='已处理行数')),
+                ('imported_count', models.PositiveIntegerField(default=0, verbose_name='导入条数')),
+                ('duplicate_count', models.PositiveIntegerField(default=0, verbose_name='重复条数')),
+                ('error_count', models.PositiveIntegerField(default=0, verbose_name='错误条数')),
+                ('row_errors', models.JSONField(blank=True, default=list, verbose_name='错误明细')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('completed_at', models.DateTimeField(blank=True, null=True, verbose_name='完成时间')),
+                ('error_message', models.TextField(blank=True, null=True, verbose_name='错误信息')),
+            ],
+            options={
+                'verbose_name': '数据导入任务',
+                'verbose_name_plural': '数据导入任务',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=64, verbose_name='内容哈希'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'content_hash'], name='transaction_user_hash_idx'),
+        ),
+        migrations.AddField(
+            model_name='importtask',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transactions_importtask', to=settings.AUTH_USER_MODEL, verbose_name='用户'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+import re
+
+from django.db import migrations
+
+FTS_TABLE = 'transactions_transaction_fts'
+
+CJK_PATTERN = re.compile(r'([\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af])')
+
+
+def segment(text):
+    return CJK_PATTERN.sub(r' \1 ', text or '')
+
+
+def create_search_index(apps, schema_editor):
+    """SQLite 下建立 FTS5 索引表并写入已有交易；其他数据库或未编译 FTS5 时跳过，检索退回 icontains"""
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        if not cursor.fetchone()[0]:
+            return
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            f"USING fts5(user_id UNINDEXED, description, tags, tokenize='unicode61 remove_diacritics 2')"
+        )
+
+        Transaction = apps.get_model('transactions', 'Transaction')
+        rows = Transaction.objects.values_list('id', 'user_id', 'description', 'tags')
+        batch = []
+        for pk, user_id, description, tags in rows.iterator(chunk_size=1000):
+            batch.append((pk, user_id, segment(description), segment(tags)))
+            if len(batch) >= 1000:
+                cursor.executemany(
+                    f'INSERT INTO {FTS_TABLE} (rowid, user_id, description, tags) VALUES (%s, %s, %s, %s)', batch
+                )
+                batch = []
+        if batch:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, user_id, description, tags) VALUES (%s, %s, %s, %s)', batch
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0009_import_task'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import re
+
+SEPARATOR_PATTERN = re.compile(r'[,，;；、]')
+
+
+def parse_tags(text):
+    names = []
+    for name in SEPARATOR_PATTERN.split(text or ''):
+        name = name.strip()[:50]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def backfill_tags(apps, schema_editor):
+    """把已有交易的标签字符串拆分写入标签表和倒排索引"""
+    Transaction = apps.get_model('transactions', 'Transaction')
+    Tag = apps.get_model('transactions', 'Tag')
+    TransactionTag = apps.get_model('transactions', 'TransactionTag')
+
+    tag_ids = {}
+    links = []
+    rows = Transaction.objects.exclude(tags='').values_list('id', 'user_id', 'tags')
+    for pk, user_id, tags in rows.iterator(chunk_size=1000):
+        for name in parse_tags(tags):
+            key = (user_id, name)
+            if key not in tag_ids:
+                tag_ids[key] = Tag.objects.create(user_id=user_id, name=name).pk
+            links.append(TransactionTag(tag_id=tag_ids[key], transaction_id=pk))
+        if len(links) >= 1000:
+            TransactionTag.objects.bulk_create(links)
+            links = []
+    TransactionTag.objects.bulk_create(links)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('transactions', '0010_transaction_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, verbose_name='标签名称')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+            ],
+            options={
+                'verbose_name': '标签',
+                'verbose_name_plural': '标签',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TransactionTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transaction_links', to='transactions.tag', verbose_name='标签')),
+                ('transaction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='transactions.transaction', verbose_name='交易记录')),
+            ],
+            options={
+                'verbose_name': '交易标签',
+                'verbose_name_plural': '交易标签',
+            },
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='transactions',
+            field=models.ManyToManyField(related_name='tag_set', through='transactions.TransactionTag', to='transactions.transaction', verbose_name='交易记录'),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tags', to=settings.AUTH_USER_MODEL, verbose_name='用户'),
+        ),
+        migrations.AddConstraint(
+            model_name='transactiontag',
+            constraint=models.UniqueConstraint(fields=('tag', 'transaction'), name='unique_transaction_tag'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='unique_user_tag'),
+        ),
+        migrations.RunPython(backfill_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:56
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_spent_amount(apps, schema_editor):
+    """按交易汇总现有预算的已用金额"""
+    Budget = apps.get_model('transactions', 'Budget')
+    Transaction = apps.get_model('transactions', 'Transaction')
+    totals = Transaction.objects.filter(
+        user_id=OuterRef('user_id'),
+        category_id=OuterRef('category_id'),
+        transaction_type='expense',
+        date__gte=OuterRef('start_date'),
+        date__lte=OuterRef('end_date')
+    ).order_by().values('user_id').annotate(total=Sum('amount')).values('total')
+    output_field = Budget._meta.get_field('spent_amount')
+    Budget.objects.update(spent_amount=Coalesce(
+        Subquery(totals, output_field=output_field), Value(Decimal('0'), output_field=output_field)
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0012_transaction_change_sync'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='budget',
+            name='spent_amount',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12, verbose_name='已用金额'),
+        ),
+        migrations.RunPython(backfill_spent_amount, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0013_budget_spent_amount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='budget',
+            name='auto_renew',
+            field=models.BooleanField(default=True, verbose_name='自动续期'),
+        ),
+        migrations.AddField(
+            model_name='budget',
+            name='carried_over',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12, verbose_name='结转金额'),
+        ),
+        migrations.AddField(
+            model_name='budget',
+            name='carry_over',
+            field=models.BooleanField(default=False, verbose_name='结余结转'),
+        ),
+        migrations.AddField(
+            model_name='budget',
+            name='previous',
+            field=models.OneToOneField(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='next_budget', to='transactions.budget', verbose_name='上一周期预算'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:14
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_contributions(apps, schema_editor):
+    """为已有进度的目标补一条金额调整记录，使当前金额等于记录合计"""
+    FinancialGoal = apps.get_model('transactions', 'FinancialGoal')
+    GoalContribution = apps.get_model('transactions', 'GoalContribution')
+    goals = FinancialGoal.objects.exclude(current_amount=0).values_list('id', 'user_id', 'current_amount')
+    GoalContribution.objects.bulk_create([
+        GoalContribution(goal_id=goal_id, user_id=user_id, amount=amount, source='adjustment', note='期初金额')
+        for goal_id, user_id, amount in goals.iterator()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('transactions', '0014_budget_rollover'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GoalContribution',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='金额')),
+                ('source', models.CharField(choices=[('manual', '手动记录'), ('transaction', '关联交易'), ('adjustment', '金额调整')], default='manual', max_length=20, verbose_name='来源')),
+                ('note', models.CharField(blank=True, max_length=200, verbose_name='备注')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('goal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contributions', to='transactions.financialgoal', verbose_name='财务目标')),
+                ('transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='goal_contributions', to='transactions.transaction', verbose_name='关联交易')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='用户')),
+            ],
+            options={
+                'verbose_name': '目标进度记录',
+                'verbose_name_plural': '目标进度记录',
+                'ordering': ['-created_at', '-id'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='goalcontribution',
+            constraint=models.UniqueConstraint(fields=('goal', 'transaction'), name='unique_goal_transaction'),
+        ),
+        migrations.RunPython(backfill_contributions, migrations.RunPython.noop),
+    ]
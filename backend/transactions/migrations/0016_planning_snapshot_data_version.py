@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0015_goal_contribution'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='planningsnapshot',
+            name='data_version',
+            field=models.CharField(default='', max_length=40, verbose_name='数据版本'),
+        ),
+    ]
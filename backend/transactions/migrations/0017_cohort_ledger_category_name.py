@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:10
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def merge_by_category_name(apps, schema_editor):
+    """按分类名称归并群体台账：同一群体、月份、类型下同名分类的行合并到最早的一行"""
+    CohortLedger = apps.get_model('transactions', 'CohortLedger')
+    groups = defaultdict(list)
+    rows = CohortLedger.objects.values_list(
+        'id', 'grade', 'class_name', 'major', 'category__name', 'year', 'month', 'transaction_type',
+        'total_amount', 'transaction_count'
+    ).order_by('id')
+    for row in rows.iterator():
+        groups[row[1:8]].append((row[0], row[8], row[9]))
+
+    for key, members in groups.items():
+        keep = members[0][0]
+        CohortLedger.objects.filter(pk=keep).update(
+            category_name=key[3],
+            total_amount=sum((amount for _, amount, _ in members), Decimal('0')),
+            transaction_count=sum(count for _, _, count in members),
+        )
+        if len(members) > 1:
+            CohortLedger.objects.filter(pk__in=[pk for pk, _, _ in members[1:]]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0016_planning_snapshot_data_version'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='cohortledger',
+            name='unique_cohort_ledger',
+        ),
+        migrations.AddField(
+            model_name='cohortledger',
+            name='category_name',
+            field=models.CharField(default='', max_length=100, verbose_name='分类名称'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(merge_by_category_name, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='cohortledger',
+            name='category',
+        ),
+        migrations.AddConstraint(
+            model_name='cohortledger',
+            constraint=models.UniqueConstraint(fields=('grade', 'class_name', 'major', 'category_name', 'year', 'month', 'transaction_type'), name='unique_cohort_ledger'),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction as db_transaction
 from django.contrib.auth.models import User
 
 class TransactionCategory(models.Model):
@@ -37,6 +37,8 @@ class Transaction(models.Model):
     date = models.DateField('交易日期')
     description = models.TextField('备注', blank=True)
     tags = models.CharField('标签', max_length=200, blank=True)
+    content_hash = models.CharField('内容哈希', max_length=64, blank=True, default='')
+    change_seq = models.BigIntegerField('变更序号', default=0)
     created_at = models.DateTimeField('创建时间', auto_now_add=True)
     updated_at = models.DateTimeField('更新时间', auto_now=True)
 
@@ -44,10 +46,195 @@ class Transaction(models.Model):
         verbose_name = '交易记录'
         verbose_name_plural = '交易记录'
         ordering = ['-date', '-created_at']
+        indexes = [
+            # 交易列表的键集分页
+            models.Index(fields=['user', '-date', '-created_at', '-id'], name='transaction_user_keyset_idx'),
+            # 以下索引都以金额结尾，区间汇总可以只读索引不回表
+            # 不限类型的区间汇总（预算建议、月度趋势）
+            models.Index(fields=['user', 'date', 'transaction_type', 'category', 'amount'], name='transaction_user_date_idx'),
+            # 指定类型的区间汇总（分类统计）
+            models.Index(fields=['user', 'transaction_type', 'date', 'category', 'amount'], name='transaction_user_type_idx'),
+            # 单个分类的区间汇总（预算执行）
+            models.Index(fields=['user', 'category', 'transaction_type', 'date', 'amount'], name='transaction_user_cat_idx'),
+            # 导入时按内容哈希去重
+            models.Index(fields=['user', 'content_hash'], name='transaction_user_hash_idx'),
+            # 增量同步按变更序号读取
+            models.Index(fields=['user', 'change_seq'], name='transaction_user_change_idx'),
+        ]
 
     def __str__(self):
         return f"{self.date} - {self.category.name} - ¥{self.amount}"
 
+    def save(self, *args, **kwargs):
+        # 变更序号在 pre_save 中分配，与写入放在同一事务里，
+        # 增量同步不会先读到序号更大的记录、再错过序号更小但尚未提交的记录
+        with db_transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+class TransactionTombstone(models.Model):
+    """已删除交易的墓碑，供增量同步下发删除，定期清理"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='transaction_tombstones', verbose_name='用户')
+    transaction_id = models.BigIntegerField('交易ID')
+    change_seq = models.BigIntegerField('变更序号')
+    deleted_at = models.DateTimeField('删除时间', auto_now_add=True)
+
+    class Meta:
+        verbose_name = '交易删除记录'
+        verbose_name_plural = '交易删除记录'
+        indexes = [
+            models.Index(fields=['user', 'change_seq'], name='tombstone_user_change_idx'),
+            models.Index(fields=['deleted_at'], name='tombstone_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.transaction_id} - v{self.change_seq}"
+
+class Tag(models.Model):
+    """用户标签，由交易的标签字符串拆分得到"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tags', verbose_name='用户')
+    name = models.CharField('标签名称', max_length=50)
+    transactions = models.ManyToManyField(
+        Transaction, through='TransactionTag', related_name='tag_set', verbose_name='交易记录'
+    )
+    created_at = models.DateTimeField('创建时间', auto_now_add=True)
+
+    class Meta:
+        verbose_name = '标签'
+        verbose_name_plural = '标签'
+        ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'name'], name='unique_user_tag'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.name}"
+
+class TransactionTag(models.Model):
+    """标签倒排索引：标签 → 交易，随交易写入同步维护"""
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='transaction_links', verbose_name='标签')
+    transaction = models.ForeignKey(
+        Transaction, on_delete=models.CASCADE, related_name='tag_links', verbose_name='交易记录'
+    )
+
+    class Meta:
+        verbose_name = '交易标签'
+        verbose_name_plural = '交易标签'
+        constraints = [
+            # 按标签查交易只读该唯一索引
+            models.UniqueConstraint(fields=['tag', 'transaction'], name='unique_transaction_tag'),
+        ]
+
+    def __str__(self):
+        return f"{self.tag.name} - {self.transaction_id}"
+
+class MonthlyLedger(models.Model):
+    """月度收支台账，由交易写入路径增量维护"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='monthly_ledgers', verbose_name='用户')
+    year = models.PositiveSmallIntegerField('年份')
+    month = models.PositiveSmallIntegerField('月份')
+    transaction_type = models.CharField('交易类型', max_length=10, choices=Transaction.TRANSACTION_TYPES)
+    total_amount = models.DecimalField('合计金额', max_digits=14, decimal_places=2, default=0)
+    transaction_count = models.IntegerField('交易笔数', default=0)
+
+    class Meta:
+        verbose_name = '月度收支台账'
+        verbose_name_plural = '月度收支台账'
+        ordering = ['year', 'month']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'year', 'month', 'transaction_type'],
+                name='unique_monthly_ledger'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.year}-{self.month:02d} - {self.get_transaction_type_display()}"
+
+class DailyCategoryLedger(models.Model):
+    """按日、分类汇总的收支台账，cumulative_* 为该分类截至当日（含）的累计值"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_ledgers', verbose_name='用户')
+    category = models.ForeignKey(TransactionCategory, on_delete=models.CASCADE, verbose_name='分类')
+    transaction_type = models.CharField('交易类型', max_length=10, choices=Transaction.TRANSACTION_TYPES)
+    date = models.DateField('日期')
+    total_amount = models.DecimalField('当日金额', max_digits=14, decimal_places=2, default=0)
+    transaction_count = models.IntegerField('当日笔数', default=0)
+    cumulative_amount = models.DecimalField('累计金额', max_digits=16, decimal_places=2, default=0)
+    cumulative_count = models.IntegerField('累计笔数', default=0)
+
+    class Meta:
+        verbose_name = '每日分类台账'
+        verbose_name_plural = '每日分类台账'
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'category', 'transaction_type', 'date'],
+                name='unique_daily_category_ledger'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.date} - {self.category.name}"
+
+class CohortLedger(models.Model):
+    """全校收支立方体：年级、班级、专业 × 分类 × 月份 × 类型，只统计建有学生档案的用户"""
+    grade = models.CharField('年级', max_length=20, blank=True)
+    class_name = models.CharField('班级', max_length=50, blank=True)
+    major = models.CharField('专业', max_length=100, blank=True)
+    # 分类由各用户自建，按名称归并后立方体行数与用户数无关，也与 cohort_rollup 的分组口径一致
+    category_name = models.CharField('分类名称', max_length=100)
+    year = models.IntegerField('年份')
+    month = models.IntegerField('月份')
+    transaction_type = models.CharField('交易类型', max_length=10, choices=Transaction.TRANSACTION_TYPES)
+    total_amount = models.DecimalField('合计金额', max_digits=16, decimal_places=2, default=0)
+    transaction_count = models.IntegerField('交易笔数', default=0)
+
+    class Meta:
+        verbose_name = '群体收支台账'
+        verbose_name_plural = '群体收支台账'
+        ordering = ['year', 'month']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['grade', 'class_name', 'major', 'category_name', 'year', 'month', 'transaction_type'],
+                name='unique_cohort_ledger'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.grade} {self.class_name} {self.major} - {self.year}-{self.month:02d} - {self.category_name}"
+
+class DataVersion(models.Model):
+    """用户数据版本号，交易、预算、分类每次写入都会递增，用于缓存失效"""
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name='data_version', verbose_name='用户'
+    )
+    version = models.BigIntegerField('版本号', default=0)
+    changed_at = models.DateTimeField('变更时间')
+    # 不大于该版本号的删除记录可能已被清理，更早的同步游标需要全量重新加载
+    compacted_version = models.BigIntegerField('已清理版本号', default=0)
+
+    class Meta:
+        verbose_name = '数据版本'
+        verbose_name_plural = '数据版本'
+
+    def __str__(self):
+        return f"{self.user.username} - v{self.version}"
+
+class PlanningSnapshot(models.Model):
+    """预先计算的预算建议快照，由夜间批处理生成，交易变动时失效"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='planning_snapshot', verbose_name='用户')
+    period_end = models.DateField('统计截止日')
+    # 计算前读取的用户数据版本号，与当前版本号不一致时快照视为过期，见 statistics.planning
+    data_version = models.CharField('数据版本', max_length=40, default='')
+    data = models.JSONField('建议数据')
+    computed_at = models.DateTimeField('计算时间')
+
+    class Meta:
+        verbose_name = '预算建议快照'
+        verbose_name_plural = '预算建议快照'
+
+    def __str__(self):
+        return f"{self.user.username} - {self.period_end}"
+
 class Budget(models.Model):
     BUDGET_PERIODS = [
         ('monthly', '月度'),
@@ -60,6 +247,16 @@ class Budget(models.Model):
     period = models.CharField('预算周期', max_length=10, choices=BUDGET_PERIODS, default='monthly')
     start_date = models.DateField('开始日期')
     end_date = models.DateField('结束日期')
+    # 预算周期内该分类的支出合计，由交易写入路径维护，见 transactions.budgets
+    spent_amount = models.DecimalField('已用金额', max_digits=12, decimal_places=2, default=0, editable=False)
+    # 周期结束后由 rollover_budgets 生成下一周期的预算，见 transactions.rollover
+    auto_renew = models.BooleanField('自动续期', default=True)
+    carry_over = models.BooleanField('结余结转', default=False)
+    carried_over = models.DecimalField('结转金额', max_digits=12, decimal_places=2, default=0, editable=False)
+    previous = models.OneToOneField(
+        'self', on_delete=models.SET_NULL, null=True, blank=True, editable=False,
+        related_name='next_budget', verbose_name='上一周期预算'
+    )
     is_active = models.BooleanField('是否启用', default=True)
     created_at = models.DateTimeField('创建时间', auto_now_add=True)
     updated_at = models.DateTimeField('更新时间', auto_now=True)
@@ -68,6 +265,12 @@ class Budget(models.Model):
         verbose_name = '预算设置'
         verbose_name_plural = '预算设置'
         ordering = ['-created_at']
+        indexes = [
+            # 预算列表与当前预算按创建时间倒序，沿索引读取无需排序
+            models.Index(fields=['user', '-created_at'], name='budget_user_created_idx'),
+            # 交易所属分类的预算
+            models.Index(fields=['user', 'category', 'is_active'], name='budget_user_category_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.category.name} - ¥{self.amount}"
@@ -102,6 +305,37 @@ class FinancialGoal(models.Model):
             return 0
         return min(100, (self.current_amount / self.target_amount) * 100)
 
+class GoalContribution(models.Model):
+    """财务目标的进度记录，只追加不修改，目标的当前金额等于其全部记录的合计，见 transactions.goals"""
+    SOURCES = [
+        ('manual', '手动记录'),
+        ('transaction', '关联交易'),
+        ('adjustment', '金额调整'),
+    ]
+
+    goal = models.ForeignKey(FinancialGoal, on_delete=models.CASCADE, related_name='contributions', verbose_name='财务目标')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='用户')
+    amount = models.DecimalField('金额', max_digits=10, decimal_places=2)
+    source = models.CharField('来源', max_length=20, choices=SOURCES, default='manual')
+    transaction = models.ForeignKey(
+        Transaction, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='goal_contributions', verbose_name='关联交易'
+    )
+    note = models.CharField('备注', max_length=200, blank=True)
+    created_at = models.DateTimeField('创建时间', auto_now_add=True)
+
+    class Meta:
+        verbose_name = '目标进度记录'
+        verbose_name_plural = '目标进度记录'
+        ordering = ['-created_at', '-id']
+        constraints = [
+            # 同一笔交易只能计入同一目标一次
+            models.UniqueConstraint(fields=['goal', 'transaction'], name='unique_goal_transaction'),
+        ]
+
+    def __str__(self):
+        return f"{self.goal.name} - ¥{self.amount}"
+
 
 class Alert(models.Model):
     """财务预警"""
@@ -173,4 +407,40 @@ class ExportTask(models.Model):
         ordering = ['-created_at']
     
     def __str__(self):
-        return f"{self.user.username} - {self.file_name} ({self.get_status_display()})"
\ No newline at end of file
+        return f"{self.user.username} - {self.file_name} ({self.get_status_display()})"
+
+class ImportTask(models.Model):
+    """交易流水导入任务"""
+    FORMAT_CHOICES = (
+        ('csv', 'CSV'),
+        ('excel', 'Excel'),
+    )
+    
+    STATUS_CHOICES = (
+        ('pending', '等待中'),
+        ('processing', '处理中'),
+        ('completed', '已完成'),
+        ('failed', '失败'),
+    )
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='transactions_importtask', verbose_name='用户')
+    task_id = models.CharField(max_length=50, unique=True, verbose_name='任务ID')
+    file_name = models.CharField(max_length=200, verbose_name='文件名')
+    file_format = models.CharField(max_length=10, choices=FORMAT_CHOICES, verbose_name='文件格式')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name='任务状态')
+    processed_rows = models.PositiveIntegerField(default=0, verbose_name='已处理行数')
+    imported_count = models.PositiveIntegerField(default=0, verbose_name='导入条数')
+    duplicate_count = models.PositiveIntegerField(default=0, verbose_name='重复条数')
+    error_count = models.PositiveIntegerField(default=0, verbose_name='错误条数')
+    row_errors = models.JSONField(default=list, blank=True, verbose_name='错误明细')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    completed_at = models.DateTimeField(null=True, blank=True, verbose_name='完成时间')
+    error_message = models.TextField(null=True, blank=True, verbose_name='错误信息')
+    
+    class Meta:
+        verbose_name = '数据导入任务'
+        verbose_name_plural = '数据导入任务'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.file_name} ({self.get_status_display()})"
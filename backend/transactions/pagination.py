@@ -0,0 +1,110 @@
+"""
+交易记录键集分页
+
+按 (date, created_at, id) 倒序，用上一页最后一条记录的键定位下一页，
+查询可以直接沿复合索引定位起点，不使用 OFFSET，也不统计总数。
+"""
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """交易记录键集分页，返回不透明的 next 游标"""
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 20
+    max_page_size = 100
+    ordering = ('-date', '-created_at', '-id')
+    invalid_cursor_message = '无效的分页游标'
+
+    @classmethod
+    def requested(cls, request):
+        """带 cursor 参数或 pagination=cursor 时启用键集分页"""
+        return (
+            cls.cursor_query_param in request.query_params
+            or request.query_params.get('pagination') == 'cursor'
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            day, created_at, pk = position
+            # 先用 date <= day 限定索引扫描范围，再精确排除同一天内已返回的记录
+            queryset = queryset.filter(date__lte=day).filter(
+                Q(date__lt=day)
+                | Q(date=day, created_at__lt=created_at)
+                | Q(date=day, created_at=created_at, id__lt=pk)
+            )
+
+        # 多取一条判断是否还有下一页
+        rows = list(queryset[:size + 1])
+        self.has_next = len(rows) > size
+        self.page = rows[:size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded.encode('ascii') + b'=' * (-len(encoded) % 4))
+            data = json.loads(raw.decode('utf-8'))
+            day = parse_date(data['d'])
+            created_at = parse_datetime(data['c'])
+            pk = int(data['i'])
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if day is None or created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return day, created_at, pk
+
+    def encode_cursor(self, row):
+        # 分页对象可以是模型实例，也可以是 .values() 返回的字典
+        if isinstance(row, dict):
+            day, created_at, pk = row['date'], row['created_at'], row['id']
+        else:
+            day, created_at, pk = row.date, row.created_at, row.pk
+        data = {
+            'd': day.isoformat(),
+            'c': created_at.isoformat(),
+            'i': pk,
+        }
+        raw = json.dumps(data, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def get_next_cursor(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_next_link(self):
+        cursor = self.get_next_cursor()
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'next_cursor': self.get_next_cursor(),
+            'results': data,
+        })
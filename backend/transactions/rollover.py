@@ -0,0 +1,117 @@
+"""
+预算周期续期
+
+启用且设置了自动续期的预算在周期结束后，由 rollover_budgets 命令生成下一周期的预算：
+月度预算顺延一个月，年度预算顺延一年。新预算的 previous 指向上一周期且唯一，
+重复执行或多个进程同时执行都不会为同一预算生成两个后继。
+
+设置了结余结转的预算把上一周期未用完的金额加到新预算上，上一周期的已用金额按每日分类
+台账的累计值计算，不扫描交易表。全部到期预算一次查询读出，一次 bulk_create 写入。
+"""
+import calendar
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction as db_transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import budget_index
+from .budgets import ledger_spent
+from .models import Budget
+from .versioning import bump_versions
+
+# 每种预算周期的月数
+PERIOD_MONTHS = {'monthly': 1, 'yearly': 12}
+
+BATCH_SIZE = 500
+
+
+def shift_months_clamped(day, months):
+    """
+    顺延若干个月并保留日，目标月份没有该日时取月末
+
+    与 statistics.analytics.add_months（只平移每月第一天）不同，用于任意起止日期的预算周期。
+    """
+    month = day.month - 1 + months
+    year = day.year + month // 12
+    month = month % 12 + 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def next_period(end_date, period, on):
+    """
+    返回紧接 end_date 的下一个周期 (start, end, skipped)
+
+    该周期在 on 之前就已结束时（续期任务停过一段时间）继续顺延到未结束的周期，skipped 为 True。
+    """
+    months = PERIOD_MONTHS[period]
+    anchor = end_date + timedelta(days=1)
+    steps = 0
+    while True:
+        start = shift_months_clamped(anchor, steps * months)
+        end = shift_months_clamped(anchor, (steps + 1) * months) - timedelta(days=1)
+        if end >= on:
+            return start, end, steps > 0
+        steps += 1
+
+
+def due_budgets(on):
+    """周期已在 on 之前结束、尚未续期的预算；只看最近一个周期内结束的，不补生成久远的历史周期"""
+    recent = Q()
+    for period, months in PERIOD_MONTHS.items():
+        recent |= Q(period=period, end_date__gte=shift_months_clamped(on, -months))
+    return Budget.objects.filter(
+        recent,
+        is_active=True,
+        auto_renew=True,
+        end_date__lt=on,
+        next_budget__isnull=True
+    )
+
+
+def rollover_budgets(on=None):
+    """为到期预算生成下一周期的预算，返回实际生成的条数（已被其他任务生成的不计）"""
+    on = on or timezone.localdate()
+    rows = due_budgets(on).annotate(spent=ledger_spent()).values_list(
+        'id', 'user_id', 'category_id', 'amount', 'period', 'end_date',
+        'carry_over', 'carried_over', 'spent'
+    )
+
+    created = []
+    for budget_id, user_id, category_id, amount, period, end_date, carry_over, carried_over, spent in rows:
+        start, end, skipped = next_period(end_date, period, on)
+        # 跳过了中间周期时，上一周期的结余不再结转
+        carried = max(amount - spent, Decimal('0')) if carry_over and not skipped else Decimal('0')
+        created.append(Budget(
+            user_id=user_id,
+            category_id=category_id,
+            amount=amount - carried_over + carried,
+            period=period,
+            start_date=start,
+            end_date=end,
+            auto_renew=True,
+            carry_over=carry_over,
+            carried_over=carried,
+            previous_id=budget_id,
+        ))
+    if not created:
+        return 0
+
+    user_ids = {budget.user_id for budget in created}
+    previous_ids = [budget.previous_id for budget in created]
+    batches = [previous_ids[offset:offset + BATCH_SIZE] for offset in range(0, len(previous_ids), BATCH_SIZE)]
+    with db_transaction.atomic():
+        # 锁定上一周期预算，同时执行的续期任务在此排队；写入前后的后继数之差即本次实际生成的条数
+        for batch in batches:
+            list(Budget.objects.select_for_update().filter(pk__in=batch).values_list('pk', flat=True))
+        existing = sum(Budget.objects.filter(previous_id__in=batch).count() for batch in batches)
+        Budget.objects.bulk_create(created, batch_size=BATCH_SIZE, ignore_conflicts=True)
+        # bulk_create 不触发信号：按台账补上新周期内已有的支出，并让预算索引和缓存失效
+        successors = sum(
+            Budget.objects.filter(previous_id__in=batch).update(spent_amount=ledger_spent())
+            for batch in batches
+        )
+        budget_index.invalidate(user_ids)
+        bump_versions(user_ids)
+    return successors - existing
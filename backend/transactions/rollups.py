@@ -0,0 +1,557 @@
+"""
+交易汇总台账的增量维护
+
+交易的新增、修改、删除都会被转换成一组带符号的增量，累加到汇总表中，
+统计接口只需读取汇总表，而不必每次扫描原始交易记录。
+"""
+from collections import defaultdict, namedtuple
+from datetime import date
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import F, Q, Sum, Count, OuterRef, Subquery, Case, When
+from django.db.models.functions import ExtractYear, ExtractMonth
+from django.utils.dateparse import parse_date
+
+from students.models import Student
+from .models import Transaction, TransactionCategory, MonthlyLedger, DailyCategoryLedger, CohortLedger
+
+
+# 交易快照：计算增量只需要这几个字段
+LedgerEntry = namedtuple('LedgerEntry', ['user_id', 'category_id', 'transaction_type', 'date', 'amount'])
+
+# 区间汇总结果：某分类某类型在区间内的金额与笔数
+RangeTotal = namedtuple('RangeTotal', [
+    'category_id', 'category_name', 'category_color', 'transaction_type', 'amount', 'count'
+])
+
+SNAPSHOT_FIELDS = ['user_id', 'category_id', 'transaction_type', 'date', 'amount']
+
+# 学生群体维度：(年级, 班级, 专业)
+COHORT_FIELDS = ['grade', 'class_name', 'major']
+
+
+def snapshot(instance):
+    """生成交易快照，兼容尚未规范化的字符串日期和金额"""
+    return LedgerEntry(
+        user_id=instance.user_id,
+        category_id=instance.category_id,
+        transaction_type=instance.transaction_type,
+        date=Transaction._meta.get_field('date').to_python(instance.date),
+        amount=Transaction._meta.get_field('amount').to_python(instance.amount),
+    )
+
+
+def load_snapshot(pk):
+    """从数据库读取交易当前保存的状态"""
+    row = Transaction.objects.filter(pk=pk).values(*SNAPSHOT_FIELDS).first()
+    return LedgerEntry(**row) if row else None
+
+
+def apply_changes(removed=(), added=()):
+    """
+    把交易变化同步到汇总台账
+
+    removed 为被删除（或修改前）的交易快照，added 为新增（或修改后）的交易快照。
+    """
+    monthly = defaultdict(lambda: [Decimal('0'), 0])
+    daily = defaultdict(lambda: [Decimal('0'), 0])
+    cube = defaultdict(lambda: [Decimal('0'), 0])
+    cohorts = student_cohorts({entry.user_id for entry in (*removed, *added)})
+    category_names = _category_names({
+        entry.category_id for entry in (*removed, *added) if entry.user_id in cohorts
+    })
+    for entries, sign in ((removed, -1), (added, 1)):
+        for entry in entries:
+            key = (entry.user_id, entry.date.year, entry.date.month, entry.transaction_type)
+            monthly[key][0] += sign * entry.amount
+            monthly[key][1] += sign
+            key = (entry.user_id, entry.category_id, entry.transaction_type, entry.date)
+            daily[key][0] += sign * entry.amount
+            daily[key][1] += sign
+            if entry.user_id in cohorts:
+                key = cohorts[entry.user_id] + (
+                    category_names[entry.category_id], entry.date.year, entry.date.month, entry.transaction_type
+                )
+                cube[key][0] += sign * entry.amount
+                cube[key][1] += sign
+
+    with db_transaction.atomic():
+        for (user_id, year, month, transaction_type), (amount, count) in monthly.items():
+            if amount or count:
+                _apply_monthly(user_id, year, month, transaction_type, amount, count)
+        series = defaultdict(dict)
+        for (user_id, category_id, transaction_type, day), (amount, count) in daily.items():
+            if amount or count:
+                series[(user_id, category_id, transaction_type)][day] = (amount, count)
+        for (user_id, category_id, transaction_type), changes in series.items():
+            if len(changes) == 1:
+                (day, (amount, count)), = changes.items()
+                _apply_daily(user_id, category_id, transaction_type, day, amount, count)
+            else:
+                _apply_daily_series(user_id, category_id, transaction_type, changes)
+        _apply_cube(cube)
+
+
+def _apply_counter(model, lookup, amount, count):
+    """按 lookup 定位台账行并累加金额和笔数"""
+    updated = model.objects.filter(**lookup).update(
+        total_amount=F('total_amount') + amount,
+        transaction_count=F('transaction_count') + count,
+    )
+    # 只有净新增时才建行；删除时找不到台账说明尚未初始化或用户正在被删除
+    if updated or count <= 0:
+        return
+    try:
+        with db_transaction.atomic():
+            model.objects.create(total_amount=amount, transaction_count=count, **lookup)
+    except IntegrityError:
+        # 并发写入时另一请求已经建好了这一行
+        model.objects.filter(**lookup).update(
+            total_amount=F('total_amount') + amount,
+            transaction_count=F('transaction_count') + count,
+        )
+
+
+def _apply_monthly(user_id, year, month, transaction_type, amount, count):
+    _apply_counter(MonthlyLedger, {
+        'user_id': user_id,
+        'year': year,
+        'month': month,
+        'transaction_type': transaction_type,
+    }, amount, count)
+
+
+def _apply_cube(cube):
+    for (grade, class_name, major, category_name, year, month, transaction_type), (amount, count) in cube.items():
+        if amount or count:
+            _apply_counter(CohortLedger, {
+                'grade': grade,
+                'class_name': class_name,
+                'major': major,
+                'category_name': category_name,
+                'year': year,
+                'month': month,
+                'transaction_type': transaction_type,
+            }, amount, count)
+
+
+def student_cohorts(user_ids):
+    """查询用户所属的学生群体，返回 {user_id: (年级, 班级, 专业)}，没有学生档案的用户不出现"""
+    if not user_ids:
+        return {}
+    rows = Student.objects.filter(user_id__in=user_ids).values_list('user_id', *COHORT_FIELDS)
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+
+def _category_names(category_ids):
+    """查询分类名称，返回 {category_id: 名称}"""
+    if not category_ids:
+        return {}
+    return dict(TransactionCategory.objects.filter(id__in=category_ids).values_list('id', 'name'))
+
+
+def move_student_cohort(previous=None, current=None):
+    """
+    学生档案变动后，把用户的全部收支从原群体移到新群体
+
+    previous、current 为 (user_id, (年级, 班级, 专业)) 或 None。用户收支直接按原始交易汇总：
+    级联删除用户时每日台账可能已被清空，而交易与学生档案无论谁先删除，结果都一致。
+    """
+    cube = defaultdict(lambda: [Decimal('0'), 0])
+    for member, sign in ((previous, -1), (current, 1)):
+        if member is None:
+            continue
+        user_id, cohort = member
+        rows = Transaction.objects.filter(user_id=user_id).annotate(
+            year=ExtractYear('date'),
+            month=ExtractMonth('date')
+        ).values('category__name', 'year', 'month', 'transaction_type').annotate(
+            total=Sum('amount'),
+            count=Count('id')
+        ).order_by()
+        for row in rows:
+            key = cohort + (row['category__name'], row['year'], row['month'], row['transaction_type'])
+            cube[key][0] += sign * row['total']
+            cube[key][1] += sign * row['count']
+
+    with db_transaction.atomic():
+        _apply_cube(cube)
+
+
+def rename_category_cohort(category_id, previous_name, name):
+    """分类改名后，把学生在该分类下的收支从原名称移到新名称"""
+    rows = Transaction.objects.filter(category_id=category_id, user__student__isnull=False).annotate(
+        year=ExtractYear('date'),
+        month=ExtractMonth('date')
+    ).values(
+        'user__student__grade', 'user__student__class_name', 'user__student__major',
+        'year', 'month', 'transaction_type'
+    ).annotate(
+        total=Sum('amount'),
+        count=Count('id')
+    ).order_by()
+
+    cube = defaultdict(lambda: [Decimal('0'), 0])
+    for row in rows:
+        cohort = (row['user__student__grade'], row['user__student__class_name'], row['user__student__major'])
+        for category_name, sign in ((previous_name, -1), (name, 1)):
+            key = cohort + (category_name, row['year'], row['month'], row['transaction_type'])
+            cube[key][0] += sign * row['total']
+            cube[key][1] += sign * row['count']
+
+    with db_transaction.atomic():
+        _apply_cube(cube)
+
+
+def _apply_daily(user_id, category_id, transaction_type, day, amount, count):
+    series = DailyCategoryLedger.objects.filter(
+        user_id=user_id,
+        category_id=category_id,
+        transaction_type=transaction_type
+    )
+    updated = series.filter(date=day).update(
+        total_amount=F('total_amount') + amount,
+        transaction_count=F('transaction_count') + count,
+    )
+    if not updated:
+        if count <= 0:
+            return
+        # 新的一天：累计值从前一条记录接续
+        previous = series.filter(date__lt=day).order_by('-date').values_list(
+            'cumulative_amount', 'cumulative_count'
+        ).first() or (Decimal('0'), 0)
+        try:
+            with db_transaction.atomic():
+                DailyCategoryLedger.objects.create(
+                    user_id=user_id,
+                    category_id=category_id,
+                    transaction_type=transaction_type,
+                    date=day,
+                    total_amount=amount,
+                    transaction_count=count,
+                    cumulative_amount=previous[0] + amount,
+                    cumulative_count=previous[1] + count,
+                )
+        except IntegrityError:
+            return _apply_daily(user_id, category_id, transaction_type, day, amount, count)
+        later = series.filter(date__gt=day)
+    else:
+        later = series.filter(date__gte=day)
+
+    # 当日及之后的累计值整体平移
+    later.update(
+        cumulative_amount=F('cumulative_amount') + amount,
+        cumulative_count=F('cumulative_count') + count,
+    )
+    if count < 0:
+        series.filter(date=day, transaction_count__lte=0).delete()
+
+
+def _apply_daily_series(user_id, category_id, transaction_type, changes):
+    """
+    同一分类序列多天同时变化时一次写入
+
+    逐天调用 _apply_daily 时每一天都要单独平移之后的累计值；这里按日期的前缀和
+    用一条 CASE 更新完成已有记录的平移，新的日期批量插入，查询次数与天数无关。
+    """
+    series = DailyCategoryLedger.objects.filter(
+        user_id=user_id,
+        category_id=category_id,
+        transaction_type=transaction_type
+    )
+    days = sorted(changes)
+
+    # 截至每个变化日期的增量累计
+    prefix = []
+    running_amount, running_count = Decimal('0'), 0
+    for day in days:
+        amount, count = changes[day]
+        running_amount += amount
+        running_count += count
+        prefix.append((day, running_amount, running_count))
+
+    try:
+        with db_transaction.atomic():
+            # 变化区间内的已有记录，以及区间之前最近的一条，用于推算新日期的累计值
+            existing = {
+                day: (amount, count)
+                for day, amount, count in series.filter(
+                    date__gte=days[0], date__lte=days[-1]
+                ).order_by('date').values_list('date', 'cumulative_amount', 'cumulative_count')
+            }
+            before = series.filter(date__lt=days[0]).order_by('-date').values_list(
+                'cumulative_amount', 'cumulative_count'
+            ).first() or (Decimal('0'), 0)
+
+            # 已有记录：当日合计加上当日增量，累计值加上截至当日的增量
+            series.filter(date__gte=days[0]).update(
+                total_amount=Case(
+                    *[When(date=day, then=F('total_amount') + changes[day][0]) for day in days if day in existing],
+                    default=F('total_amount'),
+                ),
+                transaction_count=Case(
+                    *[When(date=day, then=F('transaction_count') + changes[day][1]) for day in days if day in existing],
+                    default=F('transaction_count'),
+                ),
+                cumulative_amount=Case(
+                    *[When(date__gte=day, then=F('cumulative_amount') + amount) for day, amount, _ in reversed(prefix)],
+                    default=F('cumulative_amount'),
+                ),
+                cumulative_count=Case(
+                    *[When(date__gte=day, then=F('cumulative_count') + count) for day, _, count in reversed(prefix)],
+                    default=F('cumulative_count'),
+                ),
+            )
+
+            # 新的日期：累计值从之前最近一条记录（变化前）接续
+            created = []
+            previous = before
+            existing_days = iter(sorted(existing))
+            next_existing = next(existing_days, None)
+            for day, prefix_amount, prefix_count in prefix:
+                while next_existing is not None and next_existing < day:
+                    previous = existing[next_existing]
+                    next_existing = next(existing_days, None)
+                amount, count = changes[day]
+                if day in existing or count <= 0:
+                    continue
+                created.append(DailyCategoryLedger(
+                    user_id=user_id,
+                    category_id=category_id,
+                    transaction_type=transaction_type,
+                    date=day,
+                    total_amount=amount,
+                    transaction_count=count,
+                    cumulative_amount=previous[0] + prefix_amount,
+                    cumulative_count=previous[1] + prefix_count,
+                ))
+            DailyCategoryLedger.objects.bulk_create(created)
+    except IntegrityError:
+        # 并发写入时其他请求已经建好了某天的记录，退回逐天处理
+        for day in days:
+            _apply_daily(user_id, category_id, transaction_type, day, *changes[day])
+        return
+
+    if any(count < 0 for _, count in changes.values()):
+        series.filter(date__in=days, transaction_count__lte=0).delete()
+
+
+def rebuild_monthly_ledger(user_id=None, batch_size=1000):
+    """根据原始交易记录重建月度台账，返回生成的台账行数"""
+    transactions = Transaction.objects.all()
+    ledgers = MonthlyLedger.objects.all()
+    if user_id is not None:
+        transactions = transactions.filter(user_id=user_id)
+        ledgers = ledgers.filter(user_id=user_id)
+
+    rows = transactions.annotate(
+        year=ExtractYear('date'),
+        month=ExtractMonth('date')
+    ).values('user_id', 'year', 'month', 'transaction_type').annotate(
+        total=Sum('amount'),
+        count=Count('id')
+    ).order_by()
+
+    created = 0
+    with db_transaction.atomic():
+        ledgers.delete()
+        batch = []
+        for row in rows.iterator():
+            batch.append(MonthlyLedger(
+                user_id=row['user_id'],
+                year=row['year'],
+                month=row['month'],
+                transaction_type=row['transaction_type'],
+                total_amount=row['total'],
+                transaction_count=row['count'],
+            ))
+            if len(batch) >= batch_size:
+                MonthlyLedger.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        if batch:
+            MonthlyLedger.objects.bulk_create(batch)
+            created += len(batch)
+    return created
+
+
+def rebuild_daily_ledger(user_id=None, batch_size=1000):
+    """根据原始交易记录重建每日分类台账（含累计值），返回生成的台账行数"""
+    transactions = Transaction.objects.all()
+    ledgers = DailyCategoryLedger.objects.all()
+    if user_id is not None:
+        transactions = transactions.filter(user_id=user_id)
+        ledgers = ledgers.filter(user_id=user_id)
+
+    rows = transactions.values(
+        'user_id', 'category_id', 'transaction_type', 'date'
+    ).annotate(
+        total=Sum('amount'),
+        count=Count('id')
+    ).order_by('user_id', 'category_id', 'transaction_type', 'date')
+
+    created = 0
+    with db_transaction.atomic():
+        ledgers.delete()
+        batch = []
+        series = None
+        cumulative_amount, cumulative_count = Decimal('0'), 0
+        for row in rows.iterator():
+            key = (row['user_id'], row['category_id'], row['transaction_type'])
+            if key != series:
+                series = key
+                cumulative_amount, cumulative_count = Decimal('0'), 0
+            cumulative_amount += row['total']
+            cumulative_count += row['count']
+            batch.append(DailyCategoryLedger(
+                user_id=row['user_id'],
+                category_id=row['category_id'],
+                transaction_type=row['transaction_type'],
+                date=row['date'],
+                total_amount=row['total'],
+                transaction_count=row['count'],
+                cumulative_amount=cumulative_amount,
+                cumulative_count=cumulative_count,
+            ))
+            if len(batch) >= batch_size:
+                DailyCategoryLedger.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        if batch:
+            DailyCategoryLedger.objects.bulk_create(batch)
+            created += len(batch)
+    return created
+
+
+def rebuild_cohort_ledger(batch_size=1000):
+    """根据学生档案和原始交易记录重建群体收支台账，返回生成的台账行数"""
+    rows = Transaction.objects.filter(user__student__isnull=False).annotate(
+        year=ExtractYear('date'),
+        month=ExtractMonth('date')
+    ).values(
+        'user__student__grade', 'user__student__class_name', 'user__student__major',
+        'category__name', 'year', 'month', 'transaction_type'
+    ).annotate(
+        total=Sum('amount'),
+        count=Count('id')
+    ).order_by()
+
+    created = 0
+    with db_transaction.atomic():
+        CohortLedger.objects.all().delete()
+        batch = []
+        for row in rows.iterator():
+            batch.append(CohortLedger(
+                grade=row['user__student__grade'],
+                class_name=row['user__student__class_name'],
+                major=row['user__student__major'],
+                category_name=row['category__name'],
+                year=row['year'],
+                month=row['month'],
+                transaction_type=row['transaction_type'],
+                total_amount=row['total'],
+                transaction_count=row['count'],
+            ))
+            if len(batch) >= batch_size:
+                CohortLedger.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        if batch:
+            CohortLedger.objects.bulk_create(batch)
+            created += len(batch)
+    return created
+
+
+def to_date(value):
+    """把查询参数中的日期字符串转换为 date，空值原样返回"""
+    if not value or isinstance(value, date):
+        return value or None
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(f"无效的日期格式: {value}")
+    return parsed
+
+
+def range_totals(user, start=None, end=None, transaction_type=None):
+    """
+    利用累计值计算 [start, end] 区间内各分类的收支，一次查询完成
+
+    每个分类序列只需取两条边界记录：截至 end 的最后一条和 start 之前的最后一条，
+    两者累计值之差即为区间合计。start/end 为空表示不限。返回 RangeTotal 列表。
+    """
+    start, end = to_date(start), to_date(end)
+
+    series = DailyCategoryLedger.objects.filter(
+        user=user,
+        category=OuterRef('category'),
+        transaction_type=OuterRef('transaction_type')
+    ).order_by('-date').values('date')
+
+    rows = DailyCategoryLedger.objects.filter(user=user)
+    if transaction_type:
+        rows = rows.filter(transaction_type=transaction_type)
+    if end:
+        rows = rows.filter(date__lte=end)
+        boundary = Q(date=Subquery(series.filter(date__lte=end)[:1]))
+    else:
+        boundary = Q(date=Subquery(series[:1]))
+    if start:
+        boundary |= Q(date=Subquery(series.filter(date__lt=start)[:1]))
+
+    boundaries = defaultdict(list)
+    for row in rows.filter(boundary).values(
+        'category_id', 'category__name', 'category__color', 'transaction_type',
+        'date', 'cumulative_amount', 'cumulative_count'
+    ):
+        boundaries[(row['category_id'], row['transaction_type'])].append(row)
+
+    totals = []
+    for edges in boundaries.values():
+        edges.sort(key=lambda row: row['date'])
+        last = edges[-1]
+        amount, count = last['cumulative_amount'], last['cumulative_count']
+        if start:
+            before = [row for row in edges if row['date'] < start]
+            if before:
+                amount -= before[-1]['cumulative_amount']
+                count -= before[-1]['cumulative_count']
+        if count:
+            totals.append(RangeTotal(
+                category_id=last['category_id'],
+                category_name=last['category__name'],
+                category_color=last['category__color'],
+                transaction_type=last['transaction_type'],
+                amount=amount,
+                count=count,
+            ))
+    return totals
+
+
+def monthly_totals(user, start, end):
+    """
+    读取 [start, end] 所在月份的月度收支，一次查询完成
+
+    返回 {(year, month): {'income': Decimal, 'expense': Decimal}}，没有数据的月份不出现。
+    """
+    rows = MonthlyLedger.objects.filter(user=user).filter(
+        Q(year__gt=start.year) | Q(year=start.year, month__gte=start.month)
+    ).filter(
+        Q(year__lt=end.year) | Q(year=end.year, month__lte=end.month)
+    ).values_list('year', 'month', 'transaction_type', 'total_amount')
+
+    totals = defaultdict(lambda: {'income': Decimal('0'), 'expense': Decimal('0')})
+    for year, month, transaction_type, amount in rows:
+        totals[(year, month)][transaction_type] += amount
+    return totals
+
+
+def iter_months(start, end):
+    """按月遍历 [start, end]，产出每月第一天"""
+    current = date(start.year, start.month, 1)
+    while current <= end:
+        yield current
+        if current.month == 12:
+            current = current.replace(year=current.year + 1, month=1)
+        else:
+            current = current.replace(month=current.month + 1)
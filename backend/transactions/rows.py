@@ -0,0 +1,121 @@
+"""
+交易列表快速序列化
+
+列表接口只读，不需要 ModelSerializer 逐字段取值和关联对象访问的开销：用 .values()
+一次取出所需列，分类名称、颜色随查询 JOIN 取回，不再逐行查询分类；再由预先编译的
+行映射把每行转换为与 TransactionSerializer 完全相同的输出。支持 ?fields= 只返回部分字段。
+"""
+import decimal
+from collections import namedtuple
+from operator import itemgetter
+
+from django.utils import timezone
+
+# key 为输出字段名，lookup 为 .values() 的查询路径，kind 为需要转换的值类型
+Column = namedtuple('Column', ['key', 'lookup', 'kind'])
+
+# 与 TransactionSerializer.Meta.fields 顺序一致
+TRANSACTION_COLUMNS = (
+    Column('id', 'id', None),
+    Column('user', 'user_id', None),
+    Column('category', 'category_id', None),
+    Column('category_name', 'category__name', None),
+    Column('category_color', 'category__color', None),
+    Column('amount', 'amount', 'decimal'),
+    Column('transaction_type', 'transaction_type', None),
+    Column('date', 'date', 'date'),
+    Column('description', 'description', None),
+    Column('tags', 'tags', None),
+    Column('created_at', 'created_at', 'datetime'),
+    Column('updated_at', 'updated_at', 'datetime'),
+)
+
+# 键集分页用于生成游标的列，不论是否输出都要取回
+KEYSET_LOOKUPS = ('date', 'created_at', 'id')
+
+# 与 Transaction.amount 的小数位一致
+AMOUNT_QUANTUM = decimal.Decimal('0.01')
+
+
+def decimal_converter():
+    """与 DRF DecimalField 相同：按小数位量化后输出定点字符串"""
+    def convert(value):
+        return '{:f}'.format(value.quantize(AMOUNT_QUANTUM))
+    return convert
+
+
+def date_converter():
+    def convert(value):
+        return value.isoformat()
+    return convert
+
+
+def datetime_converter():
+    """与 DRF DateTimeField 相同：转换到当前时区，UTC 偏移写作 Z"""
+    current = timezone.get_current_timezone()
+
+    def convert(value):
+        value = value.astimezone(current).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return convert
+
+
+CONVERTERS = {
+    'decimal': decimal_converter,
+    'date': date_converter,
+    'datetime': datetime_converter,
+}
+
+
+class RowMapper:
+    """
+    把 .values() 的行转换为接口输出
+
+    字段选择、取值顺序和需要转换的列在构造时确定，逐行只做取值、转换和组装字典。
+    """
+
+    def __init__(self, columns, fields=None, required=()):
+        if fields:
+            known = {column.key for column in columns}
+            unknown = [field for field in fields if field not in known]
+            if unknown:
+                raise ValueError(f"不支持的字段：{', '.join(unknown)}")
+            columns = [column for column in columns if column.key in fields]
+        self.keys = tuple(column.key for column in columns)
+        self.lookups = tuple(dict.fromkeys([column.lookup for column in columns] + list(required)))
+        self.kinds = [(index, column.kind) for index, column in enumerate(columns) if column.kind]
+        getter = itemgetter(*[column.lookup for column in columns])
+        # 只有一列时 itemgetter 返回单个值而不是元组
+        self.getter = getter if len(columns) > 1 else (lambda row: (getter(row),))
+
+    def values(self, queryset):
+        """只查询输出和分页需要的列"""
+        return queryset.values(*self.lookups)
+
+    def map(self, rows):
+        """转换一页数据，时区等上下文在每次调用时确定"""
+        keys = self.keys
+        getter = self.getter
+        converters = [(index, CONVERTERS[kind]()) for index, kind in self.kinds]
+        data = []
+        for row in rows:
+            values = list(getter(row))
+            for index, convert in converters:
+                value = values[index]
+                if value is not None:
+                    values[index] = convert(value)
+            data.append(dict(zip(keys, values)))
+        return data
+
+
+def parse_fields(value):
+    """解析 ?fields=id,amount,date，未指定时返回 None 表示输出全部字段"""
+    fields = [field.strip() for field in (value or '').split(',') if field.strip()]
+    return fields or None
+
+
+def transaction_row_mapper(fields=None):
+    """交易列表的行映射，始终取回键集分页需要的列"""
+    return RowMapper(TRANSACTION_COLUMNS, fields, required=KEYSET_LOOKUPS)
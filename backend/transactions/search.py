@@ -0,0 +1,145 @@
+"""
+交易备注与标签全文检索
+
+SQLite 下使用 FTS5 虚拟表，按 bm25 相关度排序；其他数据库退回 icontains 匹配。
+FTS5 默认分词器把连续的汉字当作一个词，搜索"食堂"匹配不到"食堂午餐"，因此写入索引前
+在每个汉字两侧加空格逐字切分，查询时把汉字词组作为短语匹配相邻的字。
+索引由交易信号同步维护，可用 rebuild_search_index 命令整体重建。
+"""
+import re
+
+from django.db import connections
+from django.db.models import Q
+
+from .models import Transaction
+
+FTS_TABLE = 'transactions_transaction_fts'
+
+# 中日韩文字逐字切分
+CJK_PATTERN = re.compile(r'([\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af])')
+
+# 查询词中至少包含一个可被索引的字符
+WORD_PATTERN = re.compile(r'\w')
+
+# 查询词个数上限，避免构造过长的检索表达式
+MAX_TERMS = 10
+
+# 每批写入索引的行数
+BATCH_SIZE = 1000
+
+# 各数据库连接的 FTS5 表是否存在，按 (连接别名, 数据库名) 缓存
+_availability = {}
+
+
+def segment(text):
+    """在每个汉字两侧加空格，使分词器逐字建立索引"""
+    return CJK_PATTERN.sub(r' \1 ', text or '')
+
+
+def is_available(using='default'):
+    """当前连接是否可以使用 FTS5 索引"""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    key = (using, connection.settings_dict['NAME'])
+    if key not in _availability:
+        _availability[key] = FTS_TABLE in connection.introspection.table_names()
+    return _availability[key]
+
+
+def parse_terms(query):
+    """把搜索内容按空白拆分为查询词，丢弃不含文字的词"""
+    terms = [term for term in (query or '').split() if WORD_PATTERN.search(term)]
+    return terms[:MAX_TERMS]
+
+
+def build_match(terms):
+    """
+    生成 FTS5 MATCH 表达式
+
+    每个查询词作为一个短语（汉字逐字切分后要求相邻），多个词之间为 AND；
+    以非汉字结尾的词按前缀匹配，输入"coff"即可匹配"coffee"。
+    """
+    phrases = []
+    for term in terms:
+        phrase = '"%s"' % segment(term).replace('"', '""')
+        if not CJK_PATTERN.match(term[-1]):
+            phrase += ' *'
+        phrases.append(phrase)
+    return ' AND '.join(phrases)
+
+
+def search(queryset, query):
+    """
+    按备注和标签筛选交易
+
+    SQLite 下结果附带 search_rank（bm25，越小越相关）并按其排序；
+    其他数据库按关键词逐个 icontains 匹配，保持原有排序。
+    """
+    terms = parse_terms(query)
+    if not terms:
+        return queryset.none()
+
+    if not is_available(queryset.db):
+        for term in terms:
+            queryset = queryset.filter(Q(description__icontains=term) | Q(tags__icontains=term))
+        return queryset
+
+    table = Transaction._meta.db_table
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[f'"{FTS_TABLE}".rowid = "{table}"."id"', f'"{FTS_TABLE}" MATCH %s'],
+        params=[build_match(terms)],
+        select={'search_rank': f'bm25("{FTS_TABLE}")'},
+        order_by=['search_rank', '-date', '-created_at'],
+    )
+
+
+def index_transactions(instances, using='default'):
+    """写入或更新一组交易的索引"""
+    if not is_available(using) or not instances:
+        return
+    rows = [
+        (instance.pk, instance.user_id, segment(instance.description), segment(instance.tags))
+        for instance in instances
+    ]
+    with connections[using].cursor() as cursor:
+        for start in range(0, len(rows), BATCH_SIZE):
+            batch = rows[start:start + BATCH_SIZE]
+            cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(row[0],) for row in batch])
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, user_id, description, tags) VALUES (%s, %s, %s, %s)',
+                batch
+            )
+
+
+def remove_transactions(pks, using='default'):
+    """删除一组交易的索引"""
+    if not is_available(using) or not pks:
+        return
+    with connections[using].cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(pk,) for pk in pks])
+
+
+def rebuild_index(user_id=None, using='default'):
+    """根据交易记录重建索引，返回写入的行数"""
+    if not is_available(using):
+        return 0
+    transactions = Transaction.objects.using(using).only('id', 'user_id', 'description', 'tags')
+    with connections[using].cursor() as cursor:
+        if user_id is None:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        else:
+            transactions = transactions.filter(user_id=user_id)
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE user_id = %s', [user_id])
+
+    count = 0
+    batch = []
+    for instance in transactions.iterator(chunk_size=BATCH_SIZE):
+        batch.append(instance)
+        if len(batch) >= BATCH_SIZE:
+            index_transactions(batch, using)
+            count += len(batch)
+            batch = []
+    index_transactions(batch, using)
+    return count + len(batch)
@@ -1,5 +1,8 @@
+from django.db import transaction as db_transaction
 from rest_framework import serializers
-from .models import Transaction, TransactionCategory, Budget, FinancialGoal, Alert, ExportTask
+from .models import Transaction, TransactionCategory, Budget, FinancialGoal, GoalContribution, Alert, ExportTask, ImportTask, Tag
+from .goals import contribute, adjust_to
+from .tagging import parse_tags
 
 
 class TransactionCategorySerializer(serializers.ModelSerializer):
@@ -11,7 +14,25 @@ class TransactionCategorySerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
+class CategoryPrimaryKeyField(serializers.PrimaryKeyRelatedField):
+    """交易分类主键字段，上下文中带有预先加载的分类时直接查表，不再逐条查询"""
+
+    def to_internal_value(self, data):
+        categories = self.context.get('categories')
+        if categories is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return categories[int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
 class TransactionSerializer(serializers.ModelSerializer):
+    category = CategoryPrimaryKeyField(queryset=TransactionCategory.objects.all())
     category_name = serializers.CharField(source='category.name', read_only=True)
     category_color = serializers.CharField(source='category.color', read_only=True)
     description = serializers.CharField(allow_blank=True, required=False)
@@ -20,7 +41,7 @@ class TransactionSerializer(serializers.ModelSerializer):
         model = Transaction
         fields = [
             'id', 'user', 'category', 'category_name', 'category_color',
-            'amount', 'transaction_type', 'date', 'description', 'created_at', 'updated_at'
+            'amount', 'transaction_type', 'date', 'description', 'tags', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'user', 'created_at', 'updated_at']
 
@@ -35,6 +56,20 @@ class TransactionSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("交易日期不能是未来日期")
         return value
 
+    def validate_tags(self, value):
+        # 统一用英文逗号分隔，去掉空标签和重复标签
+        return ','.join(parse_tags(value))
+
+
+class TagSerializer(serializers.ModelSerializer):
+    """标签序列化器"""
+    transaction_count = serializers.IntegerField(read_only=True)
+    
+    class Meta:
+        model = Tag
+        fields = ['id', 'name', 'transaction_count', 'created_at']
+        read_only_fields = fields
+
 
 class BudgetSerializer(serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
@@ -47,20 +82,14 @@ class BudgetSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'user', 'category', 'category_name', 'amount', 'period',
             'start_date', 'end_date', 'current_spent', 'remaining', 
-            'progress_percentage', 'is_active', 'created_at'
+            'progress_percentage', 'auto_renew', 'carry_over', 'carried_over',
+            'is_active', 'created_at'
         ]
-        read_only_fields = ['id', 'created_at']
+        read_only_fields = ['id', 'carried_over', 'created_at']
     
     def get_current_spent(self, obj):
-        # 计算预算周期内已花费金额
-        from django.db.models import Sum
-        spent = Transaction.objects.filter(
-            user=obj.user,
-            category=obj.category,
-            transaction_type='expense',
-            date__range=[obj.start_date, obj.end_date]
-        ).aggregate(total=Sum('amount'))['total']
-        return float(spent or 0)
+        # 预算周期内已花费金额，由交易写入路径维护
+        return float(obj.spent_amount)
     
     def get_remaining(self, obj):
         current_spent = self.get_current_spent(obj)
@@ -83,13 +112,61 @@ class FinancialGoalSerializer(serializers.ModelSerializer):
             'current_amount', 'progress_percentage', 'deadline', 
             'is_active', 'created_at'
         ]
-        read_only_fields = ['id', 'created_at']
+        read_only_fields = ['id', 'user', 'created_at']
 
     def validate_target_amount(self, value):
         if value <= 0:
             raise serializers.ValidationError("目标金额必须大于0")
         return value
 
+    def create(self, validated_data):
+        # 期初金额也记为一条进度记录，当前金额始终等于记录合计
+        opening = validated_data.pop('current_amount', 0)
+        with db_transaction.atomic():
+            goal = super().create(validated_data)
+            if opening:
+                contribute(goal, opening, source='adjustment', note='期初金额')
+        return goal
+
+    def update(self, instance, validated_data):
+        # 只写入提交的字段，不回写可能已被并发进度更新改变的当前金额
+        current_amount = validated_data.pop('current_amount', None)
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        with db_transaction.atomic():
+            instance.save(update_fields=[*validated_data, 'updated_at'])
+            if current_amount is not None:
+                adjust_to(instance, current_amount, note='手动修改当前金额')
+        return instance
+
+
+class GoalContributionSerializer(serializers.ModelSerializer):
+    """目标进度记录序列化器，关联交易时金额默认取交易金额"""
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+
+    class Meta:
+        model = GoalContribution
+        fields = ['id', 'goal', 'amount', 'source', 'transaction', 'note', 'created_at']
+        read_only_fields = ['id', 'goal', 'source', 'created_at']
+
+    def validate_amount(self, value):
+        if value == 0:
+            raise serializers.ValidationError("金额不能为0")
+        return value
+
+    def validate_transaction(self, value):
+        if value is not None and value.user_id != self.context['request'].user.id:
+            raise serializers.ValidationError("交易记录不存在")
+        return value
+
+    def validate(self, attrs):
+        transaction = attrs.get('transaction')
+        if 'amount' not in attrs:
+            if transaction is None:
+                raise serializers.ValidationError({'amount': "请填写金额或关联交易"})
+            attrs['amount'] = transaction.amount
+        return attrs
+
 
 class AlertSerializer(serializers.ModelSerializer):
     """预警序列化器"""
@@ -135,6 +212,19 @@ class CreateExportTaskSerializer(serializers.Serializer):
         return data
 
 
+class ImportTaskSerializer(serializers.ModelSerializer):
+    """导入任务序列化器"""
+    
+    class Meta:
+        model = ImportTask
+        fields = [
+            'id', 'task_id', 'file_name', 'file_format', 'status', 'processed_rows',
+            'imported_count', 'duplicate_count', 'error_count', 'row_errors',
+            'error_message', 'created_at', 'completed_at'
+        ]
+        read_only_fields = fields
+
+
 class ExportResponseSerializer(serializers.Serializer):
     """导出响应序列化器"""
     export_id = serializers.CharField()
@@ -0,0 +1,276 @@
+"""
+交易信号处理器
+"""
+from django.contrib.auth.models import User
+from django.db import transaction as db_transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import Signal, receiver
+from students.models import Student
+from .models import Transaction, TransactionCategory, Budget, PlanningSnapshot
+from . import budget_index, budgets, rollups, search, tagging, sync
+from .versioning import bump_versions, allocate_versions
+
+# bulk_create 不触发 post_save，批量新增交易后发送该信号，参数 instances 为已入库的交易列表
+transactions_bulk_created = Signal()
+
+# 交易写入改变了预算已用金额后发送，参数 changes 为 budgets.BudgetChange 列表，此时事务尚未提交
+budget_spent_changed = Signal()
+
+
+def _apply_budget_changes(removed=(), added=()):
+    changes = budgets.apply_changes(removed=removed, added=added)
+    if changes:
+        budget_spent_changed.send(sender=Budget, changes=changes)
+
+
+@receiver(pre_save, sender=Transaction)
+def remember_previous_state(sender, instance, raw=False, **kwargs):
+    """保存前记录交易原有状态，用于计算台账增量"""
+    instance._ledger_previous = None
+    if raw or instance.pk is None:
+        return
+    instance._ledger_previous = rollups.load_snapshot(instance.pk)
+
+
+@receiver(post_save, sender=Transaction)
+def update_ledgers_on_save(sender, instance, created, raw=False, **kwargs):
+    """交易新增或修改后更新汇总台账和预算已用金额"""
+    if raw:
+        return
+    previous = getattr(instance, '_ledger_previous', None)
+    removed = [previous] if previous else []
+    added = [rollups.snapshot(instance)]
+    rollups.apply_changes(removed=removed, added=added)
+    _apply_budget_changes(removed=removed, added=added)
+    instance._ledger_previous = None
+
+
+@receiver(transactions_bulk_created, sender=Transaction)
+def update_ledgers_on_bulk_create(sender, instances, **kwargs):
+    """批量新增交易后一次性汇总增量更新台账"""
+    rollups.apply_changes(added=[rollups.snapshot(instance) for instance in instances])
+
+
+@receiver(transactions_bulk_created, sender=Transaction)
+def update_budget_spent_on_bulk_create(sender, instances, **kwargs):
+    """批量新增交易后按 (用户, 分类) 合并更新预算已用金额"""
+    _apply_budget_changes(added=[rollups.snapshot(instance) for instance in instances])
+
+
+@receiver(post_delete, sender=Transaction)
+def update_ledgers_on_delete(sender, instance, **kwargs):
+    """交易删除后更新汇总台账"""
+    rollups.apply_changes(removed=[rollups.snapshot(instance)])
+
+
+@receiver(post_delete, sender=Transaction)
+def update_budget_spent_on_delete(sender, instance, **kwargs):
+    """交易删除后扣减预算已用金额，预算随用户或分类一起级联删除时更新不到任何行"""
+    _apply_budget_changes(removed=[rollups.snapshot(instance)])
+
+
+@receiver(post_save, sender=Transaction)
+def update_search_index_on_save(sender, instance, raw=False, using='default', **kwargs):
+    """交易新增或修改后同步全文索引"""
+    if raw:
+        return
+    search.index_transactions([instance], using)
+
+
+@receiver(transactions_bulk_created, sender=Transaction)
+def update_search_index_on_bulk_create(sender, instances, **kwargs):
+    """批量新增交易后一次写入全文索引"""
+    search.index_transactions(instances)
+
+
+@receiver(post_delete, sender=Transaction)
+def update_search_index_on_delete(sender, instance, using='default', **kwargs):
+    """交易删除后移除全文索引"""
+    search.remove_transactions([instance.pk], using)
+
+
+@receiver(post_save, sender=Transaction)
+def update_tag_index_on_save(sender, instance, created, raw=False, using='default', **kwargs):
+    """交易新增或修改后同步标签倒排索引，删除时由外键级联清除"""
+    if raw:
+        return
+    tagging.index_tags([instance], replace=not created, using=using)
+
+
+@receiver(transactions_bulk_created, sender=Transaction)
+def update_tag_index_on_bulk_create(sender, instances, **kwargs):
+    """批量新增交易后一次写入标签倒排索引"""
+    tagging.index_tags(instances, replace=False)
+
+
+def _cohort_member(student):
+    return student.user_id, tuple(getattr(student, field) for field in rollups.COHORT_FIELDS)
+
+
+@receiver(pre_save, sender=Student)
+def remember_previous_cohort(sender, instance, raw=False, **kwargs):
+    """保存前记录学生原有的群体维度"""
+    instance._cohort_previous = None
+    if raw or instance.pk is None:
+        return
+    previous = Student.objects.filter(pk=instance.pk).first()
+    if previous is not None:
+        instance._cohort_previous = _cohort_member(previous)
+
+
+@receiver(post_save, sender=Student)
+def update_cohort_on_student_save(sender, instance, raw=False, **kwargs):
+    """年级、班级、专业或关联用户变化后移动该学生在群体台账中的收支"""
+    if raw:
+        return
+    previous = getattr(instance, '_cohort_previous', None)
+    current = _cohort_member(instance)
+    if previous != current:
+        rollups.move_student_cohort(previous=previous, current=current)
+    instance._cohort_previous = None
+
+
+@receiver(post_delete, sender=Student)
+def update_cohort_on_student_delete(sender, instance, **kwargs):
+    """学生档案删除后从群体台账中扣除其收支"""
+    rollups.move_student_cohort(previous=_cohort_member(instance))
+
+
+@receiver(pre_save, sender=TransactionCategory)
+def remember_previous_category_name(sender, instance, raw=False, **kwargs):
+    """保存前记录分类原有名称"""
+    instance._previous_name = None
+    if raw or instance.pk is None:
+        return
+    instance._previous_name = TransactionCategory.objects.filter(pk=instance.pk).values_list(
+        'name', flat=True
+    ).first()
+
+
+@receiver(post_save, sender=TransactionCategory)
+def update_cohort_on_category_rename(sender, instance, raw=False, **kwargs):
+    """群体台账按分类名称归并，分类改名后把学生在该分类下的收支移到新名称"""
+    if raw:
+        return
+    previous = getattr(instance, '_previous_name', None)
+    if previous is not None and previous != instance.name:
+        rollups.rename_category_cohort(instance.pk, previous, instance.name)
+    instance._previous_name = None
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def invalidate_planning_snapshot(sender, instance, raw=False, **kwargs):
+    """交易变动后预算建议快照失效"""
+    if raw:
+        return
+    PlanningSnapshot.objects.filter(user_id=instance.user_id).delete()
+
+
+@receiver(transactions_bulk_created, sender=Transaction)
+def invalidate_planning_snapshots_on_bulk_create(sender, instances, **kwargs):
+    """批量新增交易后相关用户的建议快照失效"""
+    PlanningSnapshot.objects.filter(user_id__in={instance.user_id for instance in instances}).delete()
+
+
+@receiver(post_save, sender=TransactionCategory)
+def invalidate_planning_snapshots_for_category(sender, instance, created, raw=False, **kwargs):
+    """分类名称变动会影响使用该分类的所有用户的建议"""
+    if raw or created:
+        return
+    PlanningSnapshot.objects.filter(
+        user_id__in=Transaction.objects.filter(category=instance).values('user_id')
+    ).delete()
+
+
+@receiver(pre_save, sender=Transaction)
+def assign_change_seq(sender, instance, raw=False, **kwargs):
+    """交易写入前递增用户数据版本号，并以新版本号作为该交易的变更序号"""
+    if raw:
+        return
+    instance.change_seq = allocate_versions([instance.user_id])[instance.user_id]
+
+
+@receiver(transactions_bulk_created, sender=Transaction)
+def assign_change_seq_on_bulk_create(sender, instances, **kwargs):
+    """批量新增交易后每个用户只递增一次版本号，同批交易共用一个变更序号"""
+    sync.stamp_transactions(instances)
+
+
+@receiver(post_delete, sender=Transaction)
+def record_tombstone_on_delete(sender, instance, origin=None, **kwargs):
+    """交易删除后递增版本号并记录墓碑；用户本身被删除时无需同步，也不能再为其建行"""
+    if isinstance(origin, User) or getattr(origin, 'model', None) is User:
+        return
+    sync.record_tombstone(instance)
+
+
+@receiver(pre_save, sender=Budget)
+def refresh_budget_spent(sender, instance, raw=False, **kwargs):
+    """新建、重新启用预算或其用户、分类、起止日期变化时重新汇总已用金额"""
+    if raw:
+        return
+    scope = tuple(getattr(instance, field) for field in budgets.SCOPE_FIELDS)
+    instance._index_users = {instance.user_id}
+    if instance.pk is not None:
+        previous = Budget.objects.filter(pk=instance.pk).values_list(
+            *budgets.SCOPE_FIELDS, 'is_active', 'spent_amount'
+        ).first()
+        if previous:
+            instance._index_users.add(previous[0])
+        # 停用期间不再维护已用金额，重新启用时需要重新汇总
+        if previous and previous[:-2] == scope and (previous[-2] or not instance.is_active):
+            # 实例可能在加载后又有交易写入，沿用数据库中的当前值
+            instance.spent_amount = previous[-1]
+            return
+    instance.spent_amount = budgets.spent_in_scope(*scope)
+
+
+@receiver(post_save, sender=Budget)
+def bump_version_on_save(sender, instance, raw=False, **kwargs):
+    """预算写入后递增用户数据版本号"""
+    if raw:
+        return
+    bump_versions([instance.user_id])
+
+
+@receiver(post_save, sender=Budget)
+def invalidate_budget_index_on_save(sender, instance, raw=False, **kwargs):
+    """预算写入后该用户（及原用户）的预算区间索引失效"""
+    budget_index.invalidate(getattr(instance, '_index_users', None) or [instance.user_id])
+
+
+@receiver(post_delete, sender=Budget)
+def invalidate_budget_index_on_delete(sender, instance, **kwargs):
+    """预算删除后该用户的预算区间索引失效"""
+    budget_index.invalidate([instance.user_id])
+
+
+@receiver(post_delete, sender=Budget)
+def bump_version_on_delete(sender, instance, **kwargs):
+    """预算删除后递增用户数据版本号"""
+    bump_versions([instance.user_id], create=False)
+
+
+@receiver(post_save, sender=TransactionCategory)
+def bump_versions_on_category_save(sender, instance, created, raw=False, **kwargs):
+    """分类变动影响创建人以及所有引用该分类的用户"""
+    if raw:
+        return
+    user_ids = {instance.created_by_id}
+    if not created:
+        # 交易输出带有分类名称和颜色，分类变动后这些交易需要在增量同步中重新下发
+        transactions = Transaction.objects.filter(category=instance)
+        with db_transaction.atomic():
+            versions = allocate_versions(transactions.values_list('user_id', flat=True).order_by().distinct())
+            for user_id, version in versions.items():
+                transactions.filter(user_id=user_id).update(change_seq=version)
+        user_ids.update(Budget.objects.filter(category=instance).values_list('user_id', flat=True))
+        user_ids.difference_update(versions)
+    bump_versions(user_ids)
+
+
+@receiver(post_delete, sender=TransactionCategory)
+def bump_version_on_category_delete(sender, instance, **kwargs):
+    """分类删除后递增创建人的版本号，引用该分类的交易和预算会被级联删除并各自触发"""
+    bump_versions([instance.created_by_id], create=False)
@@ -0,0 +1,97 @@
+"""
+交易增量同步
+
+每次写入交易都会递增用户版本号，并把新版本号记为该交易的变更序号 change_seq；
+删除交易时写入一条带序号的墓碑。客户端保存上次同步返回的游标（版本号），
+下次只取序号更大的交易和墓碑，数据没有变化时只需查询一次版本号。
+墓碑定期清理，游标早于清理位置的客户端需要重新全量加载。
+"""
+from collections import namedtuple
+from itertools import chain
+
+from django.db import transaction as db_transaction
+from django.db.models import Max
+
+from .models import Transaction, TransactionTombstone, DataVersion
+from .versioning import allocate_versions
+
+# 单次同步默认和最多返回的变更条数（交易与墓碑合计）
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 1000
+
+# reset 为 True 时客户端需清空本地数据，经列表接口重新加载后从 cursor 继续同步
+ChangeSet = namedtuple('ChangeSet', ['cursor', 'reset', 'has_more', 'changed', 'deleted'])
+
+
+def stamp_transactions(instances):
+    """为一批已写入的交易分配变更序号，同一用户的交易共用一个序号"""
+    pks_by_user = {}
+    for instance in instances:
+        pks_by_user.setdefault(instance.user_id, []).append(instance.pk)
+    with db_transaction.atomic():
+        versions = allocate_versions(pks_by_user.keys())
+        for user_id, pks in pks_by_user.items():
+            Transaction.objects.filter(pk__in=pks).update(change_seq=versions[user_id])
+    for instance in instances:
+        instance.change_seq = versions[instance.user_id]
+
+
+def record_tombstone(instance):
+    """记录一笔已删除的交易"""
+    with db_transaction.atomic():
+        version = allocate_versions([instance.user_id])[instance.user_id]
+        TransactionTombstone.objects.create(
+            user_id=instance.user_id, transaction_id=instance.pk, change_seq=version
+        )
+
+
+def collect_changes(user, since, limit, mapper):
+    """
+    返回游标 since 之后的交易变更
+
+    只读取不大于当前版本号的序号，结果对应一个一致的时间点。条数超过 limit 时按序号分页，
+    同一序号的变更（如一次批量创建）总在同一页返回。
+    """
+    version, compacted = (
+        DataVersion.objects.filter(user=user).values_list('version', 'compacted_version').first()
+        or (0, 0)
+    )
+    # 首次同步、游标早于墓碑清理位置或晚于当前版本（数据已回滚）时需要全量重新加载
+    if since is None or since < compacted or since > version:
+        return ChangeSet(version, True, False, [], [])
+    if since == version:
+        return ChangeSet(version, False, False, [], [])
+
+    rows = Transaction.objects.filter(user=user, change_seq__gt=since, change_seq__lte=version)
+    tombstones = TransactionTombstone.objects.filter(user=user, change_seq__gt=since, change_seq__lte=version)
+
+    seqs = sorted(chain(
+        rows.order_by('change_seq').values_list('change_seq', flat=True)[:limit + 1],
+        tombstones.order_by('change_seq').values_list('change_seq', flat=True)[:limit + 1],
+    ))
+    has_more = len(seqs) > limit
+    cursor = seqs[limit - 1] if has_more else version
+    if has_more:
+        rows = rows.filter(change_seq__lte=cursor)
+        tombstones = tombstones.filter(change_seq__lte=cursor)
+
+    changed = mapper.map(mapper.values(rows.order_by('change_seq', 'id')))
+    deleted = list(tombstones.order_by('change_seq', 'id').values_list('transaction_id', flat=True))
+    return ChangeSet(cursor, False, has_more, changed, deleted)
+
+
+def compact_tombstones(before):
+    """
+    删除早于 before 的墓碑，返回删除条数
+
+    同时记录每个用户已清理到的序号，游标更早的客户端下次同步时会收到 reset。
+    """
+    stale = TransactionTombstone.objects.filter(deleted_at__lt=before)
+    with db_transaction.atomic():
+        floors = stale.values('user_id').annotate(floor=Max('change_seq')).order_by()
+        for item in floors:
+            DataVersion.objects.filter(
+                user_id=item['user_id'], compacted_version__lt=item['floor']
+            ).update(compacted_version=item['floor'])
+        deleted, _ = stale.delete()
+    return deleted
@@ -0,0 +1,123 @@
+"""
+交易标签倒排索引
+
+交易的 tags 字段保存用户输入的标签字符串，写入时按逗号、分号、顿号拆分，
+同步到 Tag（每个用户的标签表）和 TransactionTag（标签 → 交易的倒排索引）。
+按标签筛选和统计只查倒排索引，不再对标签字符串做子串匹配。
+"""
+import re
+
+from django.db.models import Count, Sum
+
+from .models import Tag, TransactionTag
+
+# 标签分隔符，兼容中英文标点
+SEPARATOR_PATTERN = re.compile(r'[,，;；、]')
+
+# 单个标签的最大长度，与 Tag.name 一致
+MAX_TAG_LENGTH = 50
+
+# 每批写入倒排索引的行数
+BATCH_SIZE = 500
+
+
+def parse_tags(text):
+    """拆分标签字符串，去掉首尾空白、空标签和重复标签，保持原有顺序"""
+    names = []
+    for name in SEPARATOR_PATTERN.split(text or ''):
+        name = name.strip()[:MAX_TAG_LENGTH]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def get_tags(user_id, names, using='default'):
+    """返回 {标签名: 标签}，不存在的标签一并创建"""
+    names = set(names)
+    if not names:
+        return {}
+    tags = Tag.objects.using(using).filter(user_id=user_id, name__in=names)
+    found = {tag.name: tag for tag in tags}
+    missing = names - set(found)
+    if missing:
+        # 并发创建同名标签时以已存在的记录为准
+        Tag.objects.using(using).bulk_create(
+            [Tag(user_id=user_id, name=name) for name in missing],
+            ignore_conflicts=True
+        )
+        found.update(
+            (tag.name, tag)
+            for tag in Tag.objects.using(using).filter(user_id=user_id, name__in=missing)
+        )
+    return found
+
+
+def index_tags(instances, replace=True, using='default'):
+    """
+    同步一组交易的标签索引
+
+    replace 为 True 时先删除这些交易原有的索引行；新增的交易没有旧索引，可以跳过删除。
+    """
+    if replace:
+        pks = [instance.pk for instance in instances]
+        for start in range(0, len(pks), BATCH_SIZE):
+            TransactionTag.objects.using(using).filter(
+                transaction_id__in=pks[start:start + BATCH_SIZE]
+            ).delete()
+
+    names_by_user = {}
+    parsed = []
+    for instance in instances:
+        names = parse_tags(instance.tags)
+        if names:
+            names_by_user.setdefault(instance.user_id, set()).update(names)
+            parsed.append((instance, names))
+    if not parsed:
+        return
+
+    tags_by_user = {
+        user_id: get_tags(user_id, names, using) for user_id, names in names_by_user.items()
+    }
+    links = [
+        TransactionTag(tag=tags_by_user[instance.user_id][name], transaction_id=instance.pk)
+        for instance, names in parsed
+        for name in names
+    ]
+    TransactionTag.objects.using(using).bulk_create(links, batch_size=BATCH_SIZE)
+
+
+def filter_by_tags(queryset, user, names, match_all=True):
+    """
+    按标签筛选交易
+
+    match_all 为 True 时要求交易带有全部标签（AND），否则带有任一标签即可（OR）。
+    先把标签名换成标签主键，再经倒排索引取出交易主键。
+    """
+    names = set(names)
+    if not names:
+        return queryset
+    tag_ids = list(
+        Tag.objects.using(queryset.db).filter(user=user, name__in=names).values_list('id', flat=True)
+    )
+    if not tag_ids or (match_all and len(tag_ids) < len(names)):
+        return queryset.none()
+
+    links = TransactionTag.objects.using(queryset.db).filter(tag_id__in=tag_ids)
+    if match_all and len(tag_ids) > 1:
+        links = links.values('transaction_id').annotate(
+            matched=Count('tag_id')
+        ).filter(matched=len(tag_ids))
+    return queryset.filter(pk__in=links.values('transaction_id'))
+
+
+def tag_totals(user, start_date=None, end_date=None, transaction_type='expense'):
+    """按标签汇总区间内的金额和笔数，金额从高到低排列"""
+    links = TransactionTag.objects.filter(tag__user=user, transaction__transaction_type=transaction_type)
+    if start_date:
+        links = links.filter(transaction__date__gte=start_date)
+    if end_date:
+        links = links.filter(transaction__date__lte=end_date)
+    return links.values('tag_id', 'tag__name').annotate(
+        total_amount=Sum('transaction__amount'),
+        transaction_count=Count('transaction_id')
+    ).order_by('-total_amount', 'tag__name')
@@ -6,7 +6,9 @@ from .views import (
     BudgetViewSet, 
     FinancialGoalViewSet,
     AlertViewSet,
-    ExportTaskViewSet
+    ExportTaskViewSet,
+    ImportTaskViewSet,
+    TagViewSet
 )
 
 router = DefaultRouter()
@@ -16,6 +18,8 @@ router.register(r'budgets', BudgetViewSet)
 router.register(r'goals', FinancialGoalViewSet)
 router.register(r'alerts', AlertViewSet)
 router.register(r'exports', ExportTaskViewSet)
+router.register(r'imports', ImportTaskViewSet)
+router.register(r'tags', TagViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -0,0 +1,141 @@
+"""
+用户数据版本号
+
+交易、预算、分类的每次写入都会递增相关用户的版本号。缓存键和 ETag 都带上版本号，
+数据变化后旧缓存自然不再命中，失效时无需扫描或删除缓存键。
+"""
+import hashlib
+from functools import wraps
+
+from django.db import transaction as db_transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import DataVersion
+
+
+def get_version(user_id):
+    """
+    返回用户当前的版本标识
+
+    除递增计数外还带上最后变更时间：用户被删除重建或数据库回滚后计数会从头开始，
+    时间戳保证新旧标识不会相同。没有记录的用户返回 '0'。
+    """
+    row = DataVersion.objects.filter(user_id=user_id).values_list('version', 'changed_at').first()
+    if row is None:
+        return '0'
+    version, changed_at = row
+    return f"{version}.{int(changed_at.timestamp() * 1000000):x}"
+
+
+def bump_versions(user_ids, create=True):
+    """
+    递增一组用户的版本号
+
+    create 为 False 时只更新已有记录：删除数据时用户本身可能也在被级联删除，
+    此时不能再为其建行。
+    """
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if not user_ids:
+        return
+    now = timezone.now()
+    with db_transaction.atomic():
+        updated = DataVersion.objects.filter(user_id__in=user_ids).update(
+            version=F('version') + 1, changed_at=now
+        )
+        if updated == len(user_ids) or not create:
+            return
+        existing = set(DataVersion.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+        missing = user_ids - existing
+        # 并发建行时以已存在的记录为准，随后统一递增，保证每次写入都能改变版本号
+        DataVersion.objects.bulk_create(
+            [DataVersion(user_id=user_id, version=0, changed_at=now) for user_id in missing],
+            ignore_conflicts=True
+        )
+        DataVersion.objects.filter(user_id__in=missing).update(version=F('version') + 1, changed_at=now)
+
+
+def allocate_versions(user_ids):
+    """
+    递增一组用户的版本号并返回 {用户ID: 新版本号}
+
+    新版本号同时作为交易的变更序号。调用方需在同一事务中写入带序号的记录：
+    版本号行的写锁保持到提交，同一用户的写入按序号顺序提交。
+    """
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if not user_ids:
+        return {}
+    with db_transaction.atomic():
+        bump_versions(user_ids)
+        return dict(DataVersion.objects.filter(user_id__in=user_ids).values_list('user_id', 'version'))
+
+
+def request_version(request):
+    """同一请求内只查询一次当前用户的版本号"""
+    if not hasattr(request, '_data_version'):
+        request._data_version = get_version(request.user.pk)
+    return request._data_version
+
+
+def normalize_params(query_params):
+    """把查询参数按键名、值排序后拼成稳定的字符串，参数顺序不同视为同一请求"""
+    items = []
+    for key in sorted(query_params.keys()):
+        for value in sorted(query_params.getlist(key)):
+            items.append(f"{key}={value}")
+    return '&'.join(items)
+
+
+def make_etag(request, endpoint):
+    """
+    由 (用户, 接口, 查询参数, 当天日期, 版本号) 生成强 ETag
+
+    默认时间范围依赖当天日期，跨天后即使数据未变也要重新生成。
+    """
+    raw = ':'.join([
+        str(request.user.pk),
+        endpoint,
+        timezone.localdate().isoformat(),
+        request_version(request),
+        normalize_params(request.query_params),
+    ])
+    return '"%s"' % hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+def etag_matches(request, etag):
+    """判断 If-None-Match 是否包含当前 ETag（按弱比较，忽略 W/ 前缀）"""
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    candidates = parse_etags(header)
+    return '*' in candidates or any(tag.removeprefix('W/') == etag for tag in candidates)
+
+
+def conditional_get(view_method):
+    """
+    为 GET 接口提供 ETag / If-None-Match 条件请求
+
+    计算 ETag 只需查询版本号，匹配时直接返回304，不执行聚合和序列化。
+    成功响应附带 ETag，并要求客户端每次使用前重新验证。
+    """
+    endpoint = view_method.__qualname__.split('.')[0]
+
+    @wraps(view_method)
+    def wrapper(view, request, *args, **kwargs):
+        etag = make_etag(request, endpoint)
+        if etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = view_method(view, request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+    return wrapper
@@ -2,21 +2,41 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.parsers import MultiPartParser, FormParser
 from django.db.models import Sum, Q, Count, Avg
 from django.db.models.functions import TruncMonth
 from django.utils import timezone
 from datetime import datetime, timedelta, date
+import os
+import uuid
+from decimal import Decimal
 from django.shortcuts import get_object_or_404
-from .models import Transaction, TransactionCategory, Budget, FinancialGoal, Alert, ExportTask
+from django.db import IntegrityError, transaction as db_transaction
+from .models import Transaction, TransactionCategory, Budget, FinancialGoal, Alert, ExportTask, ImportTask, Tag
+from .rollups import range_totals
+from .versioning import conditional_get
+from .pagination import KeysetPagination
+from .signals import transactions_bulk_created
+from .importers import ImportFileError, detect_format, save_upload, runner
+from .search import search
+from .tagging import parse_tags, filter_by_tags, tag_totals
+from .rows import parse_fields, transaction_row_mapper
+from .sync import DEFAULT_LIMIT, MAX_LIMIT, collect_changes
+from . import budget_index
+from .goals import contribute
+from statistics.analytics import summarize_range
 from .serializers import (
     TransactionSerializer, 
     TransactionCategorySerializer, 
     BudgetSerializer, 
     FinancialGoalSerializer,
+    GoalContributionSerializer,
     AlertSerializer,
     AlertListSerializer,
     ExportTaskSerializer,
     CreateExportTaskSerializer,
+    ImportTaskSerializer,
+    TagSerializer,
     ExportResponseSerializer
 )
 
@@ -42,13 +62,16 @@ class TransactionViewSet(viewsets.ModelViewSet):
     queryset = Transaction.objects.all()
     serializer_class = TransactionSerializer
     permission_classes = [IsAuthenticated]
+    # 单次批量创建的最大条数
+    bulk_create_limit = 500
     
     def get_queryset(self):
-        return Transaction.objects.filter(user=self.request.user)
+        return Transaction.objects.filter(user=self.request.user).select_related('category')
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
     
+    @conditional_get
     def list(self, request, *args, **kwargs):
         """获取交易记录列表 - 支持分页和筛选"""
         queryset = self.get_queryset()
@@ -68,19 +91,44 @@ class TransactionViewSet(viewsets.ModelViewSet):
         if end_date:
             queryset = queryset.filter(date__lte=end_date)
         
+        # 按标签筛选：tag 可重复或用逗号分隔，默认需带有全部标签，tag_mode=any 时带有任一标签即可
+        tag_names = [name for value in request.query_params.getlist('tag') for name in parse_tags(value)]
+        if tag_names:
+            match_all = request.query_params.get('tag_mode', 'all') != 'any'
+            queryset = filter_by_tags(queryset, request.user, tag_names, match_all=match_all)
+        
+        # 全文检索备注和标签，按相关度排序（键集分页时仍按日期倒序）
+        keyword = request.query_params.get('q', '').strip()
+        if keyword:
+            queryset = search(queryset, keyword)
+        
+        # 列表只读，按 .values() 取列并由行映射输出，与 TransactionSerializer 结果一致；fields 可只返回部分字段
+        try:
+            mapper = transaction_row_mapper(parse_fields(request.query_params.get('fields')))
+        except ValueError as exc:
+            return Response({
+                'code': 400,
+                'message': str(exc)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        rows = mapper.values(queryset)
+        
+        # 键集分页：按 (date, created_at, id) 定位，不使用 OFFSET 和 COUNT
+        if KeysetPagination.requested(request):
+            paginator = KeysetPagination()
+            page = paginator.paginate_queryset(rows, request, view=self)
+            return paginator.get_paginated_response(mapper.map(page))
+        
         # 分页
-        page = self.paginate_queryset(queryset)
+        page = self.paginate_queryset(rows)
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            return self.get_paginated_response(mapper.map(page))
         
-        serializer = self.get_serializer(queryset, many=True)
         return Response({
             'code': 200,
             'data': {
-                'transactions': serializer.data,
+                'transactions': mapper.map(rows),
                 'pagination': {
-                    'total': queryset.count(),
+                    'total': rows.count(),
                     'page': 1,
                     'page_size': 20,
                     'total_pages': 1
@@ -104,6 +152,93 @@ class TransactionViewSet(viewsets.ModelViewSet):
             'errors': serializer.errors
         }, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        批量创建交易记录
+
+        整批校验通过后一次插入，台账、版本号和预警按批处理，不逐条触发信号。
+        """
+        if not isinstance(request.data, list) or not request.data:
+            return Response({
+                'code': 400,
+                'message': '请提交非空的交易记录列表'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if len(request.data) > self.bulk_create_limit:
+            return Response({
+                'code': 400,
+                'message': f'单次最多创建{self.bulk_create_limit}条交易记录'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # 一次加载本批涉及的分类，避免逐条校验分类主键；主键与单条创建一样可为数字字符串
+        category_ids = set()
+        for item in request.data:
+            category = item.get('category') if isinstance(item, dict) else None
+            if isinstance(category, bool):
+                continue
+            try:
+                category_ids.add(int(category))
+            except (TypeError, ValueError):
+                continue
+        context = self.get_serializer_context()
+        context['categories'] = TransactionCategory.objects.in_bulk(category_ids)
+        serializer = self.get_serializer(data=request.data, many=True, context=context)
+        if not serializer.is_valid():
+            return Response({
+                'code': 400,
+                'message': '创建失败',
+                'errors': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        instances = [
+            Transaction(user=request.user, **item) for item in serializer.validated_data
+        ]
+        with db_transaction.atomic():
+            instances = Transaction.objects.bulk_create(instances)
+            transactions_bulk_created.send(sender=Transaction, instances=instances)
+        
+        return Response({
+            'code': 201,
+            'message': f'成功创建{len(instances)}条交易记录',
+            'data': self.get_serializer(instances, many=True).data
+        }, status=status.HTTP_201_CREATED)
+    
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        增量同步：返回游标 since 之后新增、修改的交易和已删除的交易ID
+
+        不带 since 或游标已失效时返回 reset，客户端清空本地数据、经列表接口重新加载后从 cursor 继续。
+        """
+        since = request.query_params.get('since') or None
+        try:
+            since = int(since) if since is not None else None
+            limit = min(max(int(request.query_params.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+        except ValueError:
+            return Response({
+                'code': 400,
+                'message': '无效的同步游标或条数'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            mapper = transaction_row_mapper(parse_fields(request.query_params.get('fields')))
+        except ValueError as exc:
+            return Response({
+                'code': 400,
+                'message': str(exc)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        changes = collect_changes(request.user, since, limit, mapper)
+        return Response({
+            'code': 200,
+            'data': {
+                'cursor': changes.cursor,
+                'reset': changes.reset,
+                'has_more': changes.has_more,
+                'changed': changes.changed,
+                'deleted': changes.deleted
+            }
+        })
+    
     def update(self, request, *args, **kwargs):
         """更新交易记录"""
         partial = kwargs.pop('partial', False)
@@ -137,34 +272,16 @@ class TransactionViewSet(viewsets.ModelViewSet):
         start_date = request.query_params.get('start_date')
         end_date = request.query_params.get('end_date')
         
-        queryset = self.get_queryset()
-        
-        if start_date:
-            queryset = queryset.filter(date__gte=start_date)
-        if end_date:
-            queryset = queryset.filter(date__lte=end_date)
-        
-        # 计算总收入和总支出
-        income_total = queryset.filter(transaction_type='income').aggregate(
-            total=Sum('amount')
-        )['total'] or 0
-        
-        expense_total = queryset.filter(transaction_type='expense').aggregate(
-            total=Sum('amount')
-        )['total'] or 0
-        
-        # 计算交易数量
-        transaction_count = queryset.count()
-        income_count = queryset.filter(transaction_type='income').count()
-        expense_count = queryset.filter(transaction_type='expense').count()
+        # 通过每日分类台账的累计值计算区间合计
+        summary = summarize_range(request.user, start_date, end_date)
         
         summary_data = {
-            'total_income': float(income_total),
-            'total_expense': float(expense_total),
-            'net_income': float(income_total - expense_total),
-            'transaction_count': transaction_count,
-            'income_count': income_count,
-            'expense_count': expense_count,
+            'total_income': float(summary.total_income),
+            'total_expense': float(summary.total_expense),
+            'net_income': float(summary.net_balance),
+            'transaction_count': summary.transaction_count,
+            'income_count': summary.income_count,
+            'expense_count': summary.expense_count,
             'start_date': start_date,
             'end_date': end_date
         }
@@ -181,27 +298,26 @@ class TransactionViewSet(viewsets.ModelViewSet):
         end_date = request.query_params.get('end_date')
         transaction_type = request.query_params.get('transaction_type', 'expense')
         
-        queryset = self.get_queryset().filter(transaction_type=transaction_type)
-        
-        if start_date:
-            queryset = queryset.filter(date__gte=start_date)
-        if end_date:
-            queryset = queryset.filter(date__lte=end_date)
-        
-        # 按分类统计
-        category_stats = queryset.values('category__name').annotate(
-            total_amount=Sum('amount'),
-            transaction_count=Count('id')
-        ).order_by('-total_amount')
+        # 按分类统计（同名分类合并）
+        category_stats = {}
+        for total in range_totals(request.user, start_date, end_date, transaction_type):
+            stat = category_stats.setdefault(total.category_name, {
+                'total_amount': Decimal('0'),
+                'transaction_count': 0
+            })
+            stat['total_amount'] += total.amount
+            stat['transaction_count'] += total.count
         
         trends_data = [
             {
-                'category': item['category__name'] or '未分类',
-                'total_amount': float(item['total_amount']),
-                'transaction_count': item['transaction_count'],
+                'category': name or '未分类',
+                'total_amount': float(stat['total_amount']),
+                'transaction_count': stat['transaction_count'],
                 'percentage': 0  # 前端可以计算百分比
             }
-            for item in category_stats
+            for name, stat in sorted(
+                category_stats.items(), key=lambda item: item[1]['total_amount'], reverse=True
+            )
         ]
         
         return Response({
@@ -247,13 +363,58 @@ class TransactionViewSet(viewsets.ModelViewSet):
         })
 
 
+class TagViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = Tag.objects.all()
+    serializer_class = TagSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        return Tag.objects.filter(user=self.request.user).annotate(
+            transaction_count=Count('transaction_links')
+        )
+    
+    def list(self, request, *args, **kwargs):
+        """获取标签列表，不含已没有交易的标签"""
+        # 带聚合的查询不会应用 Meta.ordering，需显式排序
+        tags = self.get_queryset().filter(transaction_count__gt=0).order_by('name')
+        serializer = self.get_serializer(tags, many=True)
+        return Response({
+            'code': 200,
+            'data': serializer.data
+        })
+    
+    @action(detail=False, methods=['get'])
+    @conditional_get
+    def summary(self, request):
+        """按标签统计区间内的收支金额，经倒排索引汇总"""
+        start_date = request.query_params.get('start_date')
+        end_date = request.query_params.get('end_date')
+        transaction_type = request.query_params.get('transaction_type', 'expense')
+        
+        summary_data = [
+            {
+                'tag_id': item['tag_id'],
+                'tag': item['tag__name'],
+                'total_amount': float(item['total_amount']),
+                'transaction_count': item['transaction_count']
+            }
+            for item in tag_totals(request.user, start_date, end_date, transaction_type)
+        ]
+        
+        return Response({
+            'code': 200,
+            'data': summary_data
+        })
+
+
 class BudgetViewSet(viewsets.ModelViewSet):
     queryset = Budget.objects.all()
     serializer_class = BudgetSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Budget.objects.filter(user=self.request.user, is_active=True)
+        # 已用金额保存在预算上，关联分类后整个列表一次查询
+        return Budget.objects.filter(user=self.request.user, is_active=True).select_related('category')
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -262,12 +423,9 @@ class BudgetViewSet(viewsets.ModelViewSet):
     def current(self, request):
         """获取当前生效的预算"""
         today = timezone.now().date()
-        budgets = Budget.objects.filter(
-            user=request.user,
-            is_active=True,
-            start_date__lte=today,
-            end_date__gte=today
-        )
+        # 覆盖今天的预算由进程内区间索引给出，按主键读取最新的已用金额
+        budget_ids = budget_index.get_user_budgets(request.user.id).covering_any(today)
+        budgets = self.get_queryset().filter(pk__in=budget_ids) if budget_ids else Budget.objects.none()
         serializer = self.get_serializer(budgets, many=True)
         return Response({
             'code': 200,
@@ -288,27 +446,53 @@ class FinancialGoalViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['post'])
     def update_progress(self, request, pk=None):
-        """更新目标进度"""
+        """
+        追加目标进度
+
+        每次调用追加一条进度记录并在数据库中原子累加当前金额，并发提交不会丢失更新。
+        可通过 transaction 关联一笔存入的交易，未填写 amount 时取交易金额。
+        """
         goal = self.get_object()
-        amount = request.data.get('amount', 0)
-        
-        try:
-            amount = float(amount)
-            goal.current_amount += amount
-            goal.save()
-            
-            serializer = self.get_serializer(goal)
+        serializer = GoalContributionSerializer(data=request.data, context=self.get_serializer_context())
+        if not serializer.is_valid():
             return Response({
-                'code': 200,
-                'message': '进度更新成功',
-                'data': serializer.data
-            })
-        except (ValueError, TypeError):
+                'code': 400,
+                'message': '无效金额',
+                'errors': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        transaction = serializer.validated_data.get('transaction')
+        try:
+            contribute(
+                goal,
+                serializer.validated_data['amount'],
+                source='transaction' if transaction else 'manual',
+                transaction=transaction,
+                note=serializer.validated_data.get('note', '')
+            )
+        except IntegrityError:
             return Response({
                 'code': 400,
-                'message': '无效金额'
+                'message': '该交易已计入此目标'
             }, status=status.HTTP_400_BAD_REQUEST)
 
+        serializer = self.get_serializer(goal)
+        return Response({
+            'code': 200,
+            'message': '进度更新成功',
+            'data': serializer.data
+        })
+
+    @action(detail=True, methods=['get'])
+    def contributions(self, request, pk=None):
+        """获取目标的进度记录"""
+        goal = self.get_object()
+        serializer = GoalContributionSerializer(goal.contributions.all(), many=True)
+        return Response({
+            'code': 200,
+            'data': serializer.data
+        })
+
 
 class AlertViewSet(viewsets.ModelViewSet):
     queryset = Alert.objects.all()
@@ -451,4 +635,46 @@ class ExportTaskViewSet(viewsets.ModelViewSet):
         return Response({
             'code': 200,
             'data': serializer.data
-        })
\ No newline at end of file
+        })
+
+
+class ImportTaskViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = ImportTask.objects.all()
+    serializer_class = ImportTaskSerializer
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+    
+    def get_queryset(self):
+        return ImportTask.objects.filter(user=self.request.user)
+    
+    def create(self, request, *args, **kwargs):
+        """上传 CSV 或 Excel 流水，创建导入任务后立即返回，导入在后台执行"""
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({
+                'code': 400,
+                'message': '请上传流水文件'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            file_format = detect_format(upload.name)
+        except ImportFileError as exc:
+            return Response({
+                'code': 400,
+                'message': str(exc)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        task = ImportTask.objects.create(
+            user=request.user,
+            task_id=uuid.uuid4().hex,
+            file_name=upload.name[:200],
+            file_format=file_format
+        )
+        # 先落盘，由后台线程流式解析，文件用完即删；客户端按任务 ID 轮询进度
+        path = save_upload(upload)
+        runner.submit(task.pk, path)
+        task.refresh_from_db()
+        return Response({
+            'code': 202,
+            'message': '导入任务已创建',
+            'data': self.get_serializer(task).data
+        }, status=status.HTTP_202_ACCEPTED)